@@ -75,7 +75,11 @@ def create_elastic_schema() -> dict:
                 "title": {
                     "type": "text",
                     "analyzer": "ru_en",
-                    "fields": {"raw": {"type": "keyword"}},
+                    "fields": {
+                        "raw": {"type": "keyword"},
+                        # Автодополнение названий: /api/v1/films/suggest
+                        "suggest": {"type": "completion"},
+                    },
                 },
                 "description": {"type": "text", "analyzer": "ru_en"},
                 **{name: {"type": "keyword"} for name in
@@ -121,9 +125,11 @@ def bulk_insert_documents(num_docs):
     counter = 0
     actions = []
     for _ in range(num_docs):
+        document = generate_document()
         actions.append({
             "_index": ELASTIC_INDEX,
-            "_source": generate_document()
+            "_id": document["uuid"],  # Фильмы читаются по _id, поэтому он совпадает с uuid
+            "_source": document
         })
 
         if len(actions) == 1000:
@@ -0,0 +1,64 @@
+"""
+Доля попаданий локального кэша одного размера с вытеснением LRU и с допуском TinyLFU
+на трафике из популярных страниц (распределение Ципфа) и длинного хвоста разовых поисков.
+
+Запуск из каталога movies-service:
+> python -m benchmarks.admission [--requests 200000] [--one-off 0.3]
+"""
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from services.memory import MemoryCache  # noqa: E402
+from services.sketch import FrequencySketch  # noqa: E402
+
+# Тело типичной страницы списка; размер одинаков, поэтому кэш ограничен числом записей
+BODY = b"x" * 2048
+
+
+def workload(requests: int, keys: int, one_off: float, skew: float, seed: int) -> list[str]:
+    rnd = random.Random(seed)
+    weights = [1 / rank ** skew for rank in range(1, keys + 1)]
+    popular = rnd.choices(range(keys), weights=weights, k=requests)
+    return [
+        f"search?query={rnd.getrandbits(64):x}" if rnd.random() < one_off else f"films?page={key}"
+        for key in popular
+    ]
+
+
+async def hit_ratio(cache: MemoryCache, keys: list[str]) -> float:
+    hits = 0
+    for key in keys:
+        if await cache.get(key) is not None:
+            hits += 1
+        else:
+            await cache.set(key, BODY, cache.max_ttl)
+    return hits / len(keys)
+
+
+async def run(args: argparse.Namespace) -> None:
+    keys = workload(args.requests, args.keys, args.one_off, args.skew, args.seed)
+    print(f"{'cache entries':<16}{'LRU':>10}{'TinyLFU':>10}")
+    for size in args.sizes:
+        lru = MemoryCache(size, size * len(BODY), 3600)
+        tiny_lfu = MemoryCache(size, size * len(BODY), 3600, admission=FrequencySketch(width=size * 4))
+        print(f"{size:<16}{await hit_ratio(lru, keys):>10.3f}{await hit_ratio(tiny_lfu, keys):>10.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, default=20_000, help="popular pages and films")
+    parser.add_argument("--one-off", type=float, default=0.3, help="share of one-off search requests")
+    parser.add_argument("--skew", type=float, default=0.9, help="Zipf exponent of the popular keys")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2_000, 5_000])
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
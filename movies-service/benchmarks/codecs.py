@@ -0,0 +1,83 @@
+"""
+Сравнение кодеков кэша на страницах фильмов: время кодирования/декодирования и размер в Redis.
+
+Запуск из каталога movies-service:
+> python -m benchmarks.codecs [--number 2000]
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+import orjson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from benchmarks.films import generate_films  # noqa: E402
+from services.codecs import CacheCodec, MsgpackCodec, OrjsonCodec  # noqa: E402
+
+SHORT_FIELDS = ("uuid", "title", "imdb_rating")
+
+
+class StdlibJsonCodec:
+    """Прежний формат RedisCache: json.dumps/json.loads без заголовка."""
+
+    @staticmethod
+    def encode(value):
+        return json.dumps(value).encode()
+
+    @staticmethod
+    def decode(data):
+        return json.loads(data)
+
+
+def pages() -> dict[str, list[dict]]:
+    films = generate_films(50)
+    return {
+        "detail": films[0],
+        "list-10 full": films[:10],
+        "list-50 full": films,
+        "list-10 short": [{name: film[name] for name in SHORT_FIELDS} for film in films[:10]],
+    }
+
+
+def codecs() -> dict[str, object]:
+    return {
+        "stdlib json": StdlibJsonCodec(),
+        "orjson": CacheCodec(OrjsonCodec()),
+        "msgpack": CacheCodec(MsgpackCodec()),
+        "orjson+zstd": CacheCodec(OrjsonCodec(), compress=True, min_size=0),
+        "msgpack+zstd": CacheCodec(MsgpackCodec(), compress=True, min_size=0),
+    }
+
+
+def measure(codec, value, number: int) -> tuple[float, float, int]:
+    data = codec.encode(value)
+    assert codec.decode(data) == value
+    encode = timeit.timeit(lambda: codec.encode(value), number=number) / number
+    decode = timeit.timeit(lambda: codec.decode(data), number=number) / number
+    return encode * 1e6, decode * 1e6, len(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000, help="iterations per measurement")
+    args = parser.parse_args()
+
+    print(f"{'payload':<16}{'codec':<16}{'encode, us':>12}{'decode, us':>12}{'bytes':>10}")
+    for page_name, value in pages().items():
+        for codec_name, codec in codecs().items():
+            encode, decode, size = measure(codec, value, args.number)
+            print(f"{page_name:<16}{codec_name:<16}{encode:>12.2f}{decode:>12.2f}{size:>10}")
+        # Тела ответов кэшируются уже закодированными: кодек только добавляет заголовок
+        body = orjson.dumps(value)
+        for codec_name, codec in (("raw body", CacheCodec(OrjsonCodec())),
+                                  ("raw body+zstd", CacheCodec(OrjsonCodec(), compress=True, min_size=0))):
+            encode, decode, size = measure(codec, body, args.number)
+            print(f"{page_name:<16}{codec_name:<16}{encode:>12.2f}{decode:>12.2f}{size:>10}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Сжатие типичных страниц фильмов: байты на проводе и CPU на запрос при сжатии
+каждого ответа (как GZipMiddleware) и при отдаче заранее сжатых вариантов из кэша.
+
+Запуск из каталога movies-service:
+> python -m benchmarks.compression [--number 500]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+import orjson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from api.responses import negotiate_encoding  # noqa: E402
+from benchmarks.films import generate_films  # noqa: E402
+from services.compression import ENCODERS, ResponseCompressor  # noqa: E402
+from services.policy import CacheEntry  # noqa: E402
+
+SHORT_FIELDS = ("uuid", "title", "imdb_rating")
+# Уровень сжатия starlette GZipMiddleware по умолчанию
+MIDDLEWARE_GZIP_LEVEL = 9
+
+
+def pages() -> dict[str, bytes]:
+    films = generate_films(50)
+    return {
+        "detail": orjson.dumps(films[0]),
+        "list-50 short": orjson.dumps([{name: film[name] for name in SHORT_FIELDS} for film in films]),
+        "list-10 full": orjson.dumps(films[:10]),
+        "list-50 full": orjson.dumps(films),
+    }
+
+
+def per_request(func, number: int) -> float:
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=500, help="iterations per measurement")
+    args = parser.parse_args()
+    compressor = ResponseCompressor({"br": 5, "gzip": 6})
+
+    print(f"{'payload':<16}{'mode':<26}{'bytes':>8}{'us/request':>12}{'us/miss':>10}")
+    for page_name, body in pages().items():
+        print(f"{page_name:<16}{'identity':<26}{len(body):>8}{0:>12.2f}{0:>10.2f}")
+        for encoding, level in (("gzip", MIDDLEWARE_GZIP_LEVEL), ("br", 4)):
+            size = len(ENCODERS[encoding](body, level))
+            cost = per_request(lambda: ENCODERS[encoding](body, level), args.number)
+            print(f"{page_name:<16}{f'{encoding}-{level} per request':<26}{size:>8}{cost:>12.2f}{0:>10.2f}")
+
+        packed = compressor.compress(CacheEntry(body)).pack()
+        miss = per_request(lambda: compressor.compress(CacheEntry(body)).pack(), args.number)
+        for accept in ("gzip, deflate", "gzip, deflate, br"):
+            def serve():
+                entry = CacheEntry.unpack(packed)
+                encoding = negotiate_encoding(accept, entry.variants.keys())
+                return entry.variants[encoding]
+
+            size = len(serve())
+            cost = per_request(serve, args.number * 10)
+            mode = f"precompressed {negotiate_encoding(accept, {'br', 'gzip'})}"
+            print(f"{page_name:<16}{mode:<26}{size:>8}{cost:>12.2f}{miss:>10.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Цена получения FilmService через внедрение зависимостей на каждый запрос: память,
+выделяемая на вызов зависимости, память, удерживаемая после серии запросов, и время
+запроса с попаданием в кэш. Сравниваются сервис воркера, созданный в lifespan, и
+прежняя схема: новый FilmService на каждый запрос под @lru_cache с Request в ключе.
+
+Запуск из каталога movies-service:
+> pip install -r benchmarks/requirements.txt
+> python -m benchmarks.dependencies [--requests 2000]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import tracemalloc
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi import Depends, Request
+from redis.asyncio import Redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from benchmarks.load import in_process_client  # noqa: E402
+from core.config import settings  # noqa: E402
+from db.cache import get_cache  # noqa: E402
+from db.redis import get_redis  # noqa: E402
+from models.film import Film, FilmShort  # noqa: E402
+from services import film  # noqa: E402
+from services.abstract import AbstractCache  # noqa: E402
+from services.lock import RedisLock  # noqa: E402
+
+
+@lru_cache()
+def per_request_film_service(
+        request: Request,
+        cache: AbstractCache = Depends(get_cache),
+        redis: Redis = Depends(get_redis),
+) -> film.FilmService:
+    """Прежняя зависимость: Request в ключе кэша делает каждый вызов промахом."""
+    lock = RedisLock(redis, settings.cache_lock_ttl_ms) if settings.cache_lock_enabled else None
+    service = film.FilmService(
+        cache=cache,
+        elastic=film.film_service.elastic,
+        model_class=Film,
+        list_model_class=FilmShort,
+        index=settings.elastic_movies_index,
+        single_flight=film.film_single_flight,
+        policy=film.film_cache_policy,
+        generation=film.film_generation,
+        compressor=film.film_compressor,
+        rankings=film.film_rankings,
+        replica=film.film_replica,
+        hot_keys=film.film_hot_keys,
+        lock=lock,
+    )
+    service.request = request
+    return service
+
+
+def dependency_allocation(factory, number: int) -> float:
+    """Средний пик памяти одного вызова зависимости, в байтах."""
+    scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []}
+    total = 0
+    for _ in range(number):
+        request = Request(scope)
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        factory(request)
+        total += tracemalloc.get_traced_memory()[1] - before
+    return total / number
+
+
+async def request_time(client, url: str, number: int) -> float:
+    """Среднее время запроса в микросекундах."""
+    await client.get(url)
+    started = time.perf_counter()
+    for _ in range(number):
+        await client.get(url)
+    return (time.perf_counter() - started) / number * 1e6
+
+
+async def retained_memory(client, url: str, number: int) -> int:
+    """Память, оставшаяся занятой после серии запросов, в байтах."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(number):
+        await client.get(url)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained
+
+
+async def run(args: argparse.Namespace) -> None:
+    async with in_process_client(args.films, 0) as (client, film_ids, _):
+        import main
+
+        url = f"/api/v1/films/{film_ids[0]}"
+        cache, redis = await get_cache(), await get_redis()
+        variants = {
+            "lifespan singleton": (film.get_film_service, lambda request: film.film_service),
+            "per-request lru_cache": (
+                per_request_film_service, lambda request: per_request_film_service(request, cache, redis)
+            ),
+        }
+        print(f"{'dependency':<24}{'B per call':>12}{'us per request':>16}{'KiB retained':>14}")
+        for name, (dependency, factory) in variants.items():
+            per_request_film_service.cache_clear()
+            main.app.dependency_overrides[film.get_film_service] = dependency
+            per_request = await request_time(client, url, args.requests)
+            retained = await retained_memory(client, url, args.requests)
+            tracemalloc.start()
+            allocated = dependency_allocation(factory, args.calls)
+            tracemalloc.stop()
+            print(f"{name:<24}{allocated:>12.0f}{per_request:>16.1f}{retained / 1024:>14.1f}")
+        main.app.dependency_overrides.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2_000, help="cache-hit detail requests per variant")
+    parser.add_argument("--calls", type=int, default=1_000, help="direct dependency calls per variant")
+    parser.add_argument("--films", type=int, default=1_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
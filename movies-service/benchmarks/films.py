@@ -0,0 +1,46 @@
+"""
+Генерация реалистичных фильмов для бенчмарков (та же структура, что в faker/main.py).
+"""
+import random
+import string
+import uuid
+from datetime import datetime, timedelta
+
+WORDS = [
+    "mission", "church", "camera", "happy", "red", "evidence", "toward", "wrong", "data", "office",
+    "crime", "share", "represent", "include", "maintain", "present", "offer", "economic", "rest",
+    "million", "south", "prove", "future", "middle", "receive", "art", "happen", "spring", "style",
+]
+GENRES = [f"{word}{index}" for index, word in enumerate(random.Random(0).choices(WORDS, k=101))]
+
+
+def _name(rnd: random.Random) -> str:
+    return f"{rnd.choice(string.ascii_uppercase)}{''.join(rnd.choices(string.ascii_lowercase, k=6))} " \
+           f"{rnd.choice(string.ascii_uppercase)}{''.join(rnd.choices(string.ascii_lowercase, k=8))}"
+
+
+def generate_film(rnd: random.Random) -> dict:
+    created = datetime(2000, 1, 1) + timedelta(seconds=rnd.randint(0, 25 * 365 * 24 * 3600))
+    return {
+        "uuid": str(uuid.UUID(int=rnd.getrandbits(128), version=4)),
+        "imdb_rating": round(rnd.uniform(1.0, 10.0), 1),
+        "genres": rnd.sample(GENRES, rnd.randint(1, 3)),
+        "title": " ".join(rnd.choices(WORDS, k=3)).capitalize(),
+        "description": " ".join(rnd.choices(WORDS, k=30)).capitalize() + ".",
+        "directors_names": [_name(rnd) for _ in range(rnd.randint(1, 5))],
+        "actors_names": [_name(rnd) for _ in range(rnd.randint(1, 5))],
+        "writers_names": [_name(rnd) for _ in range(rnd.randint(1, 5))],
+        "directors": [{"id": str(uuid.UUID(int=rnd.getrandbits(128), version=4)), "name": _name(rnd)}
+                      for _ in range(rnd.randint(1, 3))],
+        "actors": [{"id": str(uuid.UUID(int=rnd.getrandbits(128), version=4)), "name": _name(rnd)}
+                   for _ in range(rnd.randint(1, 5))],
+        "writers": [{"id": str(uuid.UUID(int=rnd.getrandbits(128), version=4)), "name": _name(rnd)}
+                    for _ in range(rnd.randint(1, 3))],
+        "created": created.isoformat(),
+        "file_link": f"/{rnd.choice(WORDS)}/{rnd.choice(WORDS)}.mp4",
+    }
+
+
+def generate_films(count: int, seed: int = 42) -> list[dict]:
+    rnd = random.Random(seed)
+    return [generate_film(rnd) for _ in range(count)]
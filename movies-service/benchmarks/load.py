@@ -0,0 +1,216 @@
+"""
+Нагрузочный бенчмарк movies-service: RPS и p50/p95/p99 по эндпоинтам фильмов.
+
+По умолчанию приложение запускается в этом же процессе поверх заглушек
+Elasticsearch и Redis (benchmarks/standins.py); с --url нагрузка подаётся на
+запущенный сервис (например, docker compose). Результат сравнивается с
+сохранённой базовой линией, и при регрессии больше порога скрипт завершается с кодом 1.
+
+Запуск из каталога movies-service:
+> pip install -r benchmarks/requirements.txt
+> python -m benchmarks.load --duration 20 --save-baseline benchmarks/baseline.json
+> python -m benchmarks.load --duration 20 --baseline benchmarks/baseline.json --threshold 0.2
+> python -m benchmarks.load --url http://localhost/movies --mix list=6,search=1,detail=3
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from benchmarks.films import GENRES, WORDS  # noqa: E402
+from benchmarks.standins import StandInElasticsearch  # noqa: E402
+
+ENDPOINTS = ("list", "search", "detail")
+PERCENTILES = (50, 95, 99)
+# Сравниваемые с базовой линией показатели: (метрика, рост — это плохо)
+COMPARED = (("rps", False), ("p95", True), ("p99", True))
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"Expected e.g. list=6,search=1,detail=3, got {item!r}")
+        mix[name] = int(weight)
+    return mix
+
+
+def skewed(items: list, rnd: random.Random) -> str:
+    """Популярные элементы запрашиваются чаще, как в реальном трафике (распределение Парето)."""
+    return items[min(int(rnd.paretovariate(1.2)) - 1, len(items) - 1)]
+
+
+class RequestFactory:
+    def __init__(self, film_ids: list[str], genres: list[str], page_size: int, seed: int):
+        self.film_ids = film_ids
+        self.genres = genres
+        self.page_size = page_size
+        self.rnd = random.Random(seed)
+        self.pages = list(range(1, max(2, len(film_ids) // page_size) + 1))
+
+    def __call__(self, endpoint: str) -> str:
+        if endpoint == "detail":
+            return f"/api/v1/films/{skewed(self.film_ids, self.rnd)}"
+        if endpoint == "search":
+            return f"/api/v1/films/search?query={self.rnd.choice(WORDS)}&page_size={self.page_size}"
+        url = f"/api/v1/films/?page_size={self.page_size}&page_number={skewed(self.pages, self.rnd)}"
+        if self.rnd.random() < 0.5:
+            url += "&sort=-imdb_rating"
+        if self.genres and self.rnd.random() < 0.3:
+            url += f"&genre={skewed(self.genres, self.rnd)}"
+        return url
+
+
+@asynccontextmanager
+async def in_process_client(films: int, es_latency_ms: float) -> AsyncIterator[tuple[httpx.AsyncClient, list, list]]:
+    import fakeredis.aioredis
+    import main
+
+    standin = StandInElasticsearch.generated(films, latency=es_latency_ms / 1000)
+    main.AsyncElasticsearch = lambda *args, **kwargs: standin
+    main.InstrumentedRedis = lambda *args, **kwargs: fakeredis.aioredis.FakeRedis()
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://movies") as client:
+            yield client, list(standin.films), GENRES
+
+
+@asynccontextmanager
+async def remote_client(url: str, concurrency: int) -> AsyncIterator[tuple[httpx.AsyncClient, list, list]]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        film_ids = []
+        for page in range(1, 11):
+            response = await client.get("/api/v1/films/", params={"page_size": 100, "page_number": page})
+            if response.status_code != 200:
+                break
+            film_ids += [film["uuid"] for film in response.json()]
+        response = await client.get("/api/v1/films/genres")
+        genres = [genre["name"] for genre in response.json()] if response.status_code == 200 else []
+        if not film_ids:
+            raise SystemExit(f"No films at {url}")
+        yield client, film_ids, genres
+
+
+async def drive(
+        client: httpx.AsyncClient, make_url: Callable[[str], str], mix: dict[str, int],
+        concurrency: int, duration: float, rnd: random.Random,
+) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    latencies: dict[str, list[float]] = {name: [] for name in mix}
+    errors: dict[str, int] = {name: 0 for name in mix}
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    async def user() -> None:
+        while time.perf_counter() < deadline:
+            endpoint = rnd.choices(names, weights)[0]
+            url = make_url(endpoint)
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                failed = response.status_code >= 500
+            except httpx.HTTPError:
+                failed = True
+            latencies[endpoint].append(time.perf_counter() - started)
+            errors[endpoint] += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict[str, float]:
+    ordered = sorted(latencies)
+    summary = {"requests": len(ordered), "errors": errors, "rps": round(len(ordered) / elapsed, 1)}
+    for percentile in PERCENTILES:
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100)) if ordered else None
+        summary[f"p{percentile}"] = round(ordered[index] * 1000, 3) if ordered else 0.0
+    return summary
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, summary in result["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base:
+            continue
+        for metric, higher_is_worse in COMPARED:
+            if not base[metric]:
+                continue
+            change = (summary[metric] - base[metric]) / base[metric]
+            if (change if higher_is_worse else -change) > threshold:
+                regressions.append(f"{name} {metric}: {base[metric]} -> {summary[metric]} ({change:+.0%})")
+    return regressions
+
+
+def print_report(result: dict) -> None:
+    print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'rps':>10}" + "".join(f"{f'p{p}, ms':>11}" for p in PERCENTILES))
+    for name, summary in result["endpoints"].items():
+        print(f"{name:<10}{summary['requests']:>10}{summary['errors']:>8}{summary['rps']:>10}"
+              + "".join(f"{summary[f'p{p}']:>11}" for p in PERCENTILES))
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rnd = random.Random(args.seed)
+    context = remote_client(args.url, args.concurrency) if args.url \
+        else in_process_client(args.films, args.es_latency_ms)
+    async with context as (client, film_ids, genres):
+        make_url = RequestFactory(film_ids, genres, args.page_size, args.seed)
+        if args.warmup:
+            await drive(client, make_url, args.mix, args.concurrency, args.warmup, rnd)
+        latencies, errors, elapsed = await drive(client, make_url, args.mix, args.concurrency, args.duration, rnd)
+    endpoints = {name: summarize(latencies[name], errors[name], elapsed) for name in args.mix}
+    endpoints["total"] = summarize(sum(latencies.values(), []), sum(errors.values()), elapsed)
+    config = {key: value for key, value in vars(args).items() if key not in ("baseline", "save_baseline", "output")}
+    return {"config": config, "endpoints": endpoints}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running service; in-process stand-ins if omitted")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("list=6,search=1,detail=3"),
+                        help="request mix weights, e.g. list=6,search=1,detail=3")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--films", type=int, default=2000, help="films in the Elasticsearch stand-in")
+    parser.add_argument("--es-latency-ms", type=float, default=2.0, help="network latency of the stand-in")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the result as JSON")
+    parser.add_argument("--baseline", help="compare with a result stored earlier")
+    parser.add_argument("--save-baseline", help="store the result as a baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative regression of rps, p95 and p99 against the baseline")
+    args = parser.parse_args()
+    # Спаны не собираем, чтобы не замерять саму трассировку
+    os.environ.setdefault("TRACING_SAMPLE_RATE", "0")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    for path in filter(None, (args.output, args.save_baseline)):
+        Path(path).write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        regressions = compare(result, json.loads(Path(args.baseline).read_text()), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+In-process stand-ins for Elasticsearch and Redis for the load benchmark.
+
+The Elasticsearch stand-in answers the queries movies-service sends over films from
+`benchmarks.films` and can add a fixed network latency per request; Redis is replaced
+with fakeredis (see benchmarks/requirements.txt).
+"""
+import asyncio
+import random
+from collections import Counter
+from typing import Any
+
+from elasticsearch import NotFoundError
+
+from benchmarks.films import generate_films
+
+ID_FIELD = "uuid"
+
+
+class StandInIndices:
+    def __init__(self, index_uuid: str):
+        self.index_uuid = index_uuid
+
+    async def get_settings(self, index: str, name: str | None = None, **kwargs: Any) -> dict:
+        return {index: {"settings": {"index": {"uuid": self.index_uuid}}}}
+
+
+class StandInElasticsearch:
+    """
+    Enough of AsyncElasticsearch for movies-service: bool queries with terms and fuzzy
+    clauses, sorting with search_after, point in time, terms aggregations, completion
+    suggestions, get, mget, count and indexing of new documents.
+    """
+
+    def __init__(self, films: list[dict], latency: float = 0.0):
+        self.films = {film[ID_FIELD]: film for film in films}
+        self._positions = {film_id: position for position, film_id in enumerate(self.films)}
+        self.latency = latency
+        self.indices = StandInIndices("standin")
+        self.requests: Counter[str] = Counter()
+        self._sorted: dict[tuple, list[dict]] = {}
+
+    @classmethod
+    def generated(cls, count: int, latency: float = 0.0, seed: int = 42) -> "StandInElasticsearch":
+        return cls(generate_films(count, seed), latency)
+
+    async def close(self) -> None:
+        pass
+
+    async def search(self, index: str | None = None, body: dict | None = None, **kwargs: Any) -> dict:
+        await self._network("search")
+        body = body or {}
+        if "aggs" in body:
+            return self._aggregate(body["aggs"])
+        if "suggest" in body:
+            return self._suggest(body["suggest"], body.get("_source"))
+        keys = self._sort_keys(body.get("sort", []))
+        hits = [film for film in self._sorted_films(keys) if self._match(film, body.get("query"))]
+        if "search_after" in body:
+            after = body["search_after"]
+            position = next((i for i, film in enumerate(hits) if self._sort_values(film, keys) == after), None)
+            hits = hits[position + 1:] if position is not None else []
+        start = body.get("from", 0)
+        page = hits[start:start + body.get("size", 10)]
+        return {
+            "took": 1,
+            "hits": {
+                "total": {"value": len(hits)},
+                "hits": [
+                    {"_id": film[ID_FIELD], "_score": 1.0, "_source": self._project(film, body.get("_source")),
+                     "sort": self._sort_values(film, keys)}
+                    for film in page
+                ],
+            },
+        }
+
+    async def get(self, index: str, id: str, **kwargs: Any) -> dict:
+        await self._network("get")
+        if id not in self.films:
+            raise NotFoundError("Not Found", None, {"found": False})
+        return {"_id": id, "found": True, "_source": self.films[id]}
+
+    async def mget(self, index: str, ids: list[str], **kwargs: Any) -> dict:
+        await self._network("mget")
+        return {"docs": [
+            {"_id": id, "found": True, "_source": self.films[id]} if id in self.films else {"_id": id, "found": False}
+            for id in ids
+        ]}
+
+    async def count(self, index: str | None = None, **kwargs: Any) -> dict:
+        await self._network("count")
+        return {"count": len(self.films)}
+
+    async def index(self, index: str, id: str, document: dict, **kwargs: Any) -> dict:
+        await self._network("index")
+        self.films[id] = document
+        self._positions.setdefault(id, len(self._positions))
+        self._sorted.clear()
+        return {"_id": id, "result": "created"}
+
+    async def open_point_in_time(self, index: str, keep_alive: str, **kwargs: Any) -> dict:
+        await self._network("open_point_in_time")
+        return {"id": f"pit-{random.getrandbits(32)}"}
+
+    async def close_point_in_time(self, body: dict | None = None, **kwargs: Any) -> dict:
+        await self._network("close_point_in_time")
+        return {"succeeded": True}
+
+    async def _network(self, operation: str) -> None:
+        self.requests[operation] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _match(self, film: dict, query: dict | None) -> bool:
+        if not query or "match_all" in query:
+            return True
+        if "bool" in query:
+            clauses = query["bool"].get("must", []) + query["bool"].get("filter", [])
+            return all(self._match(film, clause) for clause in clauses)
+        if "terms" in query:
+            (field, values), = query["terms"].items()
+            value = film.get(field)
+            return any(item in values for item in (value if isinstance(value, list) else [value]))
+        if "fuzzy" in query:
+            (field, options), = query["fuzzy"].items()
+            return options["value"].lower() in film[field].lower()
+        raise NotImplementedError(query)
+
+    @staticmethod
+    def _sort_keys(sort: list) -> tuple[tuple[str, str], ...]:
+        keys = []
+        for item in sort:
+            if isinstance(item, str):
+                keys.append((item, "asc"))
+                continue
+            (field, order), = item.items()
+            keys.append((field, order["order"] if isinstance(order, dict) else order))
+        return tuple(keys)
+
+    def _sorted_films(self, keys: tuple[tuple[str, str], ...]) -> list[dict]:
+        if keys not in self._sorted:
+            films = list(self.films.values())
+            for field, order in reversed(keys):
+                if field not in ("_score", "_shard_doc"):
+                    # Документы без значения идут последними при любом направлении, как в Elasticsearch
+                    films.sort(key=lambda film: (film.get(field) is not None, film.get(field) or 0),
+                               reverse=order == "desc")
+                    films.sort(key=lambda film: film.get(field) is None)
+            self._sorted[keys] = films
+        return self._sorted[keys]
+
+    def _sort_values(self, film: dict, keys: tuple[tuple[str, str], ...]) -> list:
+        special = {"_score": 1.0, "_shard_doc": self._positions[film[ID_FIELD]]}
+        return [special[field] if field in special else film.get(field) for field, _ in keys]
+
+    @staticmethod
+    def _project(film: dict, source: Any) -> dict:
+        if isinstance(source, dict):
+            source = source.get("includes")
+        if not source or source is True:
+            return film
+        return {field: film[field] for field in source if field in film}
+
+    def _aggregate(self, aggs: dict) -> dict:
+        (name, aggregation), = aggs.items()
+        field, size = aggregation["terms"]["field"], aggregation["terms"]["size"]
+        counts = Counter(value for film in self.films.values() for value in film[field]).most_common()
+        return {
+            "took": 1,
+            "hits": {"hits": []},
+            "aggregations": {name: {
+                "buckets": [{"key": key, "doc_count": count} for key, count in counts[:size]],
+                "sum_other_doc_count": sum(count for _, count in counts[size:]),
+            }},
+        }
+
+    def _suggest(self, suggest: dict, source: Any) -> dict:
+        (name, options), = suggest.items()
+        prefix, size = options["prefix"], options["completion"]["size"]
+        found = [film for film in self.films.values() if film["title"].lower().startswith(prefix)][:size]
+        return {
+            "took": 1,
+            "hits": {"hits": []},
+            "suggest": {name: [{"options": [
+                {"text": film["title"], "_source": self._project(film, source)} for film in found
+            ]}]},
+        }
@@ -0,0 +1,112 @@
+import math
+from http import HTTPStatus
+from typing import Collection
+
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+
+from core.config import settings
+from core.messages import STORAGE_UNAVAILABLE, TOO_MANY_SNAPSHOTS
+from core.tracing import span
+from services.breaker import CircuitOpenError
+from services.elastic import PointInTimeLimitError
+from services.policy import CacheEntry
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Кодировки сжатия в порядке предпочтения сервера при равном q клиента
+PREFERRED_ENCODINGS = ("br", "gzip")
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Weak comparison of the If-None-Match header with the ETag of the response.
+
+    Proxies that compress responses (e.g. nginx gzip) turn strong ETags into weak
+    ones, so the W/ prefix is ignored on both sides.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def negotiate_encoding(accept_encoding: str | None, available: Collection[str]) -> str | None:
+    """
+    Picks the content coding of the response from the Accept-Encoding header.
+
+    Returns the available coding with the highest q value (server preference breaks ties),
+    or None if the identity body should be sent.
+    """
+    if not accept_encoding or not available:
+        return None
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        weight = 1.0
+        name, _, value = params.partition("=")
+        if name.strip() == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                continue
+        weights[coding.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for coding in PREFERRED_ENCODINGS:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if coding in available and weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def cached_json_response(request: Request, entry: CacheEntry) -> Response:
+    """
+    Returns the cached JSON body as is, without model validation or re-serialization.
+
+    The body is sent in the precompressed variant accepted by the client, if the entry
+    has one, so nothing is compressed per request. The response carries the ETag of
+    the variant and may be cached by clients and proxies for HTTP_CACHE_MAX_AGE seconds.
+    A request whose If-None-Match matches the ETag gets 304 Not Modified without a body.
+    The cursor of the next page, if any, is returned in the X-Next-Cursor header.
+    """
+    with span("encode"):
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), entry.variants.keys())
+        # Разные кодировки — разные представления, поэтому и сильные ETag у них разные
+        etag = f'{entry.etag[:-1]}-{encoding}"' if encoding else entry.etag
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={settings.http_cache_max_age}",
+            "Vary": "Accept-Encoding",
+        }
+        if cursor := entry.meta.get("cursor"):
+            headers[NEXT_CURSOR_HEADER] = cursor
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(content=entry.variants[encoding], media_type="application/json", headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def storage_unavailable_response(request: Request, error: CircuitOpenError) -> Response:
+    """
+    503 Service Unavailable for requests the circuit breaker rejected and no stale copy could answer,
+    with Retry-After set to the time until the breaker lets probing requests through.
+    """
+    return ORJSONResponse(
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        content={"detail": STORAGE_UNAVAILABLE},
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+    )
+
+
+async def snapshot_limit_response(request: Request, error: PointInTimeLimitError) -> Response:
+    """
+    429 Too Many Requests for snapshot (pit=true) requests over the limit of points in time of the worker.
+    """
+    return ORJSONResponse(
+        status_code=HTTPStatus.TOO_MANY_REQUESTS,
+        content={"detail": TOO_MANY_SNAPSHOTS},
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+    )
@@ -1,60 +1,151 @@
 from http import HTTPStatus
-from fastapi import APIRouter, Depends, HTTPException
-from core.messages import FILM_NOT_FOUND
-from queries.film import FilmFilter, SearchFilmFilter
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from api.responses import cached_json_response
+from core.messages import FILM_NOT_FOUND, GENRES_NOT_FOUND
+from queries.film import FilmBatchQuery, FilmFilter, SearchFilmFilter, SuggestFilmQuery
 from services.film import FilmService, get_film_service
-from models.film import Film
+from models.film import Film, FilmShort
+from models.genre import Genre
+from services.genres import GenreRegistry, get_film_genres
 
 router = APIRouter()
 
-@router.get("/", response_model=list[Film])
+
+@router.get("/", response_model=list[FilmShort])
 async def all_films(
+        request: Request,
         film_service: FilmService = Depends(get_film_service),
         film_filter: FilmFilter = Depends(),
-) -> list[Film]:
+        genres: GenreRegistry | None = Depends(get_film_genres),
+) -> Response:
     """
     Returns all films with pagination.
 
     - **film_service**: An instance of FilmService used to interact with film data.
+    - **genres**: The genre dictionary of the worker; unknown genres are answered without a search.
     - **film_filter**: Optional filter parameters for pagination and filtering films.
+      Pass the X-Next-Cursor header of a page as `cursor` to get the next one.
+      Pass `fields` to get other film fields than uuid, title and imdb_rating.
 
     ### Responses
     - **200 OK**: Returns a list of films.
-    - **404 Not Found**: If no films are found based on the provided filter.
+    - **304 Not Modified**: If the list did not change since the ETag passed in If-None-Match.
+    - **404 Not Found**: If no films are found based on the provided filter, e.g. for an unknown genre.
+    - **422 Unprocessable Entity**: If the parameters are invalid or the snapshot of the cursor expired.
+    - **429 Too Many Requests**: If too many snapshots (`pit`) were opened recently.
     """
-    films = await film_service.get_all(film_filter)
+    if film_filter.genre and genres and not await genres.knows(film_filter.genre):
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FILM_NOT_FOUND)
+
+    films = await film_service.get_all_raw(film_filter)
 
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FILM_NOT_FOUND)
 
-    return [Film(**film.model_dump()) for film in films]
+    return cached_json_response(request, films)
 
 
-@router.get("/search", response_model=list[Film])
+@router.get("/search", response_model=list[FilmShort])
 async def search_films(
+        request: Request,
         film_service: FilmService = Depends(get_film_service),
         film_filter: SearchFilmFilter = Depends(),
-) -> list[Film]:
+        genres: GenreRegistry | None = Depends(get_film_genres),
+) -> Response:
     """
     Returns all films found by fuzzy search with pagination.
 
     - **film_service**: An instance of FilmService used to interact with film data.
+    - **genres**: The genre dictionary of the worker; unknown genres are answered without a search.
     - **film_filter**: Optional filter parameters for fuzzy search and pagination.
+      Pass the X-Next-Cursor header of a page as `cursor` to get the next one.
+      Pass `fields` to get other film fields than uuid, title and imdb_rating.
 
     ### Responses
     - **200 OK**: Returns a list of films that match the search criteria.
-    - **404 Not Found**: If no films are found based on the search criteria.
+    - **304 Not Modified**: If the list did not change since the ETag passed in If-None-Match.
+    - **404 Not Found**: If no films are found based on the search criteria, e.g. for an unknown genre.
+    - **422 Unprocessable Entity**: If the parameters are invalid or the snapshot of the cursor expired.
+    - **429 Too Many Requests**: If too many snapshots (`pit`) were opened recently.
+    """
+    if film_filter.genre and genres and not await genres.knows(film_filter.genre):
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FILM_NOT_FOUND)
+
+    films = await film_service.get_all_raw(film_filter)
+
+    if not films:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FILM_NOT_FOUND)
+
+    return cached_json_response(request, films)
+
+
+@router.get("/genres", response_model=list[Genre])
+async def film_genres(request: Request, genres: GenreRegistry = Depends(get_film_genres)) -> Response:
+    """
+    Returns all genres with the number of films in each, most popular first.
+
+    - **genres**: The genre dictionary of the worker, refreshed in the background.
+
+    ### Responses
+    - **200 OK**: Returns a list of genres.
+    - **304 Not Modified**: If the genres did not change since the ETag passed in If-None-Match.
+    - **404 Not Found**: If the genres could not be loaded.
+    """
+    entry = await genres.get()
+    if not entry:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=GENRES_NOT_FOUND)
+
+    return cached_json_response(request, entry)
+
+
+@router.get("/suggest", response_model=list[FilmShort])
+async def suggest_films(
+        request: Request,
+        film_service: FilmService = Depends(get_film_service),
+        suggest_query: SuggestFilmQuery = Depends(),
+) -> Response:
+    """
+    Returns films whose titles start with the typed prefix, for search-as-you-type.
+
+    - **film_service**: An instance of FilmService used to interact with film data.
+    - **suggest_query**: The prefix typed so far and the number of suggestions.
+
+    ### Responses
+    - **200 OK**: Returns a list of suggested films, empty if no title starts with the prefix.
+    - **304 Not Modified**: If the suggestions did not change since the ETag passed in If-None-Match.
+    """
+    return cached_json_response(request, await film_service.get_suggestions_raw(suggest_query))
+
+
+@router.post("/batch", response_model=list[Film])
+async def films_batch(
+        batch: FilmBatchQuery,
+        film_service: FilmService = Depends(get_film_service),
+) -> Response:
     """
-    films = await film_service.get_all(film_filter)
+    Returns several films by their identifiers in one call.
+
+    - **batch**: Identifiers of the films to retrieve.
+    - **film_service**: An instance of FilmService used to interact with film data.
+
+    ### Responses
+    - **200 OK**: Returns the found films in the requested order; unknown identifiers are skipped.
+    - **404 Not Found**: If none of the films exist.
+    """
+    films = await film_service.get_raw_by_ids(batch.ids)
 
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FILM_NOT_FOUND)
 
-    return [Film(**film.model_dump()) for film in films]
+    return Response(content=b"[" + b",".join(film.body for film in films) + b"]", media_type="application/json")
 
 
 @router.get("/{film_id}", response_model=Film)
-async def film_details(film_id: str, film_service: FilmService = Depends(get_film_service)) -> Film:
+async def film_details(
+        film_id: str,
+        request: Request,
+        film_service: FilmService = Depends(get_film_service),
+) -> Response:
     """
     Returns the film by identifier.
 
@@ -63,10 +154,11 @@ async def film_details(film_id: str, film_service: FilmService = Depends(get_fil
 
     ### Responses
     - **200 OK**: Returns the details of the specified film.
+    - **304 Not Modified**: If the film did not change since the ETag passed in If-None-Match.
     - **404 Not Found**: If the film with the given ID does not exist.
     """
-    film = await film_service.get_by_id(film_id)
+    film = await film_service.get_raw_by_id(film_id)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FILM_NOT_FOUND)
 
-    return Film(**film.model_dump())
+    return cached_json_response(request, film)
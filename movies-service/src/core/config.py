@@ -1,4 +1,5 @@
 from logging import config as logging_config
+from typing import Literal
 from pydantic import Field
 from pydantic_settings import BaseSettings
 from core.logger import LOGGING
@@ -15,6 +16,120 @@ class Settings(BaseSettings):
     elastic_host: str = Field('elasticsearch', alias='ELASTIC_HOST')
     elastic_port: int = Field(9200, alias='ELASTIC_PORT')
     elastic_movies_index: str = Field('movies', alias='ELASTIC_MOVIES_INDEX')
+    # Узлы через запятую (http://es1:9200,http://es2:9200); если не заданы - один узел из настроек выше
+    elastic_hosts: str = Field('', alias='ELASTIC_HOSTS')
+    # Пул соединений на узел, таймаут запроса в секундах, сжатие запросов и повторы при сбоях узла
+    elastic_connections_per_node: int = Field(25, alias='ELASTIC_CONNECTIONS_PER_NODE')
+    elastic_request_timeout: float = Field(10.0, alias='ELASTIC_REQUEST_TIMEOUT')
+    elastic_http_compress: bool = Field(False, alias='ELASTIC_HTTP_COMPRESS')
+    elastic_max_retries: int = Field(3, alias='ELASTIC_MAX_RETRIES')
+    elastic_retry_on_timeout: bool = Field(True, alias='ELASTIC_RETRY_ON_TIMEOUT')
+    # Дублирование чтения, не ответившего за перцентиль недавних задержек (не быстрее min_delay),
+    # не больше чем для доли budget всех чтений
+    elastic_hedge_enabled: bool = Field(False, alias='ELASTIC_HEDGE_ENABLED')
+    elastic_hedge_percentile: float = Field(95.0, alias='ELASTIC_HEDGE_PERCENTILE')
+    elastic_hedge_min_delay_ms: int = Field(10, alias='ELASTIC_HEDGE_MIN_DELAY_MS')
+    elastic_hedge_budget: float = Field(0.05, alias='ELASTIC_HEDGE_BUDGET')
+    # Сколько point in time (pit=true) воркер может открыть за минуту, 0 - без ограничения
+    elastic_pit_max_opens: int = Field(100, alias='ELASTIC_PIT_MAX_OPENS')
+    # Размыкатель цепи: после N сбоев подряд запросы к Elasticsearch не отправляются reset_timeout секунд,
+    # затем пропускается до half_open_max_calls пробных запросов, success_threshold удачных проб замыкают цепь
+    elastic_breaker_enabled: bool = Field(True, alias='ELASTIC_BREAKER_ENABLED')
+    elastic_breaker_failure_threshold: int = Field(5, alias='ELASTIC_BREAKER_FAILURE_THRESHOLD')
+    elastic_breaker_reset_timeout: float = Field(30.0, alias='ELASTIC_BREAKER_RESET_TIMEOUT')
+    elastic_breaker_half_open_max_calls: int = Field(1, alias='ELASTIC_BREAKER_HALF_OPEN_MAX_CALLS')
+    elastic_breaker_success_threshold: int = Field(2, alias='ELASTIC_BREAKER_SUCCESS_THRESHOLD')
+    # Запрос дольше этого числа секунд (с повторами и дублированием) прерывается и считается сбоем
+    elastic_breaker_call_timeout: float = Field(5.0, alias='ELASTIC_BREAKER_CALL_TIMEOUT')
+
+    # Максимальное число фильмов в одном запросе /films/batch
+    films_batch_max_size: int = Field(100, alias='FILMS_BATCH_MAX_SIZE')
+    # Трассировка: доля запросов со спанами и куда их выгружать (none, file, otel)
+    tracing_sample_rate: float = Field(0.0, alias='TRACING_SAMPLE_RATE')
+    tracing_exporter: Literal['none', 'file', 'otel'] = Field('none', alias='TRACING_EXPORTER')
+    tracing_file: str = Field('/tmp/movies-traces.jsonl', alias='TRACING_FILE')
+    # Словарь жанров: сколько жанров агрегировать и как часто обновлять
+    genres_max_size: int = Field(1_000, alias='GENRES_MAX_SIZE')
+    genres_refresh_interval: float = Field(60.0, alias='GENRES_REFRESH_INTERVAL')
+    # Фильтр Блума идентификаторов фильмов: на неизвестные id сразу 404, без Redis и Elasticsearch
+    known_ids_enabled: bool = Field(True, alias='KNOWN_IDS_ENABLED')
+    known_ids_error_rate: float = Field(0.001, alias='KNOWN_IDS_ERROR_RATE')
+    known_ids_refresh_interval: float = Field(300.0, alias='KNOWN_IDS_REFRESH_INTERVAL')
+    # Доля запросов, ключи кэша которых учитываются в горячих ключах, и затухание их счётчиков
+    hot_keys_sample_rate: float = Field(0.05, alias='HOT_KEYS_SAMPLE_RATE')
+    hot_keys_flush_interval: float = Field(10.0, alias='HOT_KEYS_FLUSH_INTERVAL')
+    hot_keys_half_life: float = Field(600.0, alias='HOT_KEYS_HALF_LIFE')
+    hot_keys_max_size: int = Field(2_000, alias='HOT_KEYS_MAX_SIZE')
+    # Прогрев кэша самыми горячими ключами при старте воркера, до приёма запросов
+    cache_warmup_enabled: bool = Field(True, alias='CACHE_WARMUP_ENABLED')
+    cache_warmup_size: int = Field(200, alias='CACHE_WARMUP_SIZE')
+    cache_warmup_concurrency: int = Field(8, alias='CACHE_WARMUP_CONCURRENCY')
+    cache_warmup_timeout: float = Field(20.0, alias='CACHE_WARMUP_TIMEOUT')
+    # Реплика каталога в памяти воркера для списков с фильтром по жанру и сортировкой по рейтингу
+    replica_enabled: bool = Field(False, alias='REPLICA_ENABLED')
+    replica_refresh_interval: float = Field(30.0, alias='REPLICA_REFRESH_INTERVAL')
+    # Топ фильмов по рейтингу (в целом и по популярным жанрам) в sorted set Redis
+    rankings_enabled: bool = Field(True, alias='RANKINGS_ENABLED')
+    rankings_size: int = Field(100, alias='RANKINGS_SIZE')
+    rankings_genres_count: int = Field(20, alias='RANKINGS_GENRES_COUNT')
+    rankings_refresh_interval: float = Field(60.0, alias='RANKINGS_REFRESH_INTERVAL')
+    films_suggest_max_size: int = Field(10, alias='FILMS_SUGGEST_MAX_SIZE')
+    # Локальный кэш подсказок по префиксу названия в каждом воркере
+    suggest_cache_max_entries: int = Field(5_000, alias='SUGGEST_CACHE_MAX_ENTRIES')
+    suggest_cache_max_bytes: int = Field(4 * 1024 * 1024, alias='SUGGEST_CACHE_MAX_BYTES')
+    suggest_cache_ttl: int = Field(60, alias='SUGGEST_CACHE_TTL')
+    # Сколько секунд клиенты и прокси могут отдавать ответ без перепроверки по ETag
+    http_cache_max_age: int = Field(60, alias='HTTP_CACHE_MAX_AGE')
+    # Сжатые варианты ответов (br, gzip) создаются один раз при записи в кэш
+    response_compression: bool = Field(True, alias='RESPONSE_COMPRESSION')
+    response_compression_min_size: int = Field(512, alias='RESPONSE_COMPRESSION_MIN_SIZE')
+    response_gzip_level: int = Field(6, alias='RESPONSE_GZIP_LEVEL')
+    response_brotli_quality: int = Field(5, alias='RESPONSE_BROTLI_QUALITY')
+
+    # redis - только общий кэш, tiered - локальный LRU/TTL кэш воркера перед Redis
+    cache_backend: Literal['redis', 'tiered'] = Field('tiered', alias='CACHE_BACKEND')
+    memory_cache_max_entries: int = Field(10_000, alias='MEMORY_CACHE_MAX_ENTRIES')
+    memory_cache_max_bytes: int = Field(64 * 1024 * 1024, alias='MEMORY_CACHE_MAX_BYTES')
+    # Записи локального кэша вытесняются точечно через канал инвалидации, поэтому TTL может быть большим
+    memory_cache_ttl: int = Field(300, alias='MEMORY_CACHE_TTL')
+    # Допуск в кэш по частоте запросов ключа (TinyLFU): локальный уровень вытесняет запись, только
+    # если новый ключ запрашивается чаще вытесняемого, в Redis пишутся ключи, запрошенные не реже N раз
+    # в одном воркере или давшие N промахов во всех воркерах за WINDOW секунд
+    cache_admission_enabled: bool = Field(True, alias='CACHE_ADMISSION_ENABLED')
+    cache_admission_shared_min_frequency: int = Field(2, alias='CACHE_ADMISSION_SHARED_MIN_FREQUENCY')
+    cache_admission_shared_window: int = Field(600, alias='CACHE_ADMISSION_SHARED_WINDOW')
+    cache_invalidation_channel: str = Field('movies:invalidate', alias='CACHE_INVALIDATION_CHANNEL')
+    # Формат значений в Redis, кроме bytes. Сервис кэширует только упакованные ответы (bytes), они хранятся
+    # как есть, поэтому CACHE_CODEC действует лишь на значения других типов; сжатие действует на все значения
+    cache_codec: Literal['orjson', 'msgpack'] = Field('orjson', alias='CACHE_CODEC')
+    cache_compression: Literal['none', 'zstd'] = Field('none', alias='CACHE_COMPRESSION')
+    cache_compression_min_size: int = Field(1024, alias='CACHE_COMPRESSION_MIN_SIZE')
+    cache_compression_level: int = Field(3, alias='CACHE_COMPRESSION_LEVEL')
+
+    # ttl - значение живёт до истечения ключа, swr - после мягкого TTL отдаётся устаревшее
+    # значение и обновляется в фоне, ключ живёт до жёсткого TTL
+    cache_mode: Literal['ttl', 'swr'] = Field('ttl', alias='CACHE_MODE')
+    cache_ttl: int = Field(300, alias='CACHE_TTL')
+    # Сколько помнить, что фильма нет, 0 - не кэшировать отсутствие
+    cache_negative_ttl: int = Field(30, alias='CACHE_NEGATIVE_TTL')
+    # Сколько хранить в Redis копию ответа для отдачи при недоступности Elasticsearch, 0 - без копий.
+    # Копии хранятся для ключей, допущенных в Redis, кроме поиска по тексту и страниц по курсору
+    cache_stale_ttl: int = Field(6 * 60 * 60, alias='CACHE_STALE_TTL')
+    cache_soft_ttl: int = Field(300, alias='CACHE_SOFT_TTL')
+    cache_hard_ttl: int = Field(900, alias='CACHE_HARD_TTL')
+    # Коэффициент вероятностного раннего обновления (XFetch), 0 - отключено
+    cache_xfetch_beta: float = Field(1.0, alias='CACHE_XFETCH_BETA')
+    # Относительный разброс TTL, чтобы одновременно записанные ключи не истекали вместе
+    cache_ttl_jitter: float = Field(0.1, alias='CACHE_TTL_JITTER')
+
+    # Как долго воркер использует прочитанное поколение индекса, прежде чем перечитать его
+    cache_generation_ttl: float = Field(5.0, alias='CACHE_GENERATION_TTL')
+
+    # Блокировка в Redis, чтобы ключ после промаха перестраивал только один воркер кластера
+    cache_lock_enabled: bool = Field(False, alias='CACHE_LOCK_ENABLED')
+    cache_lock_ttl_ms: int = Field(5000, alias='CACHE_LOCK_TTL_MS')
+    cache_lock_wait_ms: int = Field(3000, alias='CACHE_LOCK_WAIT_MS')
+    cache_lock_poll_ms: int = Field(50, alias='CACHE_LOCK_POLL_MS')
 
 
 # Создание экземпляра настроек
@@ -1 +1,4 @@
-FILM_NOT_FOUND = "Film not found"
\ No newline at end of file
+FILM_NOT_FOUND = "Film not found"
+GENRES_NOT_FOUND = "Genres not found"
+STORAGE_UNAVAILABLE = "Storage temporarily unavailable"
+TOO_MANY_SNAPSHOTS = "Too many snapshots opened, retry later"
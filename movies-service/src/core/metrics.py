@@ -0,0 +1,137 @@
+import os
+import time
+from typing import Any, Awaitable, TypeVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, \
+    generate_latest, multiprocess
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from core.tracing import span
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Метрики собираются в каждом воркере gunicorn; при заданном PROMETHEUS_MULTIPROC_DIR
+# воркеры пишут их в общий каталог, а /metrics суммирует значения всех воркеров.
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being processed", ["method"], multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by tier and result", ["tier", "result"])
+ELASTIC_REQUEST_SECONDS = Histogram(
+    "elastic_request_duration_seconds", "Wall time of Elasticsearch requests", ["operation"],
+)
+ELASTIC_TOOK_SECONDS = Histogram(
+    "elastic_took_seconds", "Time Elasticsearch reports spending on a search (took)", ["operation"],
+)
+ELASTIC_HEDGES = Counter(
+    "elastic_hedged_requests_total", "Duplicate Elasticsearch requests sent after the hedging delay, and won by them",
+    ["operation", "outcome"],
+)
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes, by the state entered", ["name", "state"],
+)
+STALE_RESPONSES = Counter(
+    "stale_responses_total", "Responses served from the stale copy while the storage was unavailable", ["index"],
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_duration_seconds", "Latency of Redis commands and pipelines", ["command"],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0),
+)
+SERIALIZATION_SECONDS = Histogram(
+    "serialization_duration_seconds", "Time spent encoding response bodies", ["kind"],
+    buckets=(.00005, .0001, .00025, .0005, .001, .0025, .005, .01, .025, .05),
+)
+
+T = TypeVar("T")
+
+
+async def observe_elastic(operation: str, request: Awaitable[T]) -> T:
+    """
+    Awaits an Elasticsearch request, recording its wall time and, for searches, the time
+    Elasticsearch itself reports (`took`); the difference is network and client overhead.
+    """
+    started = time.perf_counter()
+    try:
+        with span("elastic", operation=operation):
+            response = await request
+    finally:
+        ELASTIC_REQUEST_SECONDS.labels(operation).observe(time.perf_counter() - started)
+    if "took" in response:
+        ELASTIC_TOOK_SECONDS.labels(operation).observe(response["took"] / 1000)
+    return response
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_SECONDS.labels("PIPELINE").observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(Redis):
+    """
+    Redis client recording the latency of every command and pipeline.
+    """
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Any = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency per route template and the
+    number of requests in flight; it does not wrap the response body, so streaming
+    and background tasks are unaffected.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            # Шаблон пути, а не сам путь: иначе каждый id фильма стал бы отдельным рядом
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(method, route.path if route else "unmatched", str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Metrics in the Prometheus text format, summed over all workers in multiprocess mode.
+    """
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SERVER_TIMING_HEADER = b"server-timing"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    duration: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    """
+    Spans of one request. Only sampled requests record spans; the others report
+    just the total time in Server-Timing.
+    """
+    name: str
+    sampled: bool
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    start: float = field(default_factory=time.perf_counter)
+    wall_start: float = field(default_factory=time.time)
+    spans: list[Span] = field(default_factory=list)
+
+    def server_timing(self) -> str:
+        durations: dict[str, float] = {}
+        for span in self.spans:
+            durations[span.name] = durations.get(span.name, 0.0) + span.duration
+        durations["total"] = time.perf_counter() - self.start
+        return ", ".join(f"{name};dur={duration * 1000:.2f}" for name, duration in durations.items())
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+class _SpanContext:
+    __slots__ = ("trace", "span")
+
+    def __init__(self, trace: Trace, name: str, attributes: dict[str, Any]):
+        self.trace = trace
+        self.span = Span(name, 0.0, attributes=attributes)
+
+    def __enter__(self) -> Span:
+        self.span.start = time.perf_counter()
+        return self.span
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.span.duration = time.perf_counter() - self.span.start
+        self.trace.spans.append(self.span)
+
+
+class _NoopSpanContext:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpanContext()
+
+
+def span(name: str, **attributes: Any) -> _SpanContext | _NoopSpanContext:
+    """
+    Measures a stage of the current request, e.g. `with span("elastic", operation="search"):`.
+
+    Outside a sampled request it returns a shared no-op context, so instrumented code
+    costs one context variable lookup.
+    """
+    trace = _current_trace.get()
+    if trace is None or not trace.sampled:
+        return _NOOP_SPAN
+    return _SpanContext(trace, name, attributes)
+
+
+class SpanExporter(Protocol):
+    def export(self, trace: Trace) -> None:
+        ...
+
+    async def shutdown(self) -> None:
+        ...
+
+
+class FileSpanExporter:
+    """
+    Appends sampled traces to a file as JSON lines, for local use.
+
+    Traces are buffered and written from a thread, so the event loop never waits for the disk.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100):
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer: list[bytes] = []
+
+    def export(self, trace: Trace) -> None:
+        self._buffer.append(orjson.dumps({
+            "trace_id": trace.trace_id,
+            "name": trace.name,
+            "start": trace.wall_start,
+            "duration_ms": round((time.perf_counter() - trace.start) * 1000, 3),
+            "spans": [
+                {
+                    "name": span.name,
+                    "offset_ms": round((span.start - trace.start) * 1000, 3),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    **span.attributes,
+                }
+                for span in trace.spans
+            ],
+        }))
+        if len(self._buffer) >= self.batch_size:
+            asyncio.get_running_loop().run_in_executor(None, self._write, self._take())
+
+    async def shutdown(self) -> None:
+        await asyncio.to_thread(self._write, self._take())
+
+    def _take(self) -> list[bytes]:
+        lines, self._buffer = self._buffer, []
+        return lines
+
+    def _write(self, lines: list[bytes]) -> None:
+        if lines:
+            with open(self.path, "ab") as file:
+                file.write(b"\n".join(lines) + b"\n")
+
+
+class OTelSpanExporter:
+    """
+    Re-creates sampled traces as OpenTelemetry spans with their recorded timings,
+    so they go to whatever exporter the OpenTelemetry SDK is configured with
+    (e.g. OTLP via the OTEL_EXPORTER_OTLP_* environment variables).
+    Requires the opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http packages.
+    """
+
+    def __init__(self, service_name: str):
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        self._otel_trace = otel_trace
+        self._provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        self._provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        self._tracer = self._provider.get_tracer(__name__)
+
+    def export(self, trace: Trace) -> None:
+        # perf_counter не связан с часами, поэтому смещения считаем от времени начала запроса
+        def timestamp(moment: float) -> int:
+            return int((trace.wall_start + moment - trace.start) * 1e9)
+
+        root = self._tracer.start_span(trace.name, start_time=timestamp(trace.start))
+        context = self._otel_trace.set_span_in_context(root)
+        for span in trace.spans:
+            child = self._tracer.start_span(
+                span.name, context=context, start_time=timestamp(span.start), attributes=span.attributes
+            )
+            child.end(end_time=timestamp(span.start + span.duration))
+        root.end(end_time=timestamp(time.perf_counter()))
+
+    async def shutdown(self) -> None:
+        await asyncio.to_thread(self._provider.shutdown)
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware starting a trace per request and reporting its stages in
+    the Server-Timing response header.
+
+    A `sample_rate` share of requests records spans and exports them; the rest
+    only report the total time.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 0.0, exporter: SpanExporter | None = None):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = Trace(f"{scope['method']} {scope['path']}", random.random() < self.sample_rate)
+        token = _current_trace.set(trace)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((SERVER_TIMING_HEADER, trace.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            if trace.sampled and self.exporter:
+                try:
+                    self.exporter.export(trace)
+                except Exception:
+                    logger.exception("Failed to export trace %s", trace.trace_id)
+
+
+def create_exporter(kind: str, path: str, service_name: str) -> SpanExporter | None:
+    if kind == "file":
+        return FileSpanExporter(os.path.expanduser(path))
+    if kind == "otel":
+        return OTelSpanExporter(service_name)
+    return None
@@ -0,0 +1,47 @@
+from redis.asyncio import Redis
+
+from core.config import settings
+from services.abstract import AbstractCache
+from services.codecs import CacheCodec, MsgpackCodec, OrjsonCodec
+from services.memory import MemoryCache
+from services.policy import entry_expiry, entry_tags
+from services.redis import RedisCache
+from services.sketch import FrequencySketch
+from services.tiered import TieredCache
+
+cache: AbstractCache | None = None
+
+
+def init_cache(client: Redis) -> AbstractCache:
+    """Создание кэша воркера: Redis или локальный LRU/TTL уровень перед Redis."""
+    global cache
+    codec = CacheCodec(
+        MsgpackCodec() if settings.cache_codec == 'msgpack' else OrjsonCodec(),
+        compress=settings.cache_compression == 'zstd',
+        min_size=settings.cache_compression_min_size,
+        level=settings.cache_compression_level,
+    )
+    cache = shared = RedisCache(client, codec)
+    if settings.cache_backend == 'tiered':
+        memory = MemoryCache(
+            max_entries=settings.memory_cache_max_entries,
+            max_bytes=settings.memory_cache_max_bytes,
+            max_ttl=settings.memory_cache_ttl,
+            admission=FrequencySketch(width=settings.memory_cache_max_entries * 4)
+            if settings.cache_admission_enabled else None,
+        )
+        cache = TieredCache(
+            memory,
+            cache,
+            tags_of=entry_tags,
+            shared_min_frequency=settings.cache_admission_shared_min_frequency,
+            expiry_of=entry_expiry,
+            count_misses=shared.count_misses,
+            shared_window=settings.cache_admission_shared_window,
+        )
+    return cache
+
+
+# Функция понадобится при внедрении зависимостей
+async def get_cache() -> AbstractCache:
+    return cache
@@ -1,7 +1,25 @@
+from typing import Any
+
 from elasticsearch import AsyncElasticsearch
 
+from core.config import settings
+
 es: AsyncElasticsearch | None = None
 
+
+def client_options() -> dict[str, Any]:
+    """Параметры клиента Elasticsearch из настроек: узлы, пул соединений, таймаут, сжатие и повторы."""
+    hosts = [host.strip() for host in settings.elastic_hosts.split(',') if host.strip()]
+    return {
+        'hosts': hosts or [f'{settings.elastic_schema}{settings.elastic_host}:{settings.elastic_port}'],
+        'connections_per_node': settings.elastic_connections_per_node,
+        'request_timeout': settings.elastic_request_timeout,
+        'http_compress': settings.elastic_http_compress,
+        'max_retries': settings.elastic_max_retries,
+        'retry_on_timeout': settings.elastic_retry_on_timeout,
+    }
+
+
 # Функция понадобится при внедрении зависимостей
 async def get_elastic() -> AsyncElasticsearch:
     return es
\ No newline at end of file
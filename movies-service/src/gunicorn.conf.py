@@ -0,0 +1,22 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+bind = "0.0.0.0:8000"
+workers = 4
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def on_starting(server):
+    # Файлы метрик прошлого запуска искажали бы суммы по воркерам
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Gauge завершившегося воркера больше не учитываются в сумме
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
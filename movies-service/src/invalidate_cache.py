@@ -0,0 +1,48 @@
+import argparse
+import asyncio
+
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis
+
+from core.config import settings
+from db.elastic import client_options
+from services.generation import IndexGeneration
+from services.invalidation import publish_film_invalidation
+from services.redis import RedisCache
+
+
+async def bump_generation() -> None:
+    """Сдвиг поколения индекса фильмов: все записи кэша становятся недоступны и истекают сами."""
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    elastic = AsyncElasticsearch(**client_options())
+    try:
+        generation = IndexGeneration(elastic, redis, settings.elastic_movies_index, settings.cache_generation_ttl)
+        counter = await generation.bump()
+        print(f"Поколение индекса {settings.elastic_movies_index}: {counter}")
+    finally:
+        await redis.close()
+        await elastic.close()
+
+
+async def invalidate_films(uuids: list[str], genres: list[str]) -> None:
+    """Точечное вытеснение изменённых фильмов из общего кэша и локальных кэшей всех воркеров."""
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    try:
+        await publish_film_invalidation(redis, RedisCache(redis), settings.cache_invalidation_channel, uuids, genres)
+        print(f"Инвалидировано фильмов: {len(uuids)}, жанров: {len(genres)}")
+    finally:
+        await redis.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Инвалидация кэша фильмов (выполняется в контейнере movies-service). "
+                    "Без аргументов сдвигает поколение индекса после его перезагрузки."
+    )
+    parser.add_argument("--uuid", action="append", default=[], help="uuid изменённого фильма (можно повторять)")
+    parser.add_argument("--genre", action="append", default=[], help="жанр изменённого фильма (можно повторять)")
+    args = parser.parse_args()
+    if args.uuid or args.genre:
+        asyncio.run(invalidate_films(args.uuid, args.genre))
+    else:
+        asyncio.run(bump_generation())
@@ -2,21 +2,75 @@ from contextlib import asynccontextmanager
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
-from redis.asyncio import Redis
 
+from api.responses import snapshot_limit_response, storage_unavailable_response
 from api.v1 import films
 from core.config import settings
-from db import elastic, redis
-from routes import health
+from core.metrics import InstrumentedRedis, MetricsMiddleware
+from core.tracing import TracingMiddleware, create_exporter
+from db import cache, elastic, redis
+from routes import health, metrics
+from services.breaker import CircuitOpenError
+from services.elastic import PointInTimeLimitError
+from services.film import (
+    init_film_generation, init_film_hot_keys, init_film_known_ids, init_film_rankings, init_film_replica,
+    init_film_service, warm_film_cache
+)
+from services.genres import init_film_genres
+from services.invalidation import FilmCacheInvalidator
+from services.tiered import TieredCache
+
+
+tracing_exporter = create_exporter(settings.tracing_exporter, settings.tracing_file, 'movies-service')
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis.redis = Redis(host=settings.redis_host, port=settings.redis_port)
-    elastic.es = AsyncElasticsearch(hosts=[f'{settings.elastic_schema}{settings.elastic_host}:{settings.elastic_port}'])
+    redis.redis = InstrumentedRedis(host=settings.redis_host, port=settings.redis_port)
+    elastic.es = AsyncElasticsearch(**elastic.client_options())
+    cache.init_cache(redis.redis)
+    generation = init_film_generation(elastic.es, redis.redis)
+    shared_cache = cache.cache
+    invalidator = None
+    if isinstance(cache.cache, TieredCache):
+        shared_cache = cache.cache.shared
+        invalidator = FilmCacheInvalidator(redis.redis, cache.cache.memory, settings.cache_invalidation_channel)
+        invalidator.start()
+    genres = init_film_genres(elastic.es, shared_cache, generation)
+    genres.start()
+    replica = None
+    if settings.replica_enabled:
+        replica = init_film_replica(elastic.es, redis.redis, generation)
+        replica.start()
+    rankings = None
+    if settings.rankings_enabled and not replica:
+        rankings = init_film_rankings(elastic.es, redis.redis, genres, generation)
+        rankings.start()
+    known_ids = None
+    if settings.known_ids_enabled:
+        known_ids = init_film_known_ids(elastic.es, redis.redis, generation)
+        known_ids.start()
+    hot_keys = init_film_hot_keys(redis.redis)
+    film_service = init_film_service(cache.cache, redis.redis, elastic.es, shared_cache)
+    if settings.cache_warmup_enabled:
+        await warm_film_cache(film_service, hot_keys)
+    hot_keys.start()
 
     yield
 
+    await hot_keys.stop()
+    if known_ids:
+        await known_ids.stop()
+    if rankings:
+        await rankings.stop()
+    if replica:
+        await replica.stop()
+    await genres.stop()
+    if invalidator:
+        await invalidator.stop()
+    await generation.stop()
+    if tracing_exporter:
+        await tracing_exporter.shutdown()
     await redis.redis.close()
     await elastic.es.close()
 
@@ -31,5 +85,12 @@ app = FastAPI(
     root_path="/movies"
 )
 
+app.add_exception_handler(CircuitOpenError, storage_unavailable_response)
+app.add_exception_handler(PointInTimeLimitError, snapshot_limit_response)
+
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware, sample_rate=settings.tracing_sample_rate, exporter=tracing_exporter)
+
 app.include_router(health.router, tags=['health'])
+app.include_router(metrics.router, tags=['metrics'])
 app.include_router(films.router, prefix='/api/v1/films', tags=['films'])
@@ -30,3 +30,18 @@ class Film(BaseModel):
     writers: list
     created: str
     file_link: str | None
+
+
+class FilmShort(BaseModel):
+    """
+    Pydantic model representing a film in lists.
+
+    Attributes:
+    - uuid (str): Идентификатор.
+    - title (str): Заголовок.
+    - imdb_rating (float | None): Рейтинг.
+    """
+
+    uuid: str
+    title: str
+    imdb_rating: float | None
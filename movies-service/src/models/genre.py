@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class Genre(BaseModel):
+    """
+    Pydantic model representing a genre facet.
+
+    Attributes:
+    - name (str): Название жанра.
+    - films_count (int): Количество фильмов жанра.
+    """
+
+    name: str
+    films_count: int
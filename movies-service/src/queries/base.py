@@ -1,15 +1,104 @@
-from typing import Annotated
-from pydantic import BaseModel
+import base64
+import binascii
+from typing import Annotated, Any
+from pydantic import BaseModel, field_validator
 from fastapi import Query
+from fastapi.exceptions import RequestValidationError
+import orjson
+
+
+def query_error(field: str, message: str, value: Any) -> RequestValidationError:
+    """
+    Builds a 422 validation error for a query parameter.
+
+    Filters are instantiated by FastAPI as dependencies, so a plain ValueError raised
+    in their validators would end up as a 500; this error is rendered like any other
+    query validation error.
+    """
+    return RequestValidationError([{"type": "value_error", "loc": ("query", field), "msg": message, "input": value}])
+
+
+def encode_cursor(search_after: list[Any], pit_id: str | None = None) -> str:
+    """
+    Encodes the sort values of the last hit (and the point in time, if any) into an opaque cursor.
+    """
+    payload: dict[str, Any] = {"search_after": search_after}
+    if pit_id:
+        payload["pit_id"] = pit_id
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Raises:
+    - ValueError: If the cursor is malformed.
+    """
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, orjson.JSONDecodeError) as error:
+        raise ValueError("Invalid cursor") from error
+    if not isinstance(payload, dict) or not isinstance(payload.get("search_after"), list):
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload.get("pit_id", ""), str):
+        raise ValueError("Invalid cursor")
+    return payload
 
 
 class BaseFilter(BaseModel):
     """
     Base class for filters with pagination support.
 
+    Pages are addressed either by number or, for deep pagination, by an opaque cursor
+    returned with the previous page; with a cursor, page_number is ignored.
+
     Attributes:
         page_number (Annotated[int | None, Query(gt=0)]): The page number for paginated results.
         page_size (Annotated[int | None, Query(gt=0)]): The number of items per page in paginated results.
+        cursor (Annotated[str | None, Query()]): The cursor of the next page returned with the previous one.
+        pit (Annotated[bool, Query()]): Whether to page over a point-in-time snapshot of the index.
     """
     page_number: Annotated[int | None, Query(gt=0)] = 1
-    page_size: Annotated[int | None, Query(gt=0)] = 10
\ No newline at end of file
+    page_size: Annotated[int | None, Query(gt=0)] = 10
+    cursor: Annotated[str | None, Query()] = None
+    pit: Annotated[bool, Query()] = False
+
+    @field_validator("cursor")
+    @classmethod
+    def parse_cursor(cls, value: str | None) -> dict[str, Any] | None:
+        """
+        Parses the cursor into the search_after values and the point-in-time id.
+
+        Parameters:
+            value (str | None): The opaque cursor.
+
+        Returns:
+            dict[str, Any] | None: The decoded cursor.
+        """
+        if not value:
+            return None
+        try:
+            return decode_cursor(value)
+        except ValueError as error:
+            raise query_error("cursor", str(error), value) from error
+
+    def query_params(self) -> dict[str, str]:
+        """
+        Canonical query parameters of the validated filter.
+
+        Filters selecting the same page have equal parameters however the request
+        spelled them, so the parameters serve as a cache key; passed back to the
+        filter class they rebuild the filter.
+
+        Returns:
+            dict[str, str]: The parameters, without the ones that do not affect the result.
+        """
+        params = {"page_size": str(self.page_size)}
+        if self.cursor:
+            params["cursor"] = encode_cursor(self.cursor["search_after"], self.cursor.get("pit_id"))
+        else:
+            params["page_number"] = str(self.page_number)
+        if self.pit:
+            params["pit"] = "true"
+        return params
@@ -1,10 +1,12 @@
 from enum import Enum
 from typing import Annotated
 
-from pydantic import field_validator
+from pydantic import BaseModel, Field, field_validator
 
 from fastapi import Query
-from queries.base import BaseFilter
+from core.config import settings
+from models.film import Film
+from queries.base import BaseFilter, query_error
 
 
 class SortOptions(str, Enum):
@@ -19,10 +21,13 @@ class FilmFilter(BaseFilter):
     Attributes:
         genre (Annotated[str | None, Query()]): The genre to filter films by.
         sort (Annotated[SortOptions | None, Query()]): The sorting option for films.
+        fields (Annotated[str | None, Query()]): Comma-separated film fields to return instead of the
+            short representation; fields prefixed with "-" are excluded from the full one.
     """
 
     genre: Annotated[str | None, Query()] = None
     sort: Annotated[SortOptions | None, Query()] = None
+    fields: Annotated[str | None, Query()] = None
 
     @field_validator("sort")
     @classmethod
@@ -40,6 +45,42 @@ class FilmFilter(BaseFilter):
             return {value.removeprefix("-"): {"order": "desc" if value.startswith("-") else "asc"}}
         return None
 
+    @field_validator("fields")
+    @classmethod
+    def parse_fields(cls, value: str | None) -> tuple[str, ...] | None:
+        """
+        Parses the field projection into the film fields to return.
+
+        Parameters:
+            value (str | None): Comma-separated field names, either all included or all prefixed with "-".
+
+        Returns:
+            tuple[str, ...] | None: The fields to return in the order of the Film model, always with uuid.
+        """
+        if not value:
+            return None
+        names = {name.strip() for name in value.split(",") if name.strip()}
+        excluded = {name.removeprefix("-") for name in names if name.startswith("-")}
+        if excluded and len(excluded) != len(names):
+            raise query_error("fields", "Fields can't be both included and excluded", value)
+        unknown = (excluded or names) - Film.model_fields.keys()
+        if unknown:
+            raise query_error("fields", f"Unknown fields: {', '.join(sorted(unknown))}", value)
+        if excluded:
+            return tuple(name for name in Film.model_fields if name not in excluded or name == "uuid")
+        return tuple(name for name in Film.model_fields if name in names or name == "uuid")
+
+    def query_params(self) -> dict[str, str]:
+        params = super().query_params()
+        if self.genre:
+            params["genre"] = self.genre
+        if self.sort:
+            (field, order), = self.sort.items()
+            params["sort"] = f"-{field}" if order["order"] == "desc" else field
+        if self.fields:
+            params["fields"] = ",".join(self.fields)
+        return params
+
 
 class SearchFilmFilter(FilmFilter):
     """
@@ -49,3 +90,50 @@ class SearchFilmFilter(FilmFilter):
         query (Annotated[str | None, Query()]): The search query for films.
     """
     query: Annotated[str | None, Query()] = None
+
+    def query_params(self) -> dict[str, str]:
+        params = super().query_params()
+        if self.query:
+            params["query"] = self.query
+        return params
+
+
+class SuggestFilmQuery(BaseModel):
+    """
+    Represents a title autocomplete request.
+
+    Attributes:
+        prefix (Annotated[str, Query()]): The beginning of the film title typed so far.
+        size (Annotated[int, Query()]): The number of suggestions, at most `FILMS_SUGGEST_MAX_SIZE`.
+    """
+    prefix: Annotated[str, Query(min_length=1, max_length=50)]
+    size: Annotated[int, Query(gt=0, le=settings.films_suggest_max_size)] = settings.films_suggest_max_size
+
+    @field_validator("prefix")
+    @classmethod
+    def normalize_prefix(cls, value: str) -> str:
+        """
+        Normalizes the prefix the way the completion field analyzes titles, so that
+        prefixes differing only in case or spacing share a cache entry.
+
+        Parameters:
+            value (str): The prefix as typed.
+
+        Returns:
+            str: The lowercased prefix with collapsed whitespace.
+        """
+        prefix = " ".join(value.lower().split())
+        if not prefix:
+            raise query_error("prefix", "Prefix can't be blank", value)
+        # Пробел в конце значим: "star " не должно подсказывать "stardust"
+        return prefix + " " if value[-1].isspace() else prefix
+
+
+class FilmBatchQuery(BaseModel):
+    """
+    Represents a request for several films by their identifiers.
+
+    Attributes:
+        ids (list[str]): Identifiers of the films, at most `FILMS_BATCH_MAX_SIZE`.
+    """
+    ids: Annotated[list[str], Field(min_length=1, max_length=settings.films_batch_max_size)]
@@ -1,10 +1,39 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query
+
+from db.cache import get_cache
+from services.abstract import AbstractCache
+from services.breaker import CLOSED, CircuitBreaker
+from services.film import get_film_breaker
 
 router = APIRouter()
 
 @router.get("/health")
-async def health_check():
+async def health_check(breaker: CircuitBreaker | None = Depends(get_film_breaker)):
     """
     healthcheck
+
+    The status is "degraded" while the Elasticsearch circuit breaker of the current worker
+    is not closed: responses then come from stale copies, or fail fast with 503.
+    """
+    breakers = {breaker.name: breaker.as_dict()} if breaker else {}
+    degraded = any(state["state"] != CLOSED for state in breakers.values())
+    return {"status": "degraded" if degraded else "healthy", "breakers": breakers}
+
+
+@router.get("/health/cache")
+async def cache_stats(cache: AbstractCache = Depends(get_cache)):
+    """
+    Per-tier cache hit/miss counters and hit ratios of the current worker.
+    """
+    return cache.stats()
+
+
+@router.get("/health/cache/hot")
+async def hottest_cache_keys(
+        count: int = Query(20, gt=0, le=100),
+        cache: AbstractCache = Depends(get_cache),
+):
+    """
+    Keys most requested from the cache of the current worker recently, with their estimated frequencies.
     """
-    return {"status": "healthy"}
\ No newline at end of file
+    return [{"key": key, "frequency": frequency} for key, frequency in cache.hottest(count)]
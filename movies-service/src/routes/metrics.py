@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+
+from core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics of all workers of the service.
+    """
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
@@ -1,17 +1,93 @@
 import abc
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, Collection
+from core.metrics import CACHE_REQUESTS
 from queries.base import BaseFilter
 
 
+@dataclass
+class CacheStats:
+    """
+    Hit/miss counters of a single cache tier, also exported to Prometheus.
+
+    Attributes:
+    - tier (str): Name of the tier.
+    - hits (int): Number of lookups answered by the tier.
+    - misses (int): Number of lookups the tier could not answer.
+    """
+    tier: str
+    hits: int = 0
+    misses: int = 0
+
+    def record(self, hits: int = 0, misses: int = 0) -> None:
+        self.hits += hits
+        self.misses += misses
+        if hits:
+            CACHE_REQUESTS.labels(self.tier, "hit").inc(hits)
+        if misses:
+            CACHE_REQUESTS.labels(self.tier, "miss").inc(misses)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": round(self.hit_ratio, 4)}
+
+
 class AbstractCache(abc.ABC):
     @abc.abstractmethod
     async def get(self, key: str) -> Any:
         pass
 
     @abc.abstractmethod
-    async def set(self, key: str, value: Any, expire: int) -> None:
+    async def set(self, key: str, value: Any, expire: int, tags: Collection[str] = ()) -> None:
+        pass
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        """
+        Values of several keys in the order of the keys, None for missing ones.
+        """
+        return [await self.get(key) for key in keys]
+
+    async def set_many(
+            self, values: dict[str, Any], expire: int, tags: dict[str, Collection[str]] | None = None
+    ) -> None:
+        tags = tags or {}
+        for key, value in values.items():
+            await self.set(key, value, expire, tags.get(key, ()))
+
+    async def invalidate(self, tags: Collection[str]) -> None:
+        """
+        Remove all entries set with any of the tags.
+        """
         pass
 
+    def is_shared(self, key: str) -> bool:
+        """
+        Whether the value last set for the key was written to the tier shared by all workers.
+        """
+        return True
+
+    def admits_shared(self, key: str) -> bool:
+        """
+        Whether a value set for the key now would be written to the tier shared by all workers.
+        """
+        return True
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Per-tier hit/miss statistics of the cache, keyed by tier name.
+        """
+        return {}
+
+    def hottest(self, count: int) -> list[tuple[str, int]]:
+        """
+        Up to `count` keys with the highest estimated recent request frequency, hottest first.
+        """
+        return []
+
 
 class AbstractDataStorage(abc.ABC):
     @abc.abstractmethod
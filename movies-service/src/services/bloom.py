@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+
+from elasticsearch import ApiError, AsyncElasticsearch, TransportError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from core.metrics import observe_elastic
+from services.elastic import scan_index
+from services.generation import IndexGeneration
+from services.invalidation import parse_film_message, subscribe
+
+logger = logging.getLogger(__name__)
+
+# Запас ёмкости на документы, добавленные между перестроениями фильтра
+CAPACITY_HEADROOM = 2
+MIN_CAPACITY = 1_024
+# Как часто проверять, не сменилось ли поколение индекса и число документов в нём
+GENERATION_CHECK_INTERVAL = 5.0
+
+
+class BloomFilter:
+    """
+    Set of strings with no false negatives and a `error_rate` share of false positives
+    at `capacity` elements, in about 1.2 bytes per element for a 1% error rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+
+class KnownIds:
+    """
+    Bloom filter of the identifiers of all documents of an index, to answer lookups of
+    unknown identifiers without any cache or Elasticsearch I/O.
+
+    The filter is built in the background from a scan of the index and rebuilt every
+    `refresh_interval` seconds, whenever the index generation changes, which also
+    drops deleted documents, and whenever the number of searchable documents (`_count`,
+    checked every few seconds) differs from the number scanned, so documents bulk-indexed
+    without a message are found within seconds. Identifiers of every invalidation message
+    are added right away, so new documents published through the invalidation channel are
+    found at once. Writers that replace documents without changing their number must
+    publish the changes (invalidate_cache.py --uuid), otherwise the new documents are
+    answered with 404 until the next rebuild. Until the first build every identifier may exist.
+    """
+
+    def __init__(
+            self,
+            elastic: AsyncElasticsearch,
+            redis: Redis,
+            index: str,
+            channel: str,
+            refresh_interval: float,
+            error_rate: float,
+            generation: IndexGeneration | None = None,
+    ):
+        self.elastic = elastic
+        self.redis = redis
+        self.index = index
+        self.channel = channel
+        self.refresh_interval = refresh_interval
+        self.error_rate = error_rate
+        self.generation = generation
+        self.filter: BloomFilter | None = None
+        self._built_generation: str | None = None
+        self._built_count: int | None = None
+        self._built_at = 0.0
+        # Идентификаторы из сообщений, пришедших во время перестроения фильтра
+        self._added: set[str] | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(subscribe(self.redis, self.channel, self.handle))]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def might_exist(self, model_id: str) -> bool:
+        return self.filter is None or model_id in self.filter
+
+    async def handle(self, data: bytes) -> None:
+        message = parse_film_message(data)
+        if message is None:
+            return
+        for model_id in message[0]:
+            if self.filter is not None:
+                self.filter.add(model_id)
+            if self._added is not None:
+                self._added.add(model_id)
+
+    async def refresh(self) -> None:
+        """
+        Rebuilds the filter if it is missing, older than the refresh interval, built for another
+        index generation or from another number of documents than the index has now.
+        """
+        try:
+            generation = await self.generation.get() if self.generation else "0"
+            expired = time.monotonic() - self._built_at >= self.refresh_interval
+            if self.filter is not None and generation == self._built_generation and not expired:
+                response = await observe_elastic("count", self.elastic.count(index=self.index))
+                if response["count"] == self._built_count:
+                    return
+            self._added = set()
+            try:
+                hits = await scan_index(self.elastic, self.index, False)
+                ids = [hit["_id"] for hit in hits] + list(self._added)
+            finally:
+                self._added = None
+            self.filter = await asyncio.to_thread(self._build, ids)
+            self._built_generation, self._built_at = generation, time.monotonic()
+            # Скан читает снимок индекса, поэтому число его документов сравнимо с _count
+            self._built_count = len(hits)
+            logger.info("Known ids of index %s loaded: %d documents", self.index, len(hits))
+        except (ApiError, TransportError, RedisError) as error:
+            logger.warning("Failed to load known ids of index %s: %s", self.index, error)
+
+    def _build(self, ids: list[str]) -> BloomFilter:
+        bloom = BloomFilter(max(len(ids) * CAPACITY_HEADROOM, MIN_CAPACITY), self.error_rate)
+        for model_id in ids:
+            bloom.add(model_id)
+        return bloom
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(min(self.refresh_interval, GENERATION_CHECK_INTERVAL))
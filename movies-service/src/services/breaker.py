@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from elasticsearch import ApiError, TransportError
+
+from core.metrics import CIRCUIT_BREAKER_TRANSITIONS
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """
+    The request was not sent because the circuit breaker of the storage is open.
+
+    Attributes:
+    - name (str): Name of the circuit breaker.
+    - retry_after (float): Seconds until the breaker lets probing requests through.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit breaker {name} is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_failure(error: BaseException) -> bool:
+    """
+    Whether the error means the storage is unhealthy: a timeout, a connection error or a
+    5xx/429 response. Other responses, e.g. 404 or 400, show that the storage is up.
+    """
+    if isinstance(error, ApiError):
+        return error.meta.status >= 500 or error.meta.status == 429
+    return isinstance(error, (TransportError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker in front of a storage.
+
+    While closed, requests pass through; `failure_threshold` failures in a row (see
+    `is_failure`) open the breaker. While open, requests fail at once with
+    CircuitOpenError, so workers do not pile up requests waiting for timeouts.
+    After `reset_timeout` seconds the breaker is half-open: up to `half_open_max_calls`
+    probing requests pass at a time, `success_threshold` successful probes close the
+    breaker and a failed one opens it again. Requests longer than `call_timeout`
+    seconds are cancelled and count as failures.
+
+    The state is kept per worker.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            failure_threshold: int,
+            reset_timeout: float,
+            half_open_max_calls: int = 1,
+            success_threshold: int = 1,
+            call_timeout: float | None = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.success_threshold = success_threshold
+        self.call_timeout = call_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._successes = 0
+        self._probes = 0
+        self._opened_at = 0.0
+
+    async def call(self, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Send the request unless the breaker is open.
+
+        Parameters:
+        - request (Callable): Factory of the request coroutine.
+
+        Returns:
+        - The response of the request.
+        """
+        probe = self._acquire()
+        try:
+            result = await asyncio.wait_for(request(), self.call_timeout)
+        except Exception as error:
+            self._record(probe, not is_failure(error))
+            raise
+        finally:
+            if probe:
+                self._probes -= 1
+        self._record(probe, True)
+        return result
+
+    def retry_after(self) -> float:
+        """
+        Seconds until an open breaker becomes half-open, 0 if it is not open.
+        """
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "retry_after": round(self.retry_after(), 1)}
+
+    def _acquire(self) -> bool:
+        """
+        Lets the request through or raises CircuitOpenError; returns whether the request is a probe.
+        """
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                raise CircuitOpenError(self.name, self.retry_after())
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._probes += 1
+            return True
+        return False
+
+    def _record(self, probe: bool, success: bool) -> None:
+        if self.state == HALF_OPEN:
+            # Ответы запросов, отправленных до размыкания, состояние пробы не меняют
+            if not probe:
+                return
+            if not success:
+                self._transition(OPEN)
+                return
+            self._successes += 1
+            if self._successes >= self.success_threshold:
+                self._transition(CLOSED)
+        elif self.state == CLOSED:
+            if success:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            logger.warning("Circuit breaker %s opened for %.1fs", self.name, self.reset_timeout)
+        elif state == CLOSED:
+            self.failures = 0
+            logger.info("Circuit breaker %s closed", self.name)
+        self._successes = 0
+        self.state = state
+        CIRCUIT_BREAKER_TRANSITIONS.labels(self.name, state).inc()
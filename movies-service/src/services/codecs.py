@@ -0,0 +1,109 @@
+import abc
+from typing import Any
+
+import msgpack
+import orjson
+import zstandard
+
+# Версия формата хранения; значения с другой версией в заголовке считаются промахом
+HEADER_VERSION = 1
+COMPRESSED_FLAG = 0b1000
+FORMAT_MASK = 0b0111
+
+
+class Codec(abc.ABC):
+    """
+    Serialization format of cached values.
+
+    Attributes:
+    - format_id (int): Identifier of the format stored in the header byte, 0-7.
+    """
+    format_id: int
+
+    @abc.abstractmethod
+    def encode(self, value: Any) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def decode(self, payload: bytes) -> Any:
+        pass
+
+
+class RawCodec(Codec):
+    """Bytes stored as they are, e.g. already encoded response bodies."""
+    format_id = 0
+
+    def encode(self, value: bytes) -> bytes:
+        return value
+
+    def decode(self, payload: bytes) -> bytes:
+        return payload
+
+
+class OrjsonCodec(Codec):
+    format_id = 1
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def decode(self, payload: bytes) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec(Codec):
+    format_id = 2
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value)
+
+    def decode(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload)
+
+
+CODECS: dict[int, Codec] = {codec.format_id: codec for codec in (RawCodec(), OrjsonCodec(), MsgpackCodec())}
+
+
+class CacheCodec:
+    """
+    Encodes cached values with a one-byte header: format version, compression flag and format id.
+
+    Bytes are always stored raw, other values with the configured codec; payloads
+    of at least `min_size` bytes are compressed with zstd if compression is on.
+    The service caches packed entries, which are bytes, so the configured codec
+    only applies to values of other types.
+
+    Values are decoded according to their own header, so the write codec and
+    compression can be changed on a live cache: old entries stay readable until
+    they expire. Entries without a known header version, and entries that fail
+    to decompress or decode, are treated as misses.
+    """
+
+    def __init__(self, codec: Codec, compress: bool = False, min_size: int = 1024, level: int = 3):
+        self.codec = codec
+        self.compress = compress
+        self.min_size = min_size
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def encode(self, value: Any) -> bytes:
+        codec = CODECS[RawCodec.format_id] if isinstance(value, bytes) else self.codec
+        payload = codec.encode(value)
+        header = HEADER_VERSION << 4 | codec.format_id
+        if self.compress and len(payload) >= self.min_size:
+            payload = self._compressor.compress(payload)
+            header |= COMPRESSED_FLAG
+        return bytes((header,)) + payload
+
+    def decode(self, data: bytes) -> Any:
+        header = data[0]
+        codec = CODECS.get(header & FORMAT_MASK)
+        if header >> 4 != HEADER_VERSION or codec is None:
+            return None
+        payload = data[1:]
+        try:
+            if header & COMPRESSED_FLAG:
+                payload = self._decompressor.decompress(payload)
+            return codec.decode(payload)
+        except (zstandard.ZstdError, ValueError):
+            # Обрезанное или повреждённое значение: ошибки разбора orjson и msgpack - подклассы ValueError
+            return None
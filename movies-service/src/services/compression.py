@@ -0,0 +1,38 @@
+import gzip
+from typing import Callable
+
+import brotli
+
+from services.policy import CacheEntry
+
+# Кодировщики тел ответов: (тело, уровень сжатия) -> сжатое тело
+ENCODERS: dict[str, Callable[[bytes, int], bytes]] = {
+    "br": lambda body, level: brotli.compress(body, quality=level, mode=brotli.MODE_TEXT),
+    "gzip": lambda body, level: gzip.compress(body, compresslevel=level, mtime=0),
+}
+
+
+class ResponseCompressor:
+    """
+    Precompresses cached response bodies, so a response is compressed once, on the
+    miss path, instead of on every request.
+
+    Variants that are not smaller than the body itself are not stored.
+
+    Attributes:
+    - levels (dict[str, int]): Compression level per content coding, e.g. {"br": 5, "gzip": 6}.
+    - min_size (int): Bodies shorter than this are not compressed.
+    """
+
+    def __init__(self, levels: dict[str, int], min_size: int = 0):
+        self.levels = levels
+        self.min_size = min_size
+
+    def compress(self, entry: CacheEntry) -> CacheEntry:
+        if len(entry.body) < self.min_size:
+            return entry
+        for encoding, level in self.levels.items():
+            data = ENCODERS[encoding](entry.body, level)
+            if len(data) < len(entry.body):
+                entry.variants[encoding] = data
+        return entry
@@ -1,31 +1,195 @@
-from typing import Any, Type, Generic, TypeVar
-from elasticsearch import AsyncElasticsearch, NotFoundError
-from fastapi import Request
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Type, Generic, TypeVar
+import orjson
+from elasticsearch import ApiError, AsyncElasticsearch, BadRequestError, NotFoundError, TransportError
+from core.metrics import SERIALIZATION_SECONDS, STALE_RESPONSES, observe_elastic
+from core.tracing import span
 from services.abstract import AbstractCache, AbstractDataStorage
-from queries.base import BaseFilter
+from services.breaker import CircuitBreaker, CircuitOpenError, is_failure
+from services.compression import ResponseCompressor
+from services.generation import IndexGeneration
+from services.hedging import HedgedRequests
+from services.hotkeys import HotKeys
+from services.invalidation import cache_tag
+from services.lock import RedisLock
+from services.policy import CacheEntry, TTLCachePolicy
+from services.singleflight import SingleFlight
+from queries.base import BaseFilter, encode_cursor, query_error
 from urllib.parse import urlencode
-from pydantic import BaseModel
+from pydantic import BaseModel, create_model
 
 CACHE_EXPIRE_IN_SECONDS = 60 * 5
 CACHE_NAMESPACE = "api_response"
+# Копии ответов с удлинённым временем жизни на случай недоступности Elasticsearch
+STALE_NAMESPACE = "stale"
+# Уникальное поле документа: замыкает сортировку и помечает записи кэша для инвалидации
+ID_FIELD = "uuid"
+SORT_TIEBREAKER = ID_FIELD
+# Время жизни point in time между запросами соседних страниц
+PIT_KEEP_ALIVE = "1m"
+# Окно учёта открытых point in time: без запросов point in time закрывается через PIT_KEEP_ALIVE
+PIT_OPENS_WINDOW = 60.0
+# Размер страницы и время жизни point in time при выгрузке всего индекса
+SCAN_BATCH_SIZE = 5_000
+SCAN_PIT_KEEP_ALIVE = "2m"
+# Виды нормализованных ключей для учёта горячих ключей: документ по id и список по запросу
+HOT_MODEL = "model"
+HOT_LIST = "list"
 
 M = TypeVar("M", bound=BaseModel)
 
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[CacheEntry | None]]
+
+# Фоновые обновления кэша; ссылки храним, чтобы задачи не собрал сборщик мусора
+_background_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(request: Awaitable[Any], name: str) -> None:
+    """
+    Runs the coroutine as a task nobody awaits, logging its failure instead of leaving
+    the exception unretrieved.
+    """
+    task = asyncio.create_task(request, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_finish_background)
+
+
+def _finish_background(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background task %s failed: %r", task.get_name(), task.exception())
+
+
+@lru_cache(maxsize=256)
+def projection_model(model_class: Type[BaseModel], fields: tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Builds (once per field set) a model with only the given fields of the model class.
+    """
+    return create_model(
+        f"{model_class.__name__}Projection",
+        **{name: (model_class.model_fields[name].annotation, ...) for name in fields},
+    )
+
+
+def filter_query(model_filter: BaseFilter) -> str:
+    """
+    Sorted canonical query string of the filter, the normalized part of list cache keys.
+    """
+    return urlencode(sorted(model_filter.query_params().items()))
+
+
+def stale_key(cache_key: str) -> str:
+    """
+    Key of the stale copy of a cache entry: the cache key without the index generation,
+    so the last known value is found after a generation change too.
+    """
+    _, _, rest = cache_key.partition(":")
+    _, _, rest = rest.partition(":")
+    return f"{STALE_NAMESPACE}:{rest}"
+
+
+class PointInTimeLimitError(Exception):
+    """
+    A point in time was not opened because the worker opened too many of them recently.
+
+    Attributes:
+    - retry_after (float): Seconds until the oldest of them drops out of the window.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__("Too many points in time opened")
+        self.retry_after = retry_after
+
+
+async def scan_index(elastic: AsyncElasticsearch, index: str, source: Any) -> list[dict[str, Any]]:
+    """
+    All documents of the index, read page by page from a point in time in index order.
+
+    Parameters:
+    - elastic (AsyncElasticsearch): The Elasticsearch client.
+    - index (str): The index to read.
+    - source (Any): The `_source` option of the searches, e.g. the fields to fetch or False.
+
+    Returns:
+    - The hits of all documents.
+    """
+    pit = await observe_elastic(
+        "open_point_in_time", elastic.open_point_in_time(index=index, keep_alive=SCAN_PIT_KEEP_ALIVE)
+    )
+    pit_id = pit["id"]
+    documents = []
+    search_after = None
+    try:
+        while True:
+            body: dict[str, Any] = {
+                "size": SCAN_BATCH_SIZE,
+                "sort": ["_shard_doc"],
+                "pit": {"id": pit_id, "keep_alive": SCAN_PIT_KEEP_ALIVE},
+                "_source": source,
+            }
+            if search_after:
+                body["search_after"] = search_after
+            response = await observe_elastic("search", elastic.search(body=body))
+            hits = response["hits"]["hits"]
+            documents += hits
+            pit_id = response.get("pit_id", pit_id)
+            if len(hits) < SCAN_BATCH_SIZE:
+                return documents
+            search_after = hits[-1]["sort"]
+    finally:
+        await elastic.close_point_in_time(body={"id": pit_id})
+
 
 class ElasticDataStorage(AbstractDataStorage, Generic[M]):
     def __init__(
             self,
-            request: Request,
             cache: AbstractCache,
             elastic: AsyncElasticsearch,
             model_class: Type[M],
-            index: str
+            index: str,
+            single_flight: SingleFlight,
+            policy: TTLCachePolicy | None = None,
+            lock: RedisLock | None = None,
+            lock_wait: float = 0.0,
+            lock_poll_interval: float = 0.05,
+            list_model_class: Type[BaseModel] | None = None,
+            generation: IndexGeneration | None = None,
+            compressor: ResponseCompressor | None = None,
+            hot_keys: HotKeys | None = None,
+            negative_ttl: int = 0,
+            hedger: HedgedRequests | None = None,
+            breaker: CircuitBreaker | None = None,
+            stale_cache: AbstractCache | None = None,
+            stale_ttl: int = 0,
+            pit_max_opens: int = 0,
     ):
-        self.request = request
         self.cache = cache
         self.elastic = elastic
         self.model_class = model_class
         self.index = index
+        self.single_flight = single_flight
+        self.policy = policy or TTLCachePolicy(CACHE_EXPIRE_IN_SECONDS)
+        self.lock = lock
+        self.lock_wait = lock_wait
+        self.lock_poll_interval = lock_poll_interval
+        self.list_model_class = list_model_class or model_class
+        self.generation = generation
+        self.compressor = compressor
+        self.hot_keys = hot_keys
+        self.negative_ttl = negative_ttl
+        self.hedger = hedger
+        self.breaker = breaker
+        self.stale_cache = stale_cache or cache
+        self.stale_ttl = stale_ttl
+        self.pit_max_opens = pit_max_opens
+        # Открытые воркером point in time, ещё учитываемые в окне: id -> время открытия
+        self._pit_opens: dict[str, float] = {}
+        self._pit_opening = 0
 
     async def get_by_id(self, model_id: str) -> M | None:
         """
@@ -37,17 +201,10 @@ class ElasticDataStorage(AbstractDataStorage, Generic[M]):
         Returns:
         - An instance of the model if found, otherwise None.
         """
-        cache_key = self._generate_cache_key(self.request)
-        cached = await self.cache.get(cache_key)
-        if cached:
-            return self.model_class(**cached)
-
-        model = await self._get_model_from_elastic(model_id)
-        if model:
-            await self.cache.set(cache_key, model.model_dump(), CACHE_EXPIRE_IN_SECONDS)
-        return model
+        entry = await self.get_raw_by_id(model_id)
+        return self.model_class(**orjson.loads(entry.body)) if entry else None
 
-    async def get_all(self, model_filter: BaseFilter) -> list[M]:
+    async def get_all(self, model_filter: BaseFilter) -> list[BaseModel]:
         """
         Retrieve multiple models based on the provided filter.
 
@@ -55,48 +212,378 @@ class ElasticDataStorage(AbstractDataStorage, Generic[M]):
         - model_filter (BaseFilter): An instance of BaseFilter containing filtering parameters.
 
         Returns:
-        - A list of model instances that match the filter criteria.
+        - A list of list-model (or projection) instances that match the filter criteria.
+        """
+        entry = await self.get_all_raw(model_filter)
+        list_model = self._list_model(model_filter)
+        return [list_model(**item) for item in orjson.loads(entry.body)] if entry else []
+
+    async def get_raw_by_id(self, model_id: str) -> CacheEntry | None:
+        """
+        Retrieve the encoded JSON body of a model by its unique identifier.
+
+        The model is validated only when it is loaded from Elasticsearch; cache hits
+        return the stored bytes as they are. With a negative TTL, the absence of the
+        model is cached too, for that many seconds.
+
+        Parameters:
+        - model_id (str): The unique identifier of the model.
+
+        Returns:
+        - The cache entry holding the JSON body if found, otherwise None.
+        """
+        cache_key = await self._generate_id_cache_key(model_id)
+        self._record_hot(f"{HOT_MODEL}:{model_id}")
+        entry = await self._get_or_load(cache_key, lambda: self._load_model(model_id))
+        return None if entry is None or entry.missing else entry
+
+    async def get_raw_by_ids(self, model_ids: list[str]) -> list[CacheEntry]:
+        """
+        Retrieve the encoded JSON bodies of several models at once.
+
+        Cached models are fetched with one multi-key cache read, the rest with one
+        Elasticsearch mget; the loaded models, and with a negative TTL the absent
+        ones, are put into the cache with the same keys `get_raw_by_id` uses. If
+        Elasticsearch is unavailable, the models are served from their stale copies
+        when every one of them has a copy.
+
+        Parameters:
+        - model_ids (list[str]): The unique identifiers of the models.
+
+        Returns:
+        - Cache entries of the found models, in the order of the requested identifiers.
+        """
+        model_ids = list(dict.fromkeys(model_ids))
+        cache_keys = [await self._generate_id_cache_key(model_id) for model_id in model_ids]
+        found: dict[str, CacheEntry] = {}
+        # Ключи кэша моделей, которые нужно загрузить
+        missing: dict[str, str] = {}
+        for model_id, cache_key, cached in zip(model_ids, cache_keys, await self.cache.get_many(cache_keys)):
+            entry = CacheEntry.unpack(cached) if cached else None
+            if entry is None:
+                missing[model_id] = cache_key
+                continue
+            if entry.missing:
+                continue
+            if self.policy.should_refresh(entry):
+                self._refresh_in_background(cache_key, lambda model_id=model_id: self._load_model(model_id))
+            found[model_id] = entry
+
+        if missing:
+            try:
+                found.update(await self._load_many_and_cache(missing))
+            except Exception as error:
+                if not self._unavailable(error):
+                    raise
+                found.update(await self._get_stale_many(missing, error))
+        return [found[model_id] for model_id in model_ids if model_id in found]
+
+    async def get_all_raw(self, model_filter: BaseFilter) -> CacheEntry | None:
+        """
+        Retrieve the encoded JSON list body of models matching the filter.
+
+        Items are in the list representation of the model, or contain only the
+        requested fields if the filter has a projection. The cursor of the next page,
+        if there is one, is kept in the entry metadata under "cursor". Pages read
+        from a point-in-time snapshot are not cached.
+
+        Parameters:
+        - model_filter (BaseFilter): An instance of BaseFilter containing filtering parameters.
+
+        Returns:
+        - The cache entry holding the JSON body, or None if no models match.
+        """
+        if model_filter.pit or (model_filter.cursor and "pit_id" in model_filter.cursor):
+            return await self._load_models(model_filter)
+        cache_key = await self._generate_cache_key(model_filter)
+        if not model_filter.cursor:
+            self._record_hot(f"{HOT_LIST}:{filter_query(model_filter)}")
+        # Результаты поиска по тексту и страницы по курсору редко запрашиваются повторно, копии для них не хранятся
+        stale = not model_filter.cursor and not getattr(model_filter, "query", None)
+        return await self._get_or_load(cache_key, lambda: self._load_models(model_filter), stale)
+
+    async def _load_many_and_cache(self, keys: dict[str, str]) -> dict[str, CacheEntry]:
+        """
+        Load the models with one mget and cache them, and with a negative TTL the absence of the rest.
+
+        Parameters:
+        - keys (dict[str, str]): Cache keys of the models to load, keyed by model identifier.
+
+        Returns:
+        - Cache entries of the found models, keyed by model identifier.
+        """
+        loaded = await self._load_many_models(list(keys))
+        if loaded:
+            for entry in loaded.values():
+                self._compress(entry)
+            expire = self.policy.expire()
+            values = {keys[model_id]: self._pack(entry, expire) for model_id, entry in loaded.items()}
+            await self.cache.set_many(
+                values,
+                expire,
+                tags={keys[model_id]: entry.tags for model_id, entry in loaded.items()},
+            )
+            await self._keep_stale(values)
+        absent = [model_id for model_id in keys if model_id not in loaded]
+        if absent and self.negative_ttl:
+            entries = {keys[model_id]: self._missing_entry(model_id) for model_id in absent}
+            await self.cache.set_many(
+                {cache_key: self._pack(entry, self.negative_ttl) for cache_key, entry in entries.items()},
+                self.negative_ttl,
+                tags={cache_key: entry.tags for cache_key, entry in entries.items()},
+            )
+        return loaded
+
+    def _record_hot(self, hot_key: str) -> None:
+        if self.hot_keys:
+            self.hot_keys.record(hot_key)
+
+    async def _get_or_load(self, cache_key: str, loader: Loader, stale: bool = True) -> CacheEntry | None:
+        """
+        Return the cached value for the key or load it with stampede protection.
+
+        Concurrent misses of the same key within the worker share a single load.
+        With a distributed lock configured, only one worker of the cluster loads
+        the key, the others wait for it to appear in the cache; keys the cache would
+        keep in this worker only are loaded without the lock. A stale value
+        (according to the cache policy) is returned immediately and refreshed
+        in the background. If Elasticsearch is unavailable, the stale copy of the
+        value is returned instead, if there is one.
+
+        Parameters:
+        - cache_key (str): The cache key of the value.
+        - loader (Callable): Coroutine factory loading the cache entry from the storage.
+        - stale (bool): Whether to keep a stale copy of the loaded value.
+
+        Returns:
+        - The cached or freshly loaded entry, or None if there is nothing to cache.
+        """
+        entry = await self._get_cached(cache_key)
+        if entry:
+            if self.policy.should_refresh(entry):
+                self._refresh_in_background(cache_key, loader, stale)
+            return entry
+        try:
+            return await self.single_flight.do(cache_key, lambda: self._fill(cache_key, loader, stale=stale))
+        except Exception as error:
+            if not self._unavailable(error):
+                raise
+            return await self._get_stale(cache_key, error)
+
+    async def _get_cached(self, cache_key: str) -> CacheEntry | None:
+        with span("cache"):
+            cached = await self.cache.get(cache_key)
+            return CacheEntry.unpack(cached) if cached else None
+
+    async def _get_stale(self, cache_key: str, error: Exception) -> CacheEntry:
+        """
+        The stale copy of the entry; re-raises the error of the storage if there is none.
+        """
+        cached = await self.stale_cache.get(stale_key(cache_key)) if self.stale_ttl else None
+        entry = CacheEntry.unpack(cached) if cached else None
+        if entry is None:
+            raise error
+        STALE_RESPONSES.labels(self.index).inc()
+        return entry
+
+    async def _get_stale_many(self, keys: dict[str, str], error: Exception) -> dict[str, CacheEntry]:
         """
-        cache_key = self._generate_cache_key(self.request)
-        cached = await self.cache.get(cache_key)
-        if cached:
-            return [self.model_class(**item) for item in cached]
+        Stale copies of the entries keyed by model identifier; re-raises the error of the storage
+        unless every model has one, since a model without a copy may exist all the same.
+        """
+        if not self.stale_ttl:
+            raise error
+        copies = await self.stale_cache.get_many([stale_key(cache_key) for cache_key in keys.values()])
+        entries = {model_id: CacheEntry.unpack(cached) if cached else None for model_id, cached in zip(keys, copies)}
+        if not all(entries.values()):
+            raise error
+        STALE_RESPONSES.labels(self.index).inc()
+        return entries
 
-        models = await self._get_all_from_elastic(model_filter)
-        if models:
-            await self.cache.set(cache_key, [m.model_dump() for m in models], CACHE_EXPIRE_IN_SECONDS)
-        return models
+    async def _keep_stale(self, values: dict[str, bytes]) -> None:
+        """
+        Store copies of the packed entries with the extended stale TTL, untagged, so
+        neither expiry nor invalidation of the entries removes them. Only entries the cache
+        wrote to its shared tier get a copy: keys requested too rarely for Redis are not kept there longer.
+        """
+        if not self.stale_ttl:
+            return
+        copies = {stale_key(cache_key): value for cache_key, value in values.items() if self.cache.is_shared(cache_key)}
+        if copies:
+            await self.stale_cache.set_many(copies, self.stale_ttl)
+
+    @staticmethod
+    def _unavailable(error: Exception) -> bool:
+        return isinstance(error, CircuitOpenError) or is_failure(error)
+
+    def _refresh_in_background(self, cache_key: str, loader: Loader, stale: bool = True) -> None:
+        run_in_background(
+            self.single_flight.do(cache_key, lambda: self._fill(cache_key, loader, wait=False, stale=stale)),
+            f"refresh {cache_key}",
+        )
+
+    async def _fill(self, cache_key: str, loader: Loader, wait: bool = True, stale: bool = True) -> CacheEntry | None:
+        """
+        Load the value and put it into the cache, holding the cluster-wide lock if configured.
+
+        The lock is taken only for keys the cache admits to its shared tier: the value of
+        any other key would stay in the memory of the loading worker, and the workers
+        waiting for it would wait out `lock_wait` and load it anyway. A new key is thus
+        loaded at most once per worker until it becomes frequent enough to be shared.
+
+        Parameters:
+        - cache_key (str): The cache key of the value.
+        - loader (Callable): Coroutine factory loading the cache entry from the storage.
+        - wait (bool): Whether to wait for another worker holding the lock instead of giving up.
+        - stale (bool): Whether to keep a stale copy of the loaded value.
+        """
+        if self.lock is None or not self.cache.admits_shared(cache_key):
+            return await self._load_and_cache(cache_key, loader, stale)
+
+        token = await self.lock.acquire(cache_key)
+        if token is None:
+            if not wait:
+                return None
+            entry = await self._wait_for_fill(cache_key)
+            if entry:
+                return entry
+            return await self._load_and_cache(cache_key, loader, stale)
+        try:
+            return await self._load_and_cache(cache_key, loader, stale)
+        finally:
+            await self.lock.release(cache_key, token)
+
+    async def _wait_for_fill(self, cache_key: str) -> CacheEntry | None:
+        """
+        Poll the cache while another worker holds the lock on the key.
+
+        Gives up when the wait budget is spent or the lock is released without
+        a value being cached, so the caller can load the value itself.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_wait
+        while loop.time() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            locked = await self.lock.locked(cache_key)
+            entry = await self._get_cached(cache_key)
+            if entry or not locked:
+                return entry
+        return None
+
+    async def _load_and_cache(self, cache_key: str, loader: Loader, stale: bool = True) -> CacheEntry | None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        entry = await loader()
+        if entry and entry.missing:
+            await self.cache.set(cache_key, self._pack(entry, self.negative_ttl), self.negative_ttl, entry.tags)
+        elif entry:
+            self.policy.stamp(entry, loop.time() - started)
+            self._compress(entry)
+            expire = self.policy.expire()
+            value = self._pack(entry, expire)
+            await self.cache.set(cache_key, value, expire, entry.tags)
+            if stale:
+                await self._keep_stale({cache_key: value})
+        return entry
+
+    @staticmethod
+    def _pack(entry: CacheEntry, expire: int) -> bytes:
+        """
+        Packs the entry with the time its cache key expires, so tiers copying it keep it no longer.
+        """
+        entry.meta["expires_at"] = time.time() + expire
+        return entry.pack()
+
+    def _compress(self, entry: CacheEntry) -> None:
+        if self.compressor:
+            self.compressor.compress(entry)
+
+    async def _load_model(self, model_id: str) -> CacheEntry | None:
+        model = await self._get_model_from_elastic(model_id)
+        if model is None:
+            return self._missing_entry(model_id) if self.negative_ttl else None
+        return self._model_entry(model)
+
+    async def _load_many_models(self, model_ids: list[str]) -> dict[str, CacheEntry]:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        models = await self._get_models_from_elastic(model_ids)
+        delta = loop.time() - started
+        return {
+            model_id: self.policy.stamp(self._model_entry(model), delta)
+            for model_id, model in models.items()
+        }
+
+    async def _load_models(self, model_filter: BaseFilter) -> CacheEntry | None:
+        models, cursor = await self._get_all_from_elastic(model_filter)
+        return self._list_entry(model_filter, [model.model_dump() for model in models], cursor)
+
+    def _list_entry(self, model_filter: BaseFilter, items: list[dict[str, Any]], cursor: str | None) -> CacheEntry | None:
+        if not items:
+            return None
+        tags = [cache_tag(self.index, ID_FIELD, item[ID_FIELD]) for item in items]
+        with SERIALIZATION_SECONDS.labels("list").time(), span("serialize"):
+            body = orjson.dumps(items)
+        entry = CacheEntry(body, {"tags": tags + self._filter_tags(model_filter)})
+        if cursor:
+            entry.meta["cursor"] = cursor
+        return entry
+
+    def _model_entry(self, model: M) -> CacheEntry:
+        with SERIALIZATION_SECONDS.labels("detail").time(), span("serialize"):
+            body = orjson.dumps(model.model_dump())
+        return CacheEntry(body, {"tags": [cache_tag(self.index, ID_FIELD, getattr(model, ID_FIELD))]})
+
+    def _missing_entry(self, model_id: str) -> CacheEntry:
+        """
+        Negative entry recording that the model does not exist; tagged like the model,
+        so publishing the model evicts it.
+        """
+        return CacheEntry(b"", {"missing": True, "tags": [cache_tag(self.index, ID_FIELD, model_id)]})
+
+    def _filter_tags(self, model_filter: BaseFilter) -> list[str]:
+        """
+        Invalidation tags of a listing derived from its filter, besides the tags of its items.
+        """
+        return []
 
     async def _get_model_from_elastic(self, model_id: str) -> M | None:
         """
-        Retrieves a model from Elasticsearch using the UUID field in documents.
+        Retrieves a model from Elasticsearch with a real-time GET by document id.
+
+        Documents are indexed with `_id` equal to their `uuid`.
 
         Parameters:
-        - model_uuid (str): The value of the 'uuid' field to search for.
+        - model_id (str): The unique identifier of the model.
 
         Returns:
         - An instance of the model class if found, or None if not found.
         """
         try:
-            response = await self.elastic.search(
-                index=self.index,
-                body={
-                    "query": {
-                        "term": {
-                            "uuid": model_id
-                        }
-                    },
-                    "size": 1
-                }
-            )
-            hits = response['hits']['hits']
-            if hits:
-                return self.model_class(**hits[0]['_source'])
+            doc = await self._read("get", lambda: self.elastic.get(index=self.index, id=model_id))
         except NotFoundError:
             return None
-        return None
+        with span("validate"):
+            return self.model_class(**doc["_source"])
 
-    async def _get_all_from_elastic(self, model_filter: BaseFilter) -> list[M]:
+    async def _get_models_from_elastic(self, model_ids: list[str]) -> dict[str, M]:
+        """
+        Retrieves several models from Elasticsearch with a single mget request.
+
+        Parameters:
+        - model_ids (list[str]): The unique identifiers of the models.
+
+        Returns:
+        - Found models keyed by their identifiers.
+        """
+        try:
+            response = await self._read("mget", lambda: self.elastic.mget(index=self.index, ids=model_ids))
+        except NotFoundError:
+            return {}
+        with span("validate"):
+            return {doc["_id"]: self.model_class(**doc["_source"]) for doc in response["docs"] if doc.get("found")}
+
+    async def _get_all_from_elastic(self, model_filter: BaseFilter) -> tuple[list[BaseModel], str | None]:
         """
         Retrieve multiple models from Elasticsearch based on the provided filter.
 
@@ -104,34 +591,148 @@ class ElasticDataStorage(AbstractDataStorage, Generic[M]):
         - model_filter (BaseFilter): An instance of BaseFilter containing filtering parameters.
 
         Returns:
-        - A list of model instances that match the filter criteria.
+        - A list of list-model (or projection) instances that match the filter criteria
+          and the cursor of the next page, or None if this page is the last one.
+
+        Raises:
+        - RequestValidationError: If the point in time of the cursor expired or is invalid.
         """
         query_body = await self._make_query(model_filter)
         try:
-            doc = await self.elastic.search(index=self.index, body=query_body)
+            pit_id = await self._point_in_time(model_filter)
+            if not pit_id:
+                doc = await self._read("search", lambda: self.elastic.search(index=self.index, body=query_body))
         except NotFoundError:
-            return []
-        return [self.model_class(**hit["_source"]) for hit in doc["hits"]["hits"]]
+            return [], None
+        if pit_id:
+            query_body["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+            try:
+                doc = await self._read("search", lambda: self.elastic.search(body=query_body))
+            except (NotFoundError, BadRequestError) as error:
+                raise query_error("cursor", "Point in time expired or invalid", pit_id) from error
+            pit_id = self._track_pit_id(pit_id, doc.get("pit_id", pit_id))
+        hits = doc["hits"]["hits"]
+        cursor = None
+        if hits and len(hits) == model_filter.page_size:
+            cursor = encode_cursor(hits[-1]["sort"], pit_id)
+        elif pit_id:
+            # Последняя страница: снимок больше не нужен, не держим его контекст до истечения
+            self._close_in_background(pit_id)
+        list_model = self._list_model(model_filter)
+        with span("validate"):
+            return [list_model(**hit["_source"]) for hit in hits], cursor
+
+    async def _read(self, operation: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Performs an idempotent Elasticsearch request, hedged if configured, through the circuit breaker.
+
+        Parameters:
+        - operation (str): Name of the operation for metrics and hedging delays.
+        - request (Callable): Factory of the request coroutine, called once per attempt.
+        """
+        if self.hedger:
+            return await self._guarded(lambda: self.hedger.run(operation, lambda: observe_elastic(operation, request())))
+        return await self._guarded(lambda: observe_elastic(operation, request()))
+
+    async def _guarded(self, request: Callable[[], Awaitable[Any]]) -> Any:
+        if self.breaker:
+            return await self.breaker.call(request)
+        return await request()
+
+    def _list_model(self, model_filter: BaseFilter) -> Type[BaseModel]:
+        """
+        The model of list items: a projection if the filter requests specific fields,
+        otherwise the list representation of the model.
+        """
+        fields = getattr(model_filter, "fields", None)
+        if fields:
+            return projection_model(self.model_class, fields)
+        return self.list_model_class
+
+    async def _point_in_time(self, model_filter: BaseFilter) -> str | None:
+        """
+        Returns the point in time to page over: the one carried by the cursor,
+        or a newly opened one when a snapshot is requested for the first page.
+        """
+        if model_filter.cursor:
+            return model_filter.cursor.get("pit_id")
+        if model_filter.pit:
+            self._check_pit_limit()
+            self._pit_opening += 1
+            try:
+                response = await self._guarded(lambda: observe_elastic(
+                    "open_point_in_time", self.elastic.open_point_in_time(index=self.index, keep_alive=PIT_KEEP_ALIVE)
+                ))
+            finally:
+                self._pit_opening -= 1
+            if self.pit_max_opens:
+                self._pit_opens[response["id"]] = time.monotonic()
+            return response["id"]
+        return None
+
+    def _check_pit_limit(self) -> None:
+        """
+        Raises PointInTimeLimitError if the worker opened (or is opening) `pit_max_opens` points
+        in time within the window, so clients can not exhaust the search contexts of Elasticsearch.
+        """
+        if not self.pit_max_opens:
+            return
+        now = time.monotonic()
+        self._pit_opens = {
+            pit_id: opened_at for pit_id, opened_at in self._pit_opens.items() if opened_at > now - PIT_OPENS_WINDOW
+        }
+        if len(self._pit_opens) + self._pit_opening >= self.pit_max_opens:
+            oldest = min(self._pit_opens.values(), default=now)
+            raise PointInTimeLimitError(oldest + PIT_OPENS_WINDOW - now)
+
+    def _track_pit_id(self, pit_id: str, new_pit_id: str) -> str:
+        """
+        Keeps counting a point in time of the worker under the id Elasticsearch returned for it.
+        """
+        if new_pit_id != pit_id and pit_id in self._pit_opens:
+            self._pit_opens[new_pit_id] = self._pit_opens.pop(pit_id)
+        return new_pit_id
+
+    def _close_in_background(self, pit_id: str) -> None:
+        run_in_background(self._close_point_in_time(pit_id), f"close point in time of {self.index}")
+
+    async def _close_point_in_time(self, pit_id: str) -> None:
+        try:
+            await self.elastic.close_point_in_time(body={"id": pit_id})
+        except (ApiError, TransportError) as error:
+            logger.warning("Failed to close point in time of index %s: %s", self.index, error)
+        # Место освобождает только снимок, открытый этим воркером и ещё учитываемый в окне
+        self._pit_opens.pop(pit_id, None)
 
     async def _make_query(self, model_filter: BaseFilter) -> dict[str, Any]:
         """
         Construct the Elasticsearch query body based on the provided filter with pagination.
 
+        Results are always sorted with the unique identifier as the last key, so the
+        order is stable and the sort values of the last hit can serve as a cursor
+        for search_after. Only the fields of the list model are fetched from `_source`.
+
         Parameters:
         - model_filter (BaseFilter): An instance of BaseFilter containing filtering parameters.
 
         Returns:
         - The Elasticsearch query body.
         """
-        return {
+        query_body = {
             "query": {
                 "bool": {
                     "must": [],
                 },
             },
+            "sort": ["_score", {SORT_TIEBREAKER: "asc"}],
             "size": model_filter.page_size,
-            "from": (model_filter.page_number - 1) * model_filter.page_size,
+            "_source": {"includes": list(self._list_model(model_filter).model_fields)},
         }
+        if model_filter.cursor:
+            query_body["search_after"] = model_filter.cursor["search_after"]
+        else:
+            query_body["from"] = (model_filter.page_number - 1) * model_filter.page_size
+        return query_body
 
     async def _enrich_query_with_search(self, model_filter: BaseFilter, query_body: dict[str, Any], field: str) -> dict[
         str, Any]:
@@ -157,8 +758,13 @@ class ElasticDataStorage(AbstractDataStorage, Generic[M]):
             })
         return query_body
 
-    @staticmethod
-    def _generate_cache_key(request: Request) -> str:
-        path = request.url.path
-        query_string = urlencode(sorted(request.query_params.items()))
-        return f"{CACHE_NAMESPACE}:{path}?{query_string}"
+    async def _generate_id_cache_key(self, model_id: str) -> str:
+        generation = await self._generation()
+        return f"{CACHE_NAMESPACE}:{generation}:{self.index}:{model_id}"
+
+    async def _generate_cache_key(self, model_filter: BaseFilter) -> str:
+        generation = await self._generation()
+        return f"{CACHE_NAMESPACE}:{generation}:{self.index}:list?{filter_query(model_filter)}"
+
+    async def _generation(self) -> str:
+        return await self.generation.get() if self.generation else "0"
@@ -1,22 +1,177 @@
-from functools import lru_cache
 from typing import Any
-from elasticsearch import AsyncElasticsearch
+from urllib.parse import parse_qsl
+import orjson
+from elasticsearch import AsyncElasticsearch, NotFoundError
 from redis.asyncio import Redis
-from fastapi import Request, Depends
 
-from db.elastic import get_elastic
-from db.redis import get_redis
-from models.film import Film
-from queries.film import FilmFilter
-from services.redis import RedisCache
-from services.elastic import ElasticDataStorage
+from core.config import settings
+from models.film import Film, FilmShort
+from queries.base import encode_cursor
+from queries.film import FilmFilter, SearchFilmFilter, SortOptions, SuggestFilmQuery
+from services.abstract import AbstractCache
+from services.bloom import KnownIds
+from services.breaker import CircuitBreaker
+from services.elastic import HOT_LIST, HOT_MODEL, ElasticDataStorage
+from services.compression import ResponseCompressor
+from services.generation import IndexGeneration
+from services.genres import GenreRegistry
+from services.hedging import HedgedRequests
+from services.hotkeys import HotKeys, warm_up
+from services.invalidation import cache_tag
+from services.lock import RedisLock
+from services.memory import MemoryCache
+from services.policy import CacheEntry, StaleWhileRevalidatePolicy, TTLCachePolicy
+from services.rankings import TopRankings
+from services.replica import ReplicaDataStorage
+from services.singleflight import SingleFlight
+from services.tiered import admit_to_shared
+
+# Загрузки фильмов из Elasticsearch, общие для всех запросов воркера
+film_single_flight = SingleFlight()
+# Поколение индекса фильмов, создаётся в lifespan приложения
+film_generation: IndexGeneration | None = None
+# Топ фильмов по рейтингу в Redis, создаётся в lifespan приложения
+film_rankings: TopRankings | None = None
+# Реплика каталога в памяти воркера, создаётся в lifespan приложения
+film_replica: ReplicaDataStorage | None = None
+# Учёт самых запрашиваемых ключей кэша фильмов, создаётся в lifespan приложения
+film_hot_keys: HotKeys | None = None
+# Фильтр Блума идентификаторов всех фильмов, создаётся в lifespan приложения
+film_known_ids: KnownIds | None = None
+# Сервис фильмов воркера, создаётся в lifespan приложения
+film_service: "FilmService | None" = None
+
+if settings.cache_mode == 'swr':
+    film_cache_policy = StaleWhileRevalidatePolicy(
+        soft_ttl=settings.cache_soft_ttl,
+        hard_ttl=settings.cache_hard_ttl,
+        beta=settings.cache_xfetch_beta,
+        jitter=settings.cache_ttl_jitter,
+    )
+else:
+    film_cache_policy = TTLCachePolicy(settings.cache_ttl, jitter=settings.cache_ttl_jitter)
+
+film_compressor = ResponseCompressor(
+    {"br": settings.response_brotli_quality, "gzip": settings.response_gzip_level},
+    min_size=settings.response_compression_min_size,
+) if settings.response_compression else None
+
+# Дублирование медленных чтений из Elasticsearch, общее для всех запросов воркера
+film_hedger = HedgedRequests(
+    percentile=settings.elastic_hedge_percentile,
+    min_delay=settings.elastic_hedge_min_delay_ms / 1000,
+    budget=settings.elastic_hedge_budget,
+) if settings.elastic_hedge_enabled else None
+
+# Размыкатель цепи перед Elasticsearch, общий для всех запросов воркера
+film_breaker = CircuitBreaker(
+    "elasticsearch",
+    failure_threshold=settings.elastic_breaker_failure_threshold,
+    reset_timeout=settings.elastic_breaker_reset_timeout,
+    half_open_max_calls=settings.elastic_breaker_half_open_max_calls,
+    success_threshold=settings.elastic_breaker_success_threshold,
+    call_timeout=settings.elastic_breaker_call_timeout,
+) if settings.elastic_breaker_enabled else None
+
+# Подсказки по префиксу дёшевы и коротко живут, поэтому кэшируются только в памяти воркера
+film_suggest_cache = MemoryCache(
+    max_entries=settings.suggest_cache_max_entries,
+    max_bytes=settings.suggest_cache_max_bytes,
+    max_ttl=settings.suggest_cache_ttl,
+    name="suggest",
+)
+
+# Поле автодополнения названий (completion), см. маппинг индекса movies
+SUGGEST_FIELD = "title.suggest"
+
+
+# Сортировка, для которой первые страницы берутся из материализованного топа
+RANKED_SORT = SortOptions.IMDB_RATING_DESC.value.removeprefix("-")
 
 
 class FilmService(ElasticDataStorage[Film]):
+    def __init__(
+            self,
+            *args: Any,
+            suggest_cache: AbstractCache | None = None,
+            rankings: TopRankings | None = None,
+            replica: ReplicaDataStorage | None = None,
+            known_ids: KnownIds | None = None,
+            **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.suggest_cache = suggest_cache or film_suggest_cache
+        self.rankings = rankings
+        self.replica = replica
+        self.known_ids = known_ids
+
+    async def get_raw_by_id(self, film_id: str) -> CacheEntry | None:
+        """
+        Films missing from the filter of known identifiers are not looked up at all.
+        """
+        if self.known_ids and not self.known_ids.might_exist(film_id):
+            return None
+        return await super().get_raw_by_id(film_id)
+
+    async def get_raw_by_ids(self, film_ids: list[str]) -> list[CacheEntry]:
+        if self.known_ids:
+            film_ids = [film_id for film_id in film_ids if self.known_ids.might_exist(film_id)]
+            if not film_ids:
+                return []
+        return await super().get_raw_by_ids(film_ids)
+
+    async def get_all_raw(self, film_filter: FilmFilter) -> CacheEntry | None:
+        """
+        Listings the catalog replica can answer skip the cache and Elasticsearch;
+        the rest, e.g. fuzzy search, go the usual way.
+        """
+        if self.replica and self.replica.can_answer(film_filter):
+            return await self.replica.get_all_raw(film_filter)
+        return await super().get_all_raw(film_filter)
+
+    async def get_suggestions_raw(self, suggest_query: SuggestFilmQuery) -> CacheEntry:
+        """
+        Retrieve the encoded JSON list of films whose titles start with the prefix.
+
+        Suggestions come from the completion field of the index and are kept in the
+        in-process prefix cache, so repeated keystrokes never reach Elasticsearch.
+
+        Parameters:
+        - suggest_query (SuggestFilmQuery): The prefix and the number of suggestions.
+
+        Returns:
+        - The cache entry holding the JSON list of films in the list representation, possibly empty.
+        """
+        generation = await self._generation()
+        cache_key = f"suggest:{generation}:{suggest_query.size}:{suggest_query.prefix}"
+        cached = await self.suggest_cache.get(cache_key)
+        entry = CacheEntry.unpack(cached) if cached else None
+        if entry is None:
+            entry = await self.single_flight.do(cache_key, lambda: self._load_suggestions(suggest_query))
+            await self.suggest_cache.set(cache_key, entry.pack(), settings.suggest_cache_ttl)
+        return entry
+
+    async def _load_suggestions(self, suggest_query: SuggestFilmQuery) -> CacheEntry:
+        query_body = {
+            "_source": list(self.list_model_class.model_fields),
+            "suggest": {
+                "films": {
+                    "prefix": suggest_query.prefix,
+                    "completion": {"field": SUGGEST_FIELD, "size": suggest_query.size, "skip_duplicates": True},
+                }
+            },
+        }
+        try:
+            doc = await self._read("suggest", lambda: self.elastic.search(index=self.index, body=query_body))
+        except NotFoundError:
+            return CacheEntry(b"[]")
+        options = doc["suggest"]["films"][0]["options"]
+        return CacheEntry(orjson.dumps([self.list_model_class(**option["_source"]).model_dump() for option in options]))
+
     async def _make_query(self, film_filter: FilmFilter) -> dict[str, Any]:
         query_body = await super()._make_query(film_filter)
         if film_filter.sort:
-            query_body["sort"] = [film_filter.sort]
+            query_body["sort"].insert(0, film_filter.sort)
         if film_filter.genre:
             query_body["query"]["bool"]["must"].append({
                 "terms": {
@@ -26,14 +181,186 @@ class FilmService(ElasticDataStorage[Film]):
         query_body = await self._enrich_query_with_search(film_filter, query_body, "title")
         return query_body
 
+    async def _load_models(self, film_filter: FilmFilter) -> CacheEntry | None:
+        """
+        Pages of films sorted by rating descending, plain or by genre, are served from
+        the rankings in Redis while they are deep enough; other pages query Elasticsearch.
+        """
+        if self.rankings and self._is_ranked(film_filter):
+            start = (film_filter.page_number - 1) * film_filter.page_size
+            items = await self.rankings.get_page(film_filter.genre, start, film_filter.page_size)
+            if items is not None:
+                return self._list_entry(film_filter, items, self._ranked_cursor(film_filter, items))
+        return await super()._load_models(film_filter)
+
+    @staticmethod
+    def _is_ranked(film_filter: FilmFilter) -> bool:
+        return (
+            film_filter.sort == {RANKED_SORT: {"order": "desc"}}
+            and not film_filter.cursor
+            and not film_filter.pit
+            and not film_filter.fields
+            and not getattr(film_filter, "query", None)
+        )
+
+    @staticmethod
+    def _ranked_cursor(film_filter: FilmFilter, items: list[dict[str, Any]]) -> str | None:
+        """
+        The cursor Elasticsearch would return for the page: sort values of its last film.
+
+        Filters without full-text search score every film 1.0.
+        """
+        if len(items) < film_filter.page_size or items[-1][RANKED_SORT] is None:
+            return None
+        return encode_cursor([items[-1][RANKED_SORT], 1.0, items[-1]["uuid"]])
+
+    def _filter_tags(self, film_filter: FilmFilter) -> list[str]:
+        return [cache_tag(self.index, "genres", film_filter.genre)] if film_filter.genre else []
+
 
-@lru_cache()
-def get_film_service(request: Request, redis: Redis = Depends(get_redis), elastic: AsyncElasticsearch = Depends(get_elastic),) -> FilmService:
-    cache = RedisCache(redis)
-    return FilmService(
-        request=request,
+def init_film_generation(elastic: AsyncElasticsearch, redis: Redis) -> IndexGeneration:
+    """Создание поколения индекса фильмов, входящего в ключи кэша."""
+    global film_generation
+    film_generation = IndexGeneration(
+        elastic, redis, settings.elastic_movies_index, settings.cache_generation_ttl, breaker=film_breaker
+    )
+    return film_generation
+
+
+def init_film_rankings(
+        elastic: AsyncElasticsearch, redis: Redis, genres: GenreRegistry, generation: IndexGeneration | None
+) -> TopRankings:
+    """Создание топа фильмов по рейтингу; материализация запускается отдельно через start()."""
+    global film_rankings
+    film_rankings = TopRankings(
+        elastic,
+        redis,
+        settings.elastic_movies_index,
+        field=RANKED_SORT,
+        id_field="uuid",
+        list_model_class=FilmShort,
+        size=settings.rankings_size,
+        genres=genres,
+        genres_count=settings.rankings_genres_count,
+        refresh_interval=settings.rankings_refresh_interval,
+        channel=settings.cache_invalidation_channel,
+        generation=generation,
+    )
+    return film_rankings
+
+
+def init_film_replica(
+        elastic: AsyncElasticsearch, redis: Redis, generation: IndexGeneration | None
+) -> ReplicaDataStorage:
+    """Создание реплики каталога фильмов; загрузка запускается отдельно через start()."""
+    global film_replica
+    film_replica = ReplicaDataStorage(
+        elastic,
+        redis,
+        settings.elastic_movies_index,
+        sort_field=RANKED_SORT,
+        list_model_class=FilmShort,
+        channel=settings.cache_invalidation_channel,
+        refresh_interval=settings.replica_refresh_interval,
+        generation=generation,
+    )
+    return film_replica
+
+
+def init_film_hot_keys(redis: Redis) -> HotKeys:
+    """Создание учёта горячих ключей кэша фильмов; сброс в Redis запускается отдельно через start()."""
+    global film_hot_keys
+    film_hot_keys = HotKeys(
+        redis,
+        settings.elastic_movies_index,
+        sample_rate=settings.hot_keys_sample_rate,
+        flush_interval=settings.hot_keys_flush_interval,
+        half_life=settings.hot_keys_half_life,
+        max_size=settings.hot_keys_max_size,
+    )
+    return film_hot_keys
+
+
+def init_film_known_ids(
+        elastic: AsyncElasticsearch, redis: Redis, generation: IndexGeneration | None
+) -> KnownIds:
+    """Создание фильтра идентификаторов фильмов; загрузка запускается отдельно через start()."""
+    global film_known_ids
+    film_known_ids = KnownIds(
+        elastic,
+        redis,
+        settings.elastic_movies_index,
+        channel=settings.cache_invalidation_channel,
+        refresh_interval=settings.known_ids_refresh_interval,
+        error_rate=settings.known_ids_error_rate,
+        generation=generation,
+    )
+    return film_known_ids
+
+
+def init_film_service(
+        cache: AbstractCache, redis: Redis, elastic: AsyncElasticsearch, stale_cache: AbstractCache | None = None
+) -> FilmService:
+    """Создание сервиса фильмов воркера, после поколения индекса, топа, реплики, фильтра идентификаторов
+    и горячих ключей; устаревшие копии ответов хранятся в stale_cache (общем кэше Redis)."""
+    global film_service
+    lock = RedisLock(redis, settings.cache_lock_ttl_ms) if settings.cache_lock_enabled else None
+    film_service = FilmService(
         cache=cache,
         elastic=elastic,
         model_class=Film,
-        index='movies',
+        list_model_class=FilmShort,
+        index=settings.elastic_movies_index,
+        single_flight=film_single_flight,
+        policy=film_cache_policy,
+        generation=film_generation,
+        compressor=film_compressor,
+        rankings=film_rankings,
+        replica=film_replica,
+        hot_keys=film_hot_keys,
+        known_ids=film_known_ids,
+        negative_ttl=settings.cache_negative_ttl,
+        hedger=film_hedger,
+        breaker=film_breaker,
+        stale_cache=stale_cache,
+        stale_ttl=settings.cache_stale_ttl,
+        pit_max_opens=settings.elastic_pit_max_opens,
+        lock=lock,
+        lock_wait=settings.cache_lock_wait_ms / 1000,
+        lock_poll_interval=settings.cache_lock_poll_ms / 1000,
     )
+    return film_service
+
+
+async def warm_film_cache(service: FilmService, hot_keys: HotKeys) -> int:
+    """
+    Prefetch the hottest film pages and films into the cache before the worker takes requests.
+
+    Parameters:
+    - service (FilmService): The film service of the worker.
+    - hot_keys (HotKeys): The sampled hot keys of the films index.
+
+    Returns:
+    - The number of keys loaded.
+    """
+
+    async def warm(hot_key: str) -> None:
+        kind, _, value = hot_key.partition(":")
+        # Горячие ключи известны всему кластеру: пишем их в Redis сразу, чтобы другие воркеры прочитали их оттуда
+        with admit_to_shared():
+            if kind == HOT_MODEL:
+                await service.get_raw_by_id(value)
+            elif kind == HOT_LIST:
+                # Параметры поиска включают параметры списка, поэтому фильтр поиска восстанавливает оба
+                await service.get_all_raw(SearchFilmFilter(**dict(parse_qsl(value))))
+
+    keys = await hot_keys.top(settings.cache_warmup_size)
+    return await warm_up(keys, warm, settings.cache_warmup_concurrency, settings.cache_warmup_timeout)
+
+
+async def get_film_service() -> FilmService:
+    return film_service
+
+
+async def get_film_breaker() -> CircuitBreaker | None:
+    return film_breaker
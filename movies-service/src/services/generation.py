@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable
+
+from elasticsearch import AsyncElasticsearch, ApiError, TransportError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from services.breaker import CircuitBreaker, CircuitOpenError
+
+GENERATION_NAMESPACE = "index_generation"
+
+logger = logging.getLogger(__name__)
+
+
+def generation_key(index: str) -> str:
+    return f"{GENERATION_NAMESPACE}:{index}"
+
+
+class IndexGeneration:
+    """
+    Token identifying the current contents of an index, used as a part of cache keys.
+
+    The token combines the uuids of the indices behind the index name (so a reindex
+    behind an alias, or a delete and re-create, changes it) with a counter in Redis
+    that loaders bump after an in-place reload. When the token changes, new requests
+    use new cache keys and the old entries simply expire. The token is cached in the
+    worker and re-read in the background every `ttl` seconds, so after the first read
+    it costs no I/O on the request path, and requests never wait for a re-read. With
+    a circuit breaker, the token is not read from Elasticsearch while the breaker is open.
+    """
+
+    def __init__(
+            self, elastic: AsyncElasticsearch, redis: Redis, index: str, ttl: float, breaker: CircuitBreaker | None = None
+    ):
+        self.elastic = elastic
+        self.redis = redis
+        self.index = index
+        self.ttl = ttl
+        self.breaker = breaker
+        self._token = "0"
+        self._expires_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    async def get(self) -> str:
+        if self._expires_at is None:
+            # Первое чтение ждём, чтобы не строить ключи кэша по заведомо неверному поколению
+            async with self._lock:
+                if self._expires_at is None:
+                    await self._refresh()
+        elif time.monotonic() >= self._expires_at and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._refresh())
+        return self._token
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def bump(self) -> int:
+        """
+        Invalidates all cache entries of the index by incrementing the Redis counter.
+        """
+        return await self.redis.incr(generation_key(self.index))
+
+    async def _refresh(self) -> None:
+        self._token = await self._read(self._token)
+        self._expires_at = time.monotonic() + self.ttl
+
+    async def _read(self, fallback: str) -> str:
+        try:
+            response = await (self.breaker.call(self._index_settings) if self.breaker else self._index_settings())
+            counter = await self.redis.get(generation_key(self.index))
+        except (ApiError, TransportError, RedisError, CircuitOpenError, asyncio.TimeoutError) as error:
+            # Если хранилища недоступны, продолжаем работать со старым поколением
+            logger.warning("Failed to read generation of index %s: %s", self.index, error)
+            return fallback
+        uuids = sorted(item["settings"]["index"]["uuid"] for item in response.values())
+        return f"{'-'.join(uuids)}.{int(counter or 0)}"
+
+    def _index_settings(self) -> Awaitable[Any]:
+        return self.elastic.indices.get_settings(index=self.index, name="index.uuid")
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+
+import orjson
+from elasticsearch import ApiError, AsyncElasticsearch, TransportError
+from redis.exceptions import RedisError
+
+from core.config import settings
+from core.metrics import observe_elastic
+from services.abstract import AbstractCache
+from services.generation import IndexGeneration
+from services.policy import CacheEntry
+
+GENRES_NAMESPACE = "genres"
+
+logger = logging.getLogger(__name__)
+
+
+class GenreRegistry:
+    """
+    Per-worker dictionary of genres with film counts, built by a terms aggregation.
+
+    The aggregation result is shared between workers through the cache (Redis), so
+    normally one worker per refresh interval runs it; the others pick it up from the
+    cache. Elasticsearch runs it with the shard request cache. Refreshes happen in
+    the background, so the request path never waits for them.
+
+    Until the first refresh succeeds, or if the aggregation was truncated by `size`,
+    the registry does not know all genres and `contains` accepts any genre.
+    `knows` re-runs the aggregation for a genre missing from the dictionary, at
+    most once per `recheck_interval` seconds, so a genre added to the index is
+    found before the next refresh.
+    """
+
+    def __init__(
+            self,
+            elastic: AsyncElasticsearch,
+            cache: AbstractCache,
+            index: str,
+            field: str,
+            size: int,
+            refresh_interval: float,
+            generation: IndexGeneration | None = None,
+            recheck_interval: float = 5.0,
+    ):
+        self.elastic = elastic
+        self.cache = cache
+        self.index = index
+        self.field = field
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.generation = generation
+        self.recheck_interval = recheck_interval
+        self.entry: CacheEntry | None = None
+        self._names: frozenset[str] | None = None
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._recheck: asyncio.Task | None = None
+        self._recheck_after = 0.0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def contains(self, genre: str) -> bool:
+        return self._names is None or genre in self._names
+
+    async def knows(self, genre: str) -> bool:
+        """
+        Whether the index may have films of the genre; a genre missing from the dictionary
+        is looked up again by a fresh aggregation, shared by concurrent callers.
+        """
+        if self.contains(genre):
+            return True
+        if time.monotonic() >= self._recheck_after:
+            self._recheck_after = time.monotonic() + self.recheck_interval
+            self._recheck = asyncio.create_task(self.refresh(force=True))
+        if self._recheck is not None and not self._recheck.done():
+            await asyncio.shield(self._recheck)
+        return self.contains(genre)
+
+    async def get(self) -> CacheEntry | None:
+        """
+        The encoded JSON list of genres with film counts, most popular first;
+        loaded on the first call if the background refresh has not finished yet.
+        """
+        if self.entry is None:
+            await self.refresh()
+        return self.entry
+
+    async def refresh(self, force: bool = False) -> None:
+        async with self._lock:
+            try:
+                await self._refresh(force)
+            except (ApiError, TransportError, RedisError) as error:
+                # Продолжаем работать со старым словарём до следующей попытки
+                logger.warning("Failed to refresh genres of index %s: %s", self.index, error)
+
+    async def _refresh(self, force: bool = False) -> None:
+        generation = await self.generation.get() if self.generation else "0"
+        cache_key = f"{GENRES_NAMESPACE}:{generation}:{self.index}"
+        cached = await self.cache.get(cache_key)
+        entry = CacheEntry.unpack(cached) if cached else None
+        if force or entry is None or entry.fresh_until <= time.time():
+            entry = await self._aggregate()
+            if entry is None:
+                return
+            entry.meta["fresh_until"] = time.time() + self.refresh_interval
+            # Запись переживает несколько интервалов, чтобы воркеры не ждали агрегацию при её сбоях
+            await self.cache.set(cache_key, entry.pack(), int(self.refresh_interval * 10))
+        self.entry = entry
+        self._names = frozenset(genre["name"] for genre in orjson.loads(entry.body)) \
+            if entry.meta.get("complete") else None
+
+    async def _aggregate(self) -> CacheEntry | None:
+        doc = await observe_elastic("genres", self.elastic.search(
+            index=self.index,
+            body={"size": 0, "aggs": {"genres": {"terms": {"field": self.field, "size": self.size}}}},
+            request_cache=True,
+        ))
+        aggregation = doc["aggregations"]["genres"]
+        genres = [{"name": bucket["key"], "films_count": bucket["doc_count"]} for bucket in aggregation["buckets"]]
+        if not genres:
+            # Пустой индекс (например, ещё не загруженный) не должен запрещать все жанры
+            return None
+        return CacheEntry(orjson.dumps(genres), {"complete": not aggregation.get("sum_other_doc_count")})
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+
+# Словарь жанров фильмов воркера, создаётся в lifespan приложения
+film_genres: GenreRegistry | None = None
+
+
+def init_film_genres(
+        elastic: AsyncElasticsearch, cache: AbstractCache, generation: IndexGeneration | None
+) -> GenreRegistry:
+    """Создание словаря жанров фильмов; обновление запускается отдельно через start()."""
+    global film_genres
+    film_genres = GenreRegistry(
+        elastic, cache, settings.elastic_movies_index, 'genres', settings.genres_max_size, settings.genres_refresh_interval, generation
+    )
+    return film_genres
+
+
+async def get_film_genres() -> GenreRegistry | None:
+    return film_genres
@@ -0,0 +1,102 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from core.metrics import ELASTIC_HEDGES
+
+T = TypeVar("T")
+
+# Сколько последних длительностей запроса хранить для расчёта перцентиля
+LATENCY_WINDOW = 1_000
+# Перцентиль пересчитывается не на каждый запрос, а раз в столько новых замеров
+RECOMPUTE_EVERY = 50
+
+
+class HedgedRequests:
+    """
+    Hedged idempotent requests: when a request takes longer than the `percentile` of the
+    recent latencies of its operation, a duplicate is sent, the first response wins and
+    the other request is cancelled.
+
+    With several Elasticsearch nodes the client sends the duplicate to the next node of
+    its pool, and Elasticsearch may route it to another copy of the shards, so a single
+    slow node or replica no longer sets the tail latency. Duplicates are paid from a token
+    bucket refilled by `budget` tokens per request and holding at most `burst` tokens, so
+    they stay within `budget` of the recent requests: a cluster-wide slowdown does not
+    double the load, however long the calm before it was. Until enough latencies are
+    observed, requests are not hedged.
+    """
+
+    def __init__(self, percentile: float, min_delay: float, budget: float, min_samples: int = 100, burst: float = 10):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self.burst = burst
+        self._tokens = 0.0
+        self._latencies: dict[str, deque[float]] = {}
+        self._delays: dict[str, float] = {}
+        self._since_recompute: dict[str, int] = {}
+
+    async def run(self, operation: str, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Send the request and, if it is slow, a duplicate of it.
+
+        Parameters:
+        - operation (str): Name of the operation whose latencies set the hedging delay.
+        - request (Callable): Factory of the request coroutine, called once per attempt.
+
+        Returns:
+        - The response of the attempt that completed successfully first.
+        """
+        self._tokens = min(self._tokens + self.budget, self.burst)
+        started = time.perf_counter()
+        delay = self.delay(operation)
+        if delay is None or self._tokens < 1:
+            result = await request()
+            self._observe(operation, time.perf_counter() - started)
+            return result
+
+        primary = asyncio.ensure_future(request())
+        attempts = {primary}
+        try:
+            done, attempts = await asyncio.wait(attempts, timeout=delay)
+            # Жетон проверяется ещё раз: его могли потратить запросы, ждавшие одновременно с этим
+            if not done and self._tokens >= 1:
+                self._tokens -= 1
+                ELASTIC_HEDGES.labels(operation, "sent").inc()
+                attempts.add(asyncio.ensure_future(request()))
+            error = None
+            while True:
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not primary:
+                            ELASTIC_HEDGES.labels(operation, "won").inc()
+                        self._observe(operation, time.perf_counter() - started)
+                        return attempt.result()
+                    error = error or attempt.exception()
+                if not attempts:
+                    raise error
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def delay(self, operation: str) -> float | None:
+        """
+        Time to wait for a request of the operation before hedging it; None until enough latencies are observed.
+        """
+        return self._delays.get(operation)
+
+    def _observe(self, operation: str, latency: float) -> None:
+        latencies = self._latencies.setdefault(operation, deque(maxlen=LATENCY_WINDOW))
+        latencies.append(latency)
+        count = self._since_recompute.get(operation, 0) + 1
+        if count >= RECOMPUTE_EVERY and len(latencies) >= self.min_samples:
+            ordered = sorted(latencies)
+            quantile = ordered[min(len(ordered) - 1, math.ceil(len(ordered) * self.percentile / 100) - 1)]
+            self._delays[operation] = max(quantile, self.min_delay)
+            count = 0
+        self._since_recompute[operation] = count
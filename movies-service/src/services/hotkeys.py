@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import random
+from collections import Counter
+from contextvars import ContextVar
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+HOT_KEYS_NAMESPACE = "hotkeys"
+
+logger = logging.getLogger(__name__)
+
+# Запросы прогрева не учитываются, иначе каждый перезапуск подкреплял бы уже горячие ключи
+_warming: ContextVar[bool] = ContextVar("warming", default=False)
+
+
+class HotKeys:
+    """
+    Most requested cache keys of an index, sampled by every worker into a Redis
+    sorted set with exponentially decaying scores.
+
+    Keys are recorded in their normalized form, without the index generation, so
+    they stay valid across reloads of the index. A fraction `sample_rate` of the
+    lookups is counted in memory and flushed with ZINCRBY every `flush_interval`
+    seconds. Every `half_life` seconds one worker of the cluster (the others see
+    the claim key and skip) halves all scores and trims the set to `max_size`
+    keys, so the set follows the current traffic rather than the all-time one.
+    """
+
+    def __init__(
+            self,
+            redis: Redis,
+            index: str,
+            sample_rate: float,
+            flush_interval: float,
+            half_life: float,
+            max_size: int,
+    ):
+        self.redis = redis
+        self.key = f"{HOT_KEYS_NAMESPACE}:{index}"
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.half_life = half_life
+        self.max_size = max_size
+        self._counts: Counter[str] = Counter()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+
+    def record(self, key: str) -> None:
+        if _warming.get():
+            return
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            self._counts[key] += 1
+
+    async def top(self, count: int) -> list[str]:
+        """
+        Up to `count` hottest keys, hottest first; empty if Redis is unavailable.
+        """
+        try:
+            keys = await self.redis.zrevrange(self.key, 0, count - 1)
+        except RedisError as error:
+            logger.warning("Failed to read hot keys %s: %s", self.key, error)
+            return []
+        return [key.decode() for key in keys]
+
+    async def flush(self) -> None:
+        """
+        Adds the sampled counts to the sorted set and decays it once per half-life.
+        """
+        counts, self._counts = self._counts, Counter()
+        try:
+            if await self.redis.set(f"{self.key}:decay", 1, nx=True, ex=max(int(self.half_life), 1)):
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.zunionstore(self.key, {self.key: 0.5})
+                    pipe.zremrangebyrank(self.key, 0, -self.max_size - 1)
+                    await pipe.execute()
+            if counts:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key, count in counts.items():
+                        # Каждый учтённый запрос представляет 1 / sample_rate запросов
+                        pipe.zincrby(self.key, count / self.sample_rate, key)
+                    await pipe.execute()
+        except RedisError as error:
+            logger.warning("Failed to flush hot keys %s: %s", self.key, error)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+async def warm_up(keys: list[str], warm: Callable[[str], Awaitable[None]], concurrency: int, timeout: float) -> int:
+    """
+    Loads the keys into the cache with at most `concurrency` loads in flight.
+
+    Keys that fail to load are skipped; when `timeout` seconds pass, the remaining
+    loads are cancelled so that a slow storage can not hold the worker back for long.
+    The loads are not recorded as hot keys.
+
+    Parameters:
+    - keys (list[str]): Normalized cache keys, hottest first.
+    - warm (Callable): Coroutine factory loading the value of a key into the cache.
+    - concurrency (int): Maximum number of simultaneous loads.
+    - timeout (float): Time budget of the whole warmup in seconds.
+
+    Returns:
+    - The number of keys loaded.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm_key(key: str) -> bool:
+        # Каждая загрузка - отдельная задача со своей копией контекста
+        _warming.set(True)
+        async with semaphore:
+            try:
+                await warm(key)
+            except Exception as error:
+                logger.warning("Failed to warm up cache key %s: %s", key, error)
+                return False
+            return True
+
+    tasks = [asyncio.create_task(warm_key(key)) for key in keys]
+    if not tasks:
+        return 0
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if pending:
+        logger.warning("Cache warmup timed out, %s of %s keys not loaded", len(pending), len(tasks))
+    loaded = sum(task.result() for task in done)
+    logger.info("Cache warmed up with %s of %s hot keys", loaded, len(tasks))
+    return loaded
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Collection
+
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from core.config import settings
+from services.abstract import AbstractCache
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повторной подпиской после потери соединения с Redis
+RECONNECT_DELAY = 1.0
+CHANGES_NAMESPACE = "changes"
+# Сколько помнить время последнего изменения документов индекса
+CHANGES_TTL = 60 * 60
+
+
+def cache_tag(index: str, field: str, value: str) -> str:
+    """
+    Tag of cache entries that depend on documents of the index with the given field value.
+    """
+    return f"{index}:{field}:{value}"
+
+
+def changes_key(index: str) -> str:
+    """
+    Key holding the time of the last published change of documents of the index.
+    """
+    return f"{CHANGES_NAMESPACE}:{index}"
+
+
+async def record_change(redis: Redis, index: str) -> None:
+    """
+    Records that documents of the index changed just now, so data materialized from
+    the index before (e.g. the rankings) is not served until it is rebuilt.
+    """
+    await redis.set(changes_key(index), time.time(), ex=CHANGES_TTL)
+
+
+def film_tags(uuids: Collection[str], genres: Collection[str]) -> list[str]:
+    index = settings.elastic_movies_index
+    return [cache_tag(index, "uuid", uuid) for uuid in uuids] + \
+        [cache_tag(index, "genres", genre) for genre in genres]
+
+
+async def publish_film_invalidation(
+        redis: Redis, cache: AbstractCache, channel: str, uuids: Collection[str], genres: Collection[str]
+) -> None:
+    """
+    Evicts cached details and listings of changed films from the shared cache and
+    notifies all workers to evict them from their in-process caches.
+
+    Parameters:
+    - redis (Redis): The Redis client to publish with.
+    - cache (AbstractCache): The shared cache.
+    - channel (str): The invalidation channel.
+    - uuids (Collection[str]): Identifiers of the changed films.
+    - genres (Collection[str]): Genres of the changed films.
+    """
+    # Изменение отмечается до вытеснения, чтобы вытесненные страницы не перестроились по старому топу
+    await record_change(redis, settings.elastic_movies_index)
+    await cache.invalidate(film_tags(uuids, genres))
+    await redis.publish(channel, orjson.dumps({"uuids": list(uuids), "genres": list(genres)}))
+
+
+class FilmCacheInvalidator:
+    """
+    Subscribes a worker to the invalidation channel and evicts the affected
+    entries from its in-process cache.
+
+    Messages are JSON objects {"uuids": [...], "genres": [...]}: a film detail is
+    evicted when its uuid changed, a listing when it contains a changed uuid or
+    is filtered by a changed genre.
+    """
+
+    def __init__(self, redis: Redis, cache: AbstractCache, channel: str):
+        self.redis = redis
+        self.cache = cache
+        self.channel = channel
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def handle(self, data: bytes) -> None:
+        message = parse_film_message(data)
+        if message is not None:
+            await self.cache.invalidate(film_tags(*message))
+
+    async def _run(self) -> None:
+        await subscribe(self.redis, self.channel, self.handle)
+
+
+def parse_film_message(data: bytes) -> tuple[list[str], list[str]] | None:
+    """
+    Changed film identifiers and genres of an invalidation message, or None if it is malformed.
+    """
+    try:
+        message = orjson.loads(data)
+        return list(message.get("uuids", [])), list(message.get("genres", []))
+    except (orjson.JSONDecodeError, AttributeError, TypeError):
+        logger.warning("Malformed invalidation message: %r", data)
+        return None
+
+
+async def subscribe(redis: Redis, channel: str, handler: Callable[[bytes], Awaitable[None]]) -> None:
+    """
+    Passes every message of the channel to the handler, resubscribing after connection losses.
+    """
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        await handler(message["data"])
+        except RedisError as error:
+            # Сообщения, пропущенные за время переподключения, покроет TTL записей
+            logger.warning("Subscription to %s lost: %s", channel, error)
+            await asyncio.sleep(RECONNECT_DELAY)
@@ -0,0 +1,47 @@
+import uuid
+
+from redis.asyncio import Redis
+
+LOCK_NAMESPACE = "lock"
+
+# Удаляем ключ только если блокировка всё ещё принадлежит нам
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLock:
+    """
+    Short-lived cluster-wide lock on a key, based on SET NX PX.
+
+    The lock expires by itself, so a crashed holder never blocks other workers
+    for longer than `ttl_ms`.
+    """
+
+    def __init__(self, redis: Redis, ttl_ms: int):
+        self.redis = redis
+        self.ttl_ms = ttl_ms
+
+    async def acquire(self, key: str) -> str | None:
+        """
+        Try to take the lock once.
+
+        Returns:
+        - A token to release the lock with, or None if the lock is held by someone else.
+        """
+        token = uuid.uuid4().hex
+        acquired = await self.redis.set(self._key(key), token, nx=True, px=self.ttl_ms)
+        return token if acquired else None
+
+    async def release(self, key: str, token: str) -> None:
+        await self.redis.eval(_RELEASE_SCRIPT, 1, self._key(key), token)
+
+    async def locked(self, key: str) -> bool:
+        return bool(await self.redis.exists(self._key(key)))
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"{LOCK_NAMESPACE}:{key}"
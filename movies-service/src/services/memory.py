@@ -0,0 +1,125 @@
+import time
+from collections import OrderedDict
+from typing import Any, Collection, NamedTuple
+
+import orjson
+
+from services.abstract import AbstractCache, CacheStats
+from services.sketch import FrequencySketch
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expire_at: float
+    tags: Collection[str]
+
+
+class MemoryCache(AbstractCache):
+    """
+    Per-process LRU cache bounded by entry count and total size, with per-entry TTL.
+
+    Values are kept as-is, so a hit costs neither network I/O nor deserialization.
+    The size of an entry is estimated once, on write, from its serialized form.
+    Entries can be tagged and later removed by tag.
+
+    With a frequency sketch, the cache admits entries TinyLFU-style: every lookup is
+    counted in the sketch, and when a new entry would evict the least recently used
+    one, it is admitted only if its key is estimated to be requested more often than
+    the key of the victim. One-off keys then can not push out the popular ones.
+    """
+
+    def __init__(
+            self,
+            max_entries: int,
+            max_bytes: int,
+            max_ttl: int,
+            name: str = "memory",
+            admission: FrequencySketch | None = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self.size = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        self.name = name
+        self.admission = admission
+        self.rejected = 0
+        self._stats = CacheStats(name)
+
+    async def get(self, key: str) -> Any:
+        if self.admission:
+            self.admission.increment(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats.record(misses=1)
+            return None
+        if entry.expire_at <= time.monotonic():
+            self._remove(key)
+            self._stats.record(misses=1)
+            return None
+        self._entries.move_to_end(key)
+        self._stats.record(hits=1)
+        return entry.value
+
+    async def set(self, key: str, value: Any, expire: int, tags: Collection[str] = ()) -> None:
+        size = self._estimate_size(value)
+        if size > self.max_bytes or not self._admit(key, size):
+            return
+        self._remove(key)
+        ttl = min(expire, self.max_ttl)
+        self._entries[key] = _Entry(value, size, time.monotonic() + ttl, tags)
+        self.size += size
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        self._evict()
+
+    async def invalidate(self, tags: Collection[str]) -> None:
+        for tag in tags:
+            for key in self._tags.get(tag, set()).copy():
+                self._remove(key)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        stats = {**self._stats.as_dict(), "entries": len(self._entries), "bytes": self.size}
+        if self.admission:
+            stats["rejected"] = self.rejected
+        return {self.name: stats}
+
+    def hottest(self, count: int) -> list[tuple[str, int]]:
+        return self.admission.hottest(count) if self.admission else []
+
+    def _admit(self, key: str, size: int) -> bool:
+        if self.admission is None or key in self._entries or not self._entries:
+            return True
+        if len(self._entries) < self.max_entries and self.size + size <= self.max_bytes:
+            return True
+        victim = next(iter(self._entries))
+        if self.admission.estimate(key) > self.admission.estimate(victim):
+            return True
+        self.rejected += 1
+        return False
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._forget(key, entry)
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+            self._forget(*self._entries.popitem(last=False))
+
+    def _forget(self, key: str, entry: _Entry) -> None:
+        self.size -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        if isinstance(value, (bytes, str)):
+            return len(value)
+        return len(orjson.dumps(value))
@@ -0,0 +1,173 @@
+import hashlib
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import orjson
+
+ENTRY_SEPARATOR = b"\n"
+
+
+@dataclass
+class CacheEntry:
+    """
+    A cached response body together with its metadata.
+
+    The entry is stored as a small JSON header line followed by the body as-is,
+    so a hit is served without parsing or re-serializing the body.
+
+    Attributes:
+    - body (bytes): The encoded response body.
+    - meta (dict[str, Any]): Entry metadata, e.g. freshness information of the cache policy,
+      the invalidation tags ("tags") of the entry, the wall-clock time its cache key expires
+      ("expires_at") or the mark of a negative entry ("missing").
+    - variants (dict[str, bytes]): The body compressed with other content codings, keyed by
+      coding name; stored after the body, with their sizes in the header.
+    """
+    body: bytes
+    meta: dict[str, Any] = field(default_factory=dict)
+    variants: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def fresh_until(self) -> float:
+        return self.meta.get("fresh_until", math.inf)
+
+    @property
+    def delta(self) -> float:
+        return self.meta.get("delta", 0.0)
+
+    @property
+    def tags(self) -> list[str]:
+        return self.meta.get("tags", [])
+
+    @property
+    def missing(self) -> bool:
+        """
+        Whether the entry is a negative one, recording that there is nothing to return.
+        """
+        return self.meta.get("missing", False)
+
+    @property
+    def etag(self) -> str:
+        """
+        Strong validator of the response: a digest of the body and the cursor of the next page.
+
+        It is computed once, when the entry is packed, and stored in the metadata.
+        """
+        etag = self.meta.get("etag")
+        if etag is None:
+            digest = hashlib.blake2b(self.body, digest_size=16)
+            if cursor := self.meta.get("cursor"):
+                digest.update(cursor.encode())
+            etag = f'"{digest.hexdigest()}"'
+        return etag
+
+    def pack(self) -> bytes:
+        meta = {**self.meta, "etag": self.etag}
+        if self.variants:
+            meta["variants"] = {encoding: len(data) for encoding, data in self.variants.items()}
+        return orjson.dumps(meta) + ENTRY_SEPARATOR + self.body + b"".join(self.variants.values())
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "CacheEntry | None":
+        header, separator, body = data.partition(ENTRY_SEPARATOR)
+        if not separator:
+            return None
+        try:
+            meta = orjson.loads(header)
+        except orjson.JSONDecodeError:
+            return None
+        variants = {}
+        end = len(body)
+        for encoding, size in reversed(meta.pop("variants", {}).items()):
+            variants[encoding] = body[end - size:end]
+            end -= size
+        return cls(body=body[:end], meta=meta, variants=variants)
+
+
+def entry_meta(data: Any) -> dict[str, Any]:
+    """
+    Metadata of a packed entry, read from its header line without splitting the body.
+    """
+    if not isinstance(data, bytes):
+        return {}
+    header, separator, _ = data.partition(ENTRY_SEPARATOR)
+    if not separator:
+        return {}
+    try:
+        return orjson.loads(header)
+    except orjson.JSONDecodeError:
+        return {}
+
+
+def entry_tags(data: bytes) -> tuple[str, ...]:
+    """
+    Invalidation tags stored in the metadata of a packed entry.
+    """
+    return tuple(entry_meta(data).get("tags", ()))
+
+
+def entry_expiry(data: bytes) -> float | None:
+    """
+    Wall-clock time the cache key of a packed entry expires at, if it was recorded on write.
+    """
+    return entry_meta(data).get("expires_at")
+
+
+class TTLCachePolicy:
+    """
+    Plain expiry: an entry is fresh until its key expires in the cache.
+
+    The key TTL is spread by a random jitter, so keys written together
+    do not all expire at the same moment.
+    """
+
+    def __init__(self, ttl: int, jitter: float = 0.0):
+        self.ttl = ttl
+        self.jitter = jitter
+
+    def stamp(self, entry: CacheEntry, delta: float) -> CacheEntry:
+        return entry
+
+    def expire(self) -> int:
+        return self._jittered(self.ttl)
+
+    def should_refresh(self, entry: CacheEntry) -> bool:
+        return False
+
+    def _jittered(self, ttl: float) -> int:
+        if not self.jitter:
+            return int(ttl)
+        return max(1, int(ttl * random.uniform(1 - self.jitter, 1 + self.jitter)))
+
+
+class StaleWhileRevalidatePolicy(TTLCachePolicy):
+    """
+    Separate soft and hard TTLs with probabilistic early recomputation.
+
+    Within the soft TTL an entry is fresh. After it the entry is still served,
+    but the caller is expected to refresh it in the background; the key itself
+    lives until the hard TTL. Refreshes start early with a probability growing
+    towards the soft expiry and with the recompute time (XFetch), so a hot key
+    is usually refreshed before it ever turns stale.
+    """
+
+    def __init__(self, soft_ttl: int, hard_ttl: int, beta: float = 1.0, jitter: float = 0.0):
+        super().__init__(hard_ttl, jitter)
+        self.soft_ttl = soft_ttl
+        self.beta = beta
+
+    def stamp(self, entry: CacheEntry, delta: float) -> CacheEntry:
+        entry.meta["fresh_until"] = time.time() + self._jittered(self.soft_ttl)
+        entry.meta["delta"] = delta
+        return entry
+
+    def should_refresh(self, entry: CacheEntry) -> bool:
+        now = time.time()
+        if now >= entry.fresh_until:
+            return True
+        if not self.beta or not entry.delta:
+            return False
+        return now - entry.delta * self.beta * math.log(1.0 - random.random()) >= entry.fresh_until
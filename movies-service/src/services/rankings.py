@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Type
+
+import orjson
+from elasticsearch import ApiError, AsyncElasticsearch, TransportError
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from core.metrics import observe_elastic
+from services.generation import IndexGeneration
+from services.genres import GenreRegistry
+from services.invalidation import changes_key, parse_film_message, record_change, subscribe
+
+RANKINGS_NAMESPACE = "top"
+# Рейтинг всего индекса, без фильтра по жанру
+ALL_GENRES = "_all"
+# Через сколько секунд изменение документа видно поиску (refresh_interval индекса)
+CHANGE_VISIBILITY_DELAY = 1.0
+# Перестроение после изменения документов - не чаще раза за столько секунд на кластер
+CHANGE_REBUILD_INTERVAL = 10
+
+logger = logging.getLogger(__name__)
+
+
+class TopRankings:
+    """
+    Top `size` documents of an index by a numeric field, overall and for the most
+    popular genres, materialized in Redis sorted sets.
+
+    A sorted set holds document identifiers scored by the negated field value, so
+    ZRANGE returns them in descending order of the field with ties broken by the
+    identifier, the same order Elasticsearch sorts them in; documents without the
+    value come last. The list representations of the documents are kept in a hash
+    next to the sets and fetched with HMGET.
+
+    Sets are rebuilt every `refresh_interval` seconds by one worker of the cluster
+    (the others see the claim key and skip), and are keyed by the index generation,
+    so a reload of the index switches readers to Elasticsearch until the rankings
+    are rebuilt. Likewise, once a change of documents is published to the
+    invalidation `channel`, rankings built before it are not served, and one worker
+    rebuilds them shortly after, at most once per CHANGE_REBUILD_INTERVAL seconds.
+    """
+
+    def __init__(
+            self,
+            elastic: AsyncElasticsearch,
+            redis: Redis,
+            index: str,
+            field: str,
+            id_field: str,
+            list_model_class: Type[BaseModel],
+            size: int,
+            genres: GenreRegistry,
+            genres_count: int,
+            refresh_interval: float,
+            channel: str,
+            generation: IndexGeneration | None = None,
+    ):
+        self.elastic = elastic
+        self.redis = redis
+        self.index = index
+        self.field = field
+        self.id_field = id_field
+        self.list_model_class = list_model_class
+        self.size = size
+        self.genres = genres
+        self.genres_count = genres_count
+        self.refresh_interval = refresh_interval
+        self.channel = channel
+        self.generation = generation
+        self._tasks: list[asyncio.Task] = []
+        self._rebuild: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(subscribe(self.redis, self.channel, self.handle))]
+
+    async def stop(self) -> None:
+        tasks = self._tasks + ([self._rebuild] if self._rebuild else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def handle(self, data: bytes) -> None:
+        """
+        Records the change (for publishers that did not) and schedules a rebuild of the rankings.
+        """
+        if parse_film_message(data) is None:
+            return
+        try:
+            await record_change(self.redis, self.index)
+        except RedisError as error:
+            logger.warning("Failed to record change of index %s: %s", self.index, error)
+        if self._rebuild is None or self._rebuild.done():
+            self._rebuild = asyncio.create_task(self._rebuild_after_change())
+
+    async def get_page(self, genre: str | None, start: int, count: int) -> list[dict[str, Any]] | None:
+        """
+        Documents at positions [start, start + count) of the ranking of the genre.
+
+        Returns:
+        - The list representations of the documents, or None if the ranking is not
+          materialized or does not reach that deep, so the caller has to query Elasticsearch.
+        """
+        if start + count > self.size:
+            return None
+        prefix = await self._prefix()
+        ranking_key = f"{prefix}:{genre or ALL_GENRES}"
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(ranking_key)
+                pipe.zrange(ranking_key, start, start + count - 1)
+                pipe.mget(f"{prefix}:built_at", changes_key(self.index))
+                exists, ids, (built_at, changed_at) = await pipe.execute()
+            if not exists or self._outdated(built_at, changed_at):
+                return None
+            if not ids:
+                return []
+            items = await self.redis.hmget(f"{prefix}:items", ids)
+        except RedisError as error:
+            logger.warning("Failed to read ranking %s: %s", ranking_key, error)
+            return None
+        if not all(items):
+            return None
+        return [orjson.loads(item) for item in items]
+
+    async def refresh(self, claim: str = "claim", claim_ttl: float | None = None) -> None:
+        """
+        Rebuilds the rankings unless another worker has claimed it within `claim_ttl` seconds
+        (the refresh interval by default).
+        """
+        try:
+            prefix = await self._prefix()
+            if not await self.redis.set(f"{prefix}:{claim}", 1, nx=True, ex=int(claim_ttl or self.refresh_interval)):
+                return
+            await self._materialize(prefix)
+        except (ApiError, TransportError, RedisError) as error:
+            logger.warning("Failed to materialize rankings of index %s: %s", self.index, error)
+
+    async def _materialize(self, prefix: str) -> None:
+        built_at = time.time()
+        genres = await self.genres.get()
+        names = [genre["name"] for genre in orjson.loads(genres.body)[:self.genres_count]] if genres else []
+        rankings = {ALL_GENRES: await self._top(None)}
+        for name in names:
+            rankings[name] = await self._top(name)
+        rankings = {name: documents for name, documents in rankings.items() if documents}
+        if not rankings:
+            return
+        # Наборы живут несколько интервалов, чтобы пережить сбои обновления
+        expire = int(self.refresh_interval * 10)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for name, documents in rankings.items():
+                ranking_key = f"{prefix}:{name}"
+                pipe.delete(ranking_key)
+                pipe.zadd(ranking_key, {document[self.id_field]: self._score(document) for document in documents})
+                pipe.expire(ranking_key, expire)
+            items = {
+                document[self.id_field]: orjson.dumps(self.list_model_class(**document).model_dump())
+                for documents in rankings.values() for document in documents
+            }
+            pipe.delete(f"{prefix}:items")
+            pipe.hset(f"{prefix}:items", mapping=items)
+            pipe.expire(f"{prefix}:items", expire)
+            pipe.set(f"{prefix}:built_at", built_at, ex=expire)
+            await pipe.execute()
+
+    async def _top(self, genre: str | None) -> list[dict[str, Any]]:
+        query: dict[str, Any] = {"terms": {"genres": [genre]}} if genre else {"match_all": {}}
+        doc = await observe_elastic("rankings", self.elastic.search(
+            index=self.index,
+            body={
+                "query": query,
+                "sort": [{self.field: "desc"}, {self.id_field: "asc"}],
+                "size": self.size,
+                "_source": {"includes": list(self.list_model_class.model_fields)},
+            },
+        ))
+        return [hit["_source"] for hit in doc["hits"]["hits"]]
+
+    @staticmethod
+    def _outdated(built_at: bytes | None, changed_at: bytes | None) -> bool:
+        """
+        Whether documents changed after the rankings were built, or too shortly before
+        for the change to be visible to the searches they were built with.
+        """
+        if changed_at is None:
+            return False
+        return built_at is None or float(built_at) < float(changed_at) + CHANGE_VISIBILITY_DELAY
+
+    async def _rebuild_after_change(self) -> None:
+        # Перестраиваем, когда изменение уже видно поиску
+        await asyncio.sleep(CHANGE_VISIBILITY_DELAY)
+        await self.refresh("rebuild", CHANGE_REBUILD_INTERVAL)
+
+    def _score(self, document: dict[str, Any]) -> float:
+        value = document.get(self.field)
+        return -value if value is not None else math.inf
+
+    async def _prefix(self) -> str:
+        generation = await self.generation.get() if self.generation else "0"
+        return f"{RANKINGS_NAMESPACE}:{generation}:{self.index}:{self.field}"
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
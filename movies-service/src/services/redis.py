@@ -1,25 +1,115 @@
-from typing import Any
-import json
+from typing import Any, Collection
 from redis.asyncio import Redis
-from services.abstract import AbstractCache
+from core.tracing import span
+from services.abstract import AbstractCache, CacheStats
+from services.codecs import CacheCodec, OrjsonCodec
+
+# Наборы тегов - sorted set: ключ записи -> время его истечения
+TAG_NAMESPACE = "tags"
+# Счётчики промахов ключей во всех воркерах, по ним ключи допускаются в общий кэш
+SEEN_NAMESPACE = "seen"
+# Добавляет ключ ARGV[1], живущий ARGV[2] секунд, в наборы тегов KEYS, убирает из них истёкшие ключи
+# и назначает каждому набору время жизни до истечения самого долгоживущего ключа в нём
+TAG_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local expire_at = now + tonumber(ARGV[2])
+for _, tag in ipairs(KEYS) do
+    redis.call('ZADD', tag, expire_at, ARGV[1])
+    redis.call('ZREMRANGEBYSCORE', tag, '-inf', now)
+    local last = redis.call('ZRANGE', tag, -1, -1, 'WITHSCORES')
+    redis.call('EXPIREAT', tag, math.ceil(tonumber(last[2])))
+end
+return #KEYS
+"""
 
 
 class RedisCache(AbstractCache):
-    def __init__(self, redis: Redis):
+    def __init__(self, redis: Redis, codec: CacheCodec | None = None):
         self.redis = redis
+        self.codec = codec or CacheCodec(OrjsonCodec())
+        self._stats = CacheStats("redis")
+        self._tag_script = redis.register_script(TAG_SCRIPT)
 
     async def get(self, key: str) -> Any:
-        data = await self.redis.get(key)
-        if not data:
-            return None
-        try:
-            return json.loads(data)
-        except json.JSONDecodeError:
+        with span("redis", command="get"):
+            data = await self.redis.get(key)
+        value = self.codec.decode(data) if data else None
+        if value is None:
+            self._stats.record(misses=1)
             return None
+        self._stats.record(hits=1)
+        return value
+
+    async def set(self, key: str, value: Any, expire: int, tags: Collection[str] = ()) -> None:
+        with span("redis", command="set"):
+            if not tags:
+                await self.redis.set(key, self.codec.encode(value), ex=expire)
+                return
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, self.codec.encode(value), ex=expire)
+                await self._tag(pipe, key, expire, tags)
+                await pipe.execute()
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        with span("redis", command="mget"):
+            values = [self.codec.decode(data) if data else None for data in await self.redis.mget(keys)]
+        hits = sum(value is not None for value in values)
+        self._stats.record(hits=hits, misses=len(values) - hits)
+        return values
+
+    async def set_many(
+            self, values: dict[str, Any], expire: int, tags: dict[str, Collection[str]] | None = None
+    ) -> None:
+        tags = tags or {}
+        with span("redis", command="set_many"):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    pipe.set(key, self.codec.encode(value), ex=expire)
+                    await self._tag(pipe, key, expire, tags.get(key, ()))
+                await pipe.execute()
+
+    async def invalidate(self, tags: Collection[str]) -> None:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                pipe.zrange(tag_key, 0, -1)
+            members = await pipe.execute()
+        keys = set().union(*members)
+        if keys or tag_keys:
+            await self.redis.delete(*keys, *tag_keys)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {"redis": self._stats.as_dict()}
+
+    async def count_misses(self, keys: list[str], window: int) -> list[int]:
+        """
+        Counts a miss of each key in all workers of the cluster.
+
+        Parameters:
+        - keys (list[str]): Keys that missed the cache.
+        - window (int): Seconds the count of a key lives after its first miss.
+
+        Returns:
+        - The number of misses of each key within the window, this one included.
+        """
+        with span("redis", command="count_misses"):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    # SET NX задаёт время жизни только первому промаху, INCR его сохраняет
+                    pipe.set(f"{SEEN_NAMESPACE}:{key}", 0, ex=window, nx=True)
+                    pipe.incr(f"{SEEN_NAMESPACE}:{key}")
+                results = await pipe.execute()
+        return results[1::2]
+
+    async def _tag(self, pipe, key: str, expire: int, tags: Collection[str]) -> None:
+        """
+        Adds the key to the sets of its tags with one script call. Expired keys are pruned
+        from the sets on every write, so the set of a hot tag stays as small as its live keys.
+        """
+        if tags:
+            await self._tag_script(keys=[self._tag_key(tag) for tag in tags], args=[key, expire], client=pipe)
 
-    async def set(self, key: str, value: Any, expire: int) -> None:
-        if isinstance(value, (dict, list)):
-            serialized = json.dumps(value)
-        else:
-            serialized = str(value)
-        await self.redis.set(key, serialized, ex=expire)
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{TAG_NAMESPACE}:{tag}"
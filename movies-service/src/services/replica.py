@@ -0,0 +1,293 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Iterable, Type
+
+import numpy as np
+import orjson
+from elasticsearch import ApiError, AsyncElasticsearch, TransportError
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from core.metrics import observe_elastic
+from queries.base import BaseFilter, encode_cursor
+from services.abstract import AbstractDataStorage
+from services.elastic import ID_FIELD, scan_index
+from services.generation import IndexGeneration
+from services.invalidation import parse_film_message, subscribe
+from services.policy import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Сортировки реплики: ключ — значение SortOptions без знака, None — порядок по умолчанию
+SORTS = (None, "asc", "desc")
+
+
+@dataclass(frozen=True)
+class ReplicaSnapshot:
+    """
+    Immutable columnar copy of an index.
+
+    Row i of every column describes one document: its identifier, rating, genre bitset
+    (one bit per genre of `genres`, packed into 64-bit words) and the slice
+    bodies[offsets[i]:offsets[i + 1]] with its list representation as JSON.
+    Changed documents are appended as new rows and the old rows are marked dead,
+    so an update never rewrites the bodies. `orders` hold the alive rows in every
+    supported sort order, ties broken by identifier like in Elasticsearch.
+    """
+    ids: np.ndarray
+    ratings: np.ndarray
+    genre_bits: np.ndarray
+    alive: np.ndarray
+    offsets: np.ndarray
+    bodies: bytes
+    genres: dict[str, int]
+    rows: dict[str, int]
+    orders: dict[str | None, np.ndarray]
+    generation: str
+
+    @classmethod
+    def build(cls, documents: list[dict[str, Any]], generation: str) -> "ReplicaSnapshot":
+        empty = cls(
+            ids=np.array([], dtype="S1"), ratings=np.array([], dtype=np.float64),
+            genre_bits=np.zeros((0, 1), dtype=np.uint64), alive=np.array([], dtype=bool),
+            offsets=np.zeros(1, dtype=np.int64), bodies=b"", genres={}, rows={}, orders={}, generation=generation,
+        )
+        return empty.with_documents(documents, ())
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def with_documents(self, documents: list[dict[str, Any]], removed: Iterable[str]) -> "ReplicaSnapshot":
+        """
+        A new snapshot with the documents added or replaced and the removed identifiers deleted.
+
+        Every document is a dict with "id", "rating", "genres" and "body" (bytes).
+        """
+        genres = dict(self.genres)
+        for document in documents:
+            for genre in document["genres"]:
+                genres.setdefault(genre, len(genres))
+        words = max(1, (len(genres) + 63) // 64)
+        added_bits = np.zeros((len(documents), words), dtype=np.uint64)
+        for row, document in enumerate(documents):
+            for genre in document["genres"]:
+                word, bit = divmod(genres[genre], 64)
+                added_bits[row, word] |= np.uint64(1 << bit)
+        old_bits = self.genre_bits
+        if old_bits.shape[1] < words:
+            old_bits = np.hstack([old_bits, np.zeros((len(old_bits), words - old_bits.shape[1]), dtype=np.uint64)])
+
+        alive = self.alive.copy()
+        rows = dict(self.rows)
+        for document_id in [*removed, *(document["id"] for document in documents)]:
+            row = rows.pop(document_id, None)
+            if row is not None:
+                alive[row] = False
+        start = len(self.ids)
+        for row, document in enumerate(documents):
+            rows[document["id"]] = start + row
+
+        bodies = [document["body"] for document in documents]
+        sizes = np.fromiter((len(body) for body in bodies), dtype=np.int64, count=len(bodies))
+        ids = np.concatenate([self.ids.astype(object), [document["id"].encode() for document in documents]])
+        ratings = np.concatenate([
+            self.ratings,
+            np.array([np.nan if document["rating"] is None else document["rating"] for document in documents],
+                     dtype=np.float64),
+        ])
+        snapshot = ReplicaSnapshot(
+            ids=ids.astype(bytes) if len(ids) else ids.astype("S1"),
+            ratings=ratings,
+            genre_bits=np.vstack([old_bits, added_bits]),
+            alive=np.concatenate([alive, np.ones(len(documents), dtype=bool)]),
+            offsets=np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(sizes)]),
+            bodies=self.bodies + b"".join(bodies),
+            genres=genres,
+            rows=rows,
+            orders={},
+            generation=self.generation,
+        )
+        snapshot.orders.update(snapshot._sort_orders())
+        return snapshot
+
+    def page(self, genre: str | None, sort: str | None, start: int, size: int) -> tuple[list[int], int]:
+        """
+        Rows of the page and the number of matching documents.
+        """
+        order = self.orders[sort]
+        if genre is not None:
+            position = self.genres.get(genre)
+            if position is None:
+                return [], 0
+            word, bit = divmod(position, 64)
+            order = order[(self.genre_bits[order, word] & np.uint64(1 << bit)) != 0]
+        return order[start:start + size].tolist(), len(order)
+
+    def body(self, rows: list[int]) -> bytes:
+        offsets, bodies = self.offsets, self.bodies
+        return b"[" + b",".join(bodies[offsets[row]:offsets[row + 1]] for row in rows) + b"]"
+
+    def sort_values(self, row: int, sort: str | None) -> list[Any] | None:
+        """
+        Sort values of the row as Elasticsearch returns them for the same sort, to build cursors;
+        None for a document without a rating, whose sort value only Elasticsearch knows, as
+        search_after does not accept null.
+        """
+        document_id = self.ids[row].decode()
+        if sort is None:
+            return [1.0, document_id]
+        rating = self.ratings[row]
+        if np.isnan(rating):
+            return None
+        return [float(rating), 1.0, document_id]
+
+    def _sort_orders(self) -> dict[str | None, np.ndarray]:
+        id_rank = np.empty(len(self.ids), dtype=np.int64)
+        id_rank[np.argsort(self.ids, kind="stable")] = np.arange(len(self.ids))
+        missing = np.isnan(self.ratings)
+        ratings = np.where(missing, 0.0, self.ratings)
+        orders = {
+            None: np.argsort(id_rank, kind="stable"),
+            # Документы без рейтинга идут последними при любом направлении, как в Elasticsearch
+            "asc": np.lexsort((id_rank, ratings, missing)),
+            "desc": np.lexsort((id_rank, -ratings, missing)),
+        }
+        return {sort: order[self.alive[order]] for sort, order in orders.items()}
+
+
+class ReplicaDataStorage(AbstractDataStorage):
+    """
+    In-memory read replica of an index for listings: genre filter, sort by one numeric
+    field and page-number pagination are answered with vectorized NumPy operations
+    over a columnar snapshot, without Elasticsearch or the cache.
+
+    The snapshot is loaded in the background with a point in time, patched with the
+    documents of every invalidation message and reloaded when the index generation
+    changes. Until it is loaded, and for requests it cannot answer (full-text search,
+    cursors, projections), `can_answer` is False and the caller queries Elasticsearch.
+    """
+
+    def __init__(
+            self,
+            elastic: AsyncElasticsearch,
+            redis: Redis,
+            index: str,
+            sort_field: str,
+            list_model_class: Type[BaseModel],
+            channel: str,
+            refresh_interval: float,
+            generation: IndexGeneration | None = None,
+    ):
+        self.elastic = elastic
+        self.redis = redis
+        self.index = index
+        self.sort_field = sort_field
+        self.list_model_class = list_model_class
+        self.channel = channel
+        self.refresh_interval = refresh_interval
+        self.generation = generation
+        self.snapshot: ReplicaSnapshot | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._lock = asyncio.Lock()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(subscribe(self.redis, self.channel, self.handle))]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def can_answer(self, model_filter: BaseFilter) -> bool:
+        sort = getattr(model_filter, "sort", None)
+        return (
+            self.snapshot is not None
+            and (sort is None or list(sort) == [self.sort_field])
+            and not model_filter.cursor
+            and not model_filter.pit
+            and not getattr(model_filter, "fields", None)
+            and not getattr(model_filter, "query", None)
+        )
+
+    async def get_by_id(self, model_id: str) -> BaseModel | None:
+        """
+        The list representation of the model, if it is in the replica.
+        """
+        snapshot = self.snapshot
+        row = snapshot.rows.get(model_id) if snapshot else None
+        if row is None:
+            return None
+        return self.list_model_class(**orjson.loads(snapshot.body([row])[1:-1]))
+
+    async def get_all(self, model_filter: BaseFilter) -> list[BaseModel]:
+        entry = await self.get_all_raw(model_filter)
+        return [self.list_model_class(**item) for item in orjson.loads(entry.body)] if entry else []
+
+    async def get_all_raw(self, model_filter: BaseFilter) -> CacheEntry | None:
+        """
+        The encoded JSON list page of models matching the filter, in the list representation,
+        with the cursor of the next page in the metadata (none past the last rated document
+        when sorting by rating, such pages are addressed by number); None if no models match.
+        """
+        snapshot = self.snapshot
+        sort = getattr(model_filter, "sort", None)
+        direction = sort[self.sort_field]["order"] if sort else None
+        start = (model_filter.page_number - 1) * model_filter.page_size
+        rows, total = snapshot.page(getattr(model_filter, "genre", None), direction, start, model_filter.page_size)
+        if not rows:
+            return None
+        entry = CacheEntry(snapshot.body(rows))
+        sort_values = snapshot.sort_values(rows[-1], direction) if start + len(rows) < total else None
+        if sort_values is not None:
+            entry.meta["cursor"] = encode_cursor(sort_values)
+        return entry
+
+    async def handle(self, data: bytes) -> None:
+        message = parse_film_message(data)
+        if message is None or not message[0] or self.snapshot is None:
+            return
+        async with self._lock:
+            try:
+                await self._apply(message[0])
+            except (ApiError, TransportError) as error:
+                logger.warning("Failed to update replica of index %s: %s", self.index, error)
+
+    async def refresh(self) -> None:
+        """
+        Loads the index if the replica is empty or the index generation has changed.
+        """
+        async with self._lock:
+            try:
+                generation = await self.generation.get() if self.generation else "0"
+                if self.snapshot is None or self.snapshot.generation != generation:
+                    documents = await self._load_all()
+                    self.snapshot = await asyncio.to_thread(ReplicaSnapshot.build, documents, generation)
+                    logger.info("Replica of index %s loaded: %d documents", self.index, len(self.snapshot))
+            except (ApiError, TransportError, RedisError) as error:
+                logger.warning("Failed to load replica of index %s: %s", self.index, error)
+
+    async def _apply(self, ids: list[str]) -> None:
+        response = await observe_elastic("mget", self.elastic.mget(index=self.index, ids=ids))
+        documents = [self._document(doc["_source"]) for doc in response["docs"] if doc.get("found")]
+        removed = [doc["_id"] for doc in response["docs"] if not doc.get("found")]
+        self.snapshot = await asyncio.to_thread(self.snapshot.with_documents, documents, removed)
+
+    async def _load_all(self) -> list[dict[str, Any]]:
+        fields = list(dict.fromkeys([*self.list_model_class.model_fields, self.sort_field, "genres"]))
+        return [self._document(hit["_source"]) for hit in await scan_index(self.elastic, self.index, {"includes": fields})]
+
+    def _document(self, source: dict[str, Any]) -> dict[str, Any]:
+        model = self.list_model_class(**source)
+        return {
+            "id": source[ID_FIELD],
+            "rating": source.get(self.sort_field),
+            "genres": source.get("genres") or [],
+            "body": orjson.dumps(model.model_dump()),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
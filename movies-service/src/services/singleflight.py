@@ -0,0 +1,25 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into a single execution.
+
+    The first caller starts the call as a task, later callers await the same task.
+    Callers are shielded from each other: a cancelled caller (e.g. a dropped client
+    connection) does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
@@ -0,0 +1,71 @@
+import heapq
+from typing import Hashable
+
+# Счётчики однобайтовые; периодическое деление пополам не даёт им упереться в предел
+MAX_COUNT = 255
+# Таблица для bytes.translate, делящая все счётчики строки пополам
+HALVE = bytes(count >> 1 for count in range(256))
+
+
+class FrequencySketch:
+    """
+    Count-min sketch estimating how often keys were seen recently, for TinyLFU admission.
+
+    Each key increments one counter in each of `depth` rows of `width` counters, the
+    estimate is the smallest of them; only the smallest counters are incremented
+    (conservative update), which keeps the overestimate from hash collisions low.
+    After `sample_size` increments all counters are halved, so the sketch reflects
+    recent popularity rather than the all-time one.
+
+    The sketch also keeps the keys with the highest estimates for the hottest keys report.
+    """
+
+    def __init__(self, width: int, depth: int = 4, sample_size: int | None = None, top_size: int = 100):
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size or width * 10
+        self.top_size = top_size
+        self.additions = 0
+        self._rows = [bytearray(width) for _ in range(depth)]
+        self._top: dict[Hashable, int] = {}
+
+    def increment(self, key: Hashable) -> None:
+        indexes = self._indexes(key)
+        counts = [row[index] for row, index in zip(self._rows, indexes)]
+        estimate = min(counts)
+        if estimate < MAX_COUNT:
+            for row, index, count in zip(self._rows, indexes, counts):
+                if count == estimate:
+                    row[index] = count + 1
+            estimate += 1
+        self._track(key, estimate)
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._reset()
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def hottest(self, count: int) -> list[tuple[Hashable, int]]:
+        """
+        Up to `count` keys with the highest estimated recent frequency, hottest first.
+        """
+        return heapq.nlargest(count, self._top.items(), key=lambda item: item[1])
+
+    def _indexes(self, key: Hashable) -> list[int]:
+        # Индексы строк из двух половин одного хэша (Kirsch-Mitzenmacher); hash() строк
+        # случаен для процесса, как и сам скетч
+        value = hash(key)
+        first, second = value & 0xFFFFFFFF, (value >> 32) | 1
+        return [(first + row * second) % self.width for row in range(self.depth)]
+
+    def _track(self, key: Hashable, estimate: int) -> None:
+        self._top[key] = estimate
+        if len(self._top) > self.top_size * 2:
+            self._top = dict(heapq.nlargest(self.top_size, self._top.items(), key=lambda item: item[1]))
+
+    def _reset(self) -> None:
+        for row in self._rows:
+            row[:] = row.translate(HALVE)
+        self._top = {key: count >> 1 for key, count in self._top.items() if count >> 1}
+        self.additions //= 2
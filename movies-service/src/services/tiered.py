@@ -0,0 +1,177 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Collection, Iterator, NamedTuple
+
+from services.abstract import AbstractCache
+from services.memory import MemoryCache
+
+
+# Записи внутри admit_to_shared() попадают в общий уровень без проверки частоты
+_admit_all: ContextVar[bool] = ContextVar("admit_all", default=False)
+
+
+@contextmanager
+def admit_to_shared() -> Iterator[None]:
+    """
+    Writes of the block (and of the tasks it starts) go to the shared tier however rare
+    their keys are, e.g. during the warmup with keys already known to be hot cluster-wide.
+    """
+    token = _admit_all.set(True)
+    try:
+        yield
+    finally:
+        _admit_all.reset(token)
+
+
+class _Pending(NamedTuple):
+    expire_at: float
+    tags: Collection[str]
+
+
+class TieredCache(AbstractCache):
+    """
+    Two-tier cache: a per-worker in-process tier in front of a shared tier (Redis).
+
+    Reads are served from memory when possible; shared-tier hits are promoted
+    into memory, writes go to both tiers. To keep promoted entries invalidatable
+    by tag, their tags are recovered from the value with `tags_of`; they are kept in
+    memory for the rest of the shared-tier TTL, recovered with `expiry_of`, but not
+    longer than the memory TTL.
+
+    If the memory tier counts key frequencies, a value is written to the shared tier
+    only once its key has been requested at least `shared_min_frequency` times, so
+    keys that are read once do not fill Redis. A value kept only in memory is copied
+    to the shared tier, with the rest of its TTL, on the hit that makes it frequent enough.
+    The memory tier sees the requests of one worker only, so misses are also counted
+    across the cluster with `count_misses` (keys, window): a value is written to the
+    shared tier once its key has missed `shared_min_frequency` times in any workers
+    within `shared_window` seconds, and the other workers read it from there.
+    """
+
+    def __init__(
+            self,
+            memory: MemoryCache,
+            shared: AbstractCache,
+            tags_of: Callable[[Any], Collection[str]] = lambda value: (),
+            shared_min_frequency: int = 1,
+            expiry_of: Callable[[Any], float | None] = lambda value: None,
+            count_misses: Callable[[list[str], int], Awaitable[list[int]]] | None = None,
+            shared_window: int = 600,
+    ):
+        self.memory = memory
+        self.shared = shared
+        self.tags_of = tags_of
+        self.expiry_of = expiry_of
+        self.shared_min_frequency = shared_min_frequency
+        self.count_misses = count_misses
+        self.shared_window = shared_window
+        self._pending: dict[str, _Pending] = {}
+
+    async def get(self, key: str) -> Any:
+        value = await self.memory.get(key)
+        if value is not None:
+            if key in self._pending:
+                await self._publish(key, value)
+            return value
+        value = await self.shared.get(key)
+        if value is not None:
+            await self._promote(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, expire: int, tags: Collection[str] = ()) -> None:
+        await self.memory.set(key, value, expire, tags)
+        if (await self._admit_misses([key]))[0]:
+            self._pending.pop(key, None)
+            await self.shared.set(key, value, expire, tags)
+        else:
+            self._defer(key, expire, tags)
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        values = [await self.memory.get(key) for key in keys]
+        missing = [index for index, value in enumerate(values) if value is None]
+        if missing:
+            shared = await self.shared.get_many([keys[index] for index in missing])
+            for index, value in zip(missing, shared):
+                if value is not None:
+                    values[index] = value
+                    await self._promote(keys[index], value)
+        return values
+
+    async def set_many(
+            self, values: dict[str, Any], expire: int, tags: dict[str, Collection[str]] | None = None
+    ) -> None:
+        tags = tags or {}
+        admitted = {}
+        admits = await self._admit_misses(list(values))
+        for (key, value), admit in zip(values.items(), admits):
+            await self.memory.set(key, value, expire, tags.get(key, ()))
+            if admit:
+                self._pending.pop(key, None)
+                admitted[key] = value
+            else:
+                self._defer(key, expire, tags.get(key, ()))
+        if admitted:
+            await self.shared.set_many(admitted, expire, tags)
+
+    async def invalidate(self, tags: Collection[str]) -> None:
+        await self.memory.invalidate(tags)
+        await self.shared.invalidate(tags)
+
+    def is_shared(self, key: str) -> bool:
+        return key not in self._pending
+
+    def admits_shared(self, key: str) -> bool:
+        # Без обращения к Redis: ключ, редкий в этом воркере, мог набрать промахи в других
+        return self._admit_shared(key)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {**self.memory.stats(), **self.shared.stats()}
+
+    def hottest(self, count: int) -> list[tuple[str, int]]:
+        return self.memory.hottest(count)
+
+    def _admit_shared(self, key: str) -> bool:
+        if _admit_all.get():
+            return True
+        admission = self.memory.admission
+        return admission is None or admission.estimate(key) >= self.shared_min_frequency
+
+    async def _admit_misses(self, keys: list[str]) -> list[bool]:
+        """
+        Whether values of the keys, loaded after a miss, go to the shared tier: keys not
+        frequent enough in this worker are judged by their misses in the whole cluster.
+        """
+        admits = [self._admit_shared(key) for key in keys]
+        rare = [key for key, admit in zip(keys, admits) if not admit]
+        if rare and self.count_misses is not None:
+            counts = iter(await self.count_misses(rare, self.shared_window))
+            admits = [admit or next(counts) >= self.shared_min_frequency for admit in admits]
+        return admits
+
+    def _defer(self, key: str, expire: int, tags: Collection[str]) -> None:
+        now = time.monotonic()
+        if len(self._pending) >= self.memory.max_entries:
+            # Ключи с истёкшим TTL уже не попадут в общий уровень
+            self._pending = {key: pending for key, pending in self._pending.items() if pending.expire_at > now}
+            if len(self._pending) >= self.memory.max_entries:
+                self._pending.pop(next(iter(self._pending)))
+        self._pending[key] = _Pending(now + expire, tags)
+
+    async def _publish(self, key: str, value: Any) -> None:
+        if not self._admit_shared(key):
+            return
+        pending = self._pending.pop(key)
+        expire = int(pending.expire_at - time.monotonic())
+        if expire > 0:
+            await self.shared.set(key, value, expire, pending.tags)
+
+    async def _promote(self, key: str, value: Any) -> None:
+        expire = self.memory.max_ttl
+        expires_at = self.expiry_of(value)
+        if expires_at is not None:
+            # Копия в памяти не должна пережить запись в общем уровне
+            expire = min(expire, int(expires_at - time.time()))
+            if expire <= 0:
+                return
+        await self.memory.set(key, value, expire, self.tags_of(value))
@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from fakeredis import aioredis
+
+# Модули сервиса импортируются от каталога src, как в контейнере
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from benchmarks.standins import StandInElasticsearch  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def redis():
+    client = aioredis.FakeRedis()
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def elastic() -> StandInElasticsearch:
+    # Задержка сети, чтобы одновременные промахи успевали пересечься
+    return StandInElasticsearch.generated(20, latency=0.02)
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from services import breaker as breaker_module
+from services.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+pytestmark = pytest.mark.asyncio
+
+RESET_TIMEOUT = 30.0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(breaker_module.time, "monotonic", clock)
+    return clock
+
+
+async def fail() -> None:
+    raise asyncio.TimeoutError
+
+
+async def succeed() -> str:
+    return "ok"
+
+
+async def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(fail)
+
+
+async def test_failures_in_a_row_open_breaker(clock):
+    # Arrange
+    breaker = CircuitBreaker("elastic", failure_threshold=3, reset_timeout=RESET_TIMEOUT)
+    calls = 0
+
+    async def request() -> str:
+        nonlocal calls
+        calls += 1
+        return "ok"
+
+    # Act
+    await open_breaker(breaker)
+    with pytest.raises(CircuitOpenError) as error:
+        await breaker.call(request)
+
+    # Assert: запрос не отправлен
+    assert breaker.state == OPEN
+    assert calls == 0
+    assert error.value.retry_after == RESET_TIMEOUT
+
+
+async def test_breaker_stays_closed_below_threshold(clock):
+    # Arrange
+    breaker = CircuitBreaker("elastic", failure_threshold=3, reset_timeout=RESET_TIMEOUT)
+
+    # Act
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(fail)
+    await breaker.call(succeed)
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(fail)
+
+    # Assert
+    assert breaker.state == CLOSED
+
+
+async def test_half_open_breaker_limits_probes(clock):
+    # Arrange
+    breaker = CircuitBreaker("elastic", failure_threshold=1, reset_timeout=RESET_TIMEOUT, half_open_max_calls=1)
+    await open_breaker(breaker)
+    release = asyncio.Event()
+
+    async def probe() -> str:
+        await release.wait()
+        return "ok"
+
+    # Act
+    clock.now += RESET_TIMEOUT - 1
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+    clock.now += 1
+    first = asyncio.create_task(breaker.call(probe))
+    await asyncio.sleep(0)
+    state_during_probe = breaker.state
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+    release.set()
+    await first
+
+    # Assert
+    assert state_during_probe == HALF_OPEN
+    assert breaker.state == CLOSED
+
+
+async def test_successful_probes_close_breaker(clock):
+    # Arrange
+    breaker = CircuitBreaker("elastic", failure_threshold=1, reset_timeout=RESET_TIMEOUT, success_threshold=3)
+    await open_breaker(breaker)
+    clock.now += RESET_TIMEOUT
+
+    # Act
+    states = []
+    for _ in range(3):
+        await breaker.call(succeed)
+        states.append(breaker.state)
+
+    # Assert
+    assert states == [HALF_OPEN, HALF_OPEN, CLOSED]
+    assert breaker.failures == 0
+
+
+async def test_failed_probe_reopens_breaker(clock):
+    # Arrange
+    breaker = CircuitBreaker("elastic", failure_threshold=1, reset_timeout=RESET_TIMEOUT, success_threshold=2)
+    await open_breaker(breaker)
+    clock.now += RESET_TIMEOUT
+    await breaker.call(succeed)
+
+    # Act
+    with pytest.raises(asyncio.TimeoutError):
+        await breaker.call(fail)
+
+    # Assert
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == RESET_TIMEOUT
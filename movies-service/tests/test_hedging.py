@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from services.hedging import HedgedRequests
+
+pytestmark = pytest.mark.asyncio
+
+BUDGET = 0.05
+BURST = 10
+
+
+async def test_hedges_stay_within_budget_after_calm_period():
+    # Arrange: долгое спокойное время без дубликатов
+    hedger = HedgedRequests(percentile=95, min_delay=0.005, budget=BUDGET, min_samples=10, burst=BURST)
+    attempts = 0
+
+    async def fast() -> int:
+        nonlocal attempts
+        attempts += 1
+        return 1
+
+    async def slow() -> int:
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.02)
+        return 1
+
+    for _ in range(5_000):
+        await hedger.run("get", fast)
+    calm_attempts, attempts = attempts, 0
+
+    # Act: все запросы кластера замедлились
+    slow_requests = 100
+    await asyncio.gather(*(hedger.run("get", slow) for _ in range(slow_requests)))
+
+    # Assert
+    assert calm_attempts == 5_000
+    assert 0 < attempts - slow_requests <= BURST + BUDGET * slow_requests
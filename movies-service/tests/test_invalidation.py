@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from core.config import settings
+from models.film import Film, FilmShort
+from queries.film import FilmFilter
+from services.elastic import ElasticDataStorage
+from services.invalidation import FilmCacheInvalidator, publish_film_invalidation
+from services.memory import MemoryCache
+from services.policy import entry_expiry, entry_tags
+from services.redis import RedisCache
+from services.singleflight import SingleFlight
+from services.tiered import TieredCache
+
+pytestmark = pytest.mark.asyncio
+
+CHANNEL = "movies:invalidate"
+
+
+def make_worker(redis, elastic) -> ElasticDataStorage:
+    cache = TieredCache(
+        MemoryCache(max_entries=100, max_bytes=1024 * 1024, max_ttl=300),
+        RedisCache(redis),
+        tags_of=entry_tags,
+        expiry_of=entry_expiry,
+    )
+    return ElasticDataStorage(
+        cache=cache,
+        elastic=elastic,
+        model_class=Film,
+        list_model_class=FilmShort,
+        index=settings.elastic_movies_index,
+        single_flight=SingleFlight(),
+    )
+
+
+async def test_published_change_evicts_both_tiers(redis, elastic):
+    # Arrange: два воркера прочитали фильм и список его жанра
+    film, other = list(elastic.films.values())[:2]
+    genre = film["genres"][0]
+    workers = [make_worker(redis, elastic) for _ in range(2)]
+    invalidators = [FilmCacheInvalidator(redis, worker.cache, CHANNEL) for worker in workers]
+    for invalidator in invalidators:
+        invalidator.start()
+    await asyncio.sleep(0.05)
+    for worker in workers:
+        await worker.get_raw_by_id(film["uuid"])
+        await worker.get_all_raw(FilmFilter(genre=genre))
+    await workers[0].get_raw_by_id(other["uuid"])
+    keys = await redis.keys("api_response:*")
+
+    # Act
+    await publish_film_invalidation(redis, workers[0].cache.shared, CHANNEL, [film["uuid"]], [genre])
+    await asyncio.sleep(0.05)
+
+    # Assert
+    other_key = f"api_response:0:{settings.elastic_movies_index}:{other['uuid']}"
+    assert len(keys) == 3
+    assert await redis.keys("api_response:*") == [other_key.encode()]
+    assert list(workers[0].cache.memory._entries) == [other_key]
+    assert list(workers[1].cache.memory._entries) == []
+    assert not await redis.keys(f"tags:{settings.elastic_movies_index}:uuid:{film['uuid']}")
+    assert not await redis.keys(f"tags:{settings.elastic_movies_index}:genres:{genre}")
+    for invalidator in invalidators:
+        await invalidator.stop()
+
+
+async def test_expired_keys_are_pruned_from_tag_sets(redis):
+    # Arrange
+    cache = RedisCache(redis)
+    await cache.set("short", b"1", 1, ["movies:genres:drama"])
+
+    # Act
+    await asyncio.sleep(1.1)
+    await cache.set("long", b"2", 100, ["movies:genres:drama"])
+
+    # Assert
+    assert await redis.zrange("tags:movies:genres:drama", 0, -1) == [b"long"]
+    # Набор живёт до истечения последнего ключа, округлённого вверх до секунды
+    assert 0 < await redis.ttl("tags:movies:genres:drama") <= 101
+
+
+async def test_tag_set_expires_with_its_last_key(redis):
+    # Arrange
+    cache = RedisCache(redis)
+
+    # Act
+    await cache.set("film", b"1", 10, ["movies:uuid:1"])
+
+    # Assert
+    assert 0 < await redis.ttl("tags:movies:uuid:1") <= 11
@@ -0,0 +1,131 @@
+import asyncio
+import uuid
+from http import HTTPStatus
+from typing import Awaitable, Callable
+
+import httpx
+import orjson
+import pytest
+from fastapi import FastAPI
+
+from api.v1 import films
+from models.film import Film, FilmShort
+from services.bloom import KnownIds
+from services.film import FilmService, get_film_service
+from services.redis import RedisCache
+from services.singleflight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+CHANNEL = "movies:invalidate"
+
+
+def make_known_ids(redis, elastic) -> KnownIds:
+    return KnownIds(elastic, redis, "movies", channel=CHANNEL, refresh_interval=60, error_rate=0.001)
+
+
+def make_service(redis, elastic, known_ids: KnownIds) -> FilmService:
+    return FilmService(
+        cache=RedisCache(redis),
+        elastic=elastic,
+        model_class=Film,
+        list_model_class=FilmShort,
+        index="movies",
+        single_flight=SingleFlight(),
+        known_ids=known_ids,
+    )
+
+
+async def eventually(condition: Callable[[], Awaitable[bool]]) -> bool:
+    for _ in range(100):
+        if await condition():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+async def index_film(elastic) -> str:
+    film_id = str(uuid.uuid4())
+    await elastic.index("movies", film_id, {**next(iter(elastic.films.values())), "uuid": film_id})
+    return film_id
+
+
+async def test_known_id_is_looked_up(redis, elastic):
+    # Arrange
+    known_ids = make_known_ids(redis, elastic)
+    await known_ids.refresh()
+    service = make_service(redis, elastic, known_ids)
+    film_id = next(iter(elastic.films))
+
+    # Act
+    entry = await service.get_raw_by_id(film_id)
+
+    # Assert
+    assert entry is not None
+    assert orjson.loads(entry.body)["uuid"] == film_id
+
+
+async def test_unknown_id_is_not_found_without_elastic(redis, elastic):
+    # Arrange
+    known_ids = make_known_ids(redis, elastic)
+    await known_ids.refresh()
+    app = FastAPI()
+    app.include_router(films.router, prefix="/api/v1/films")
+    app.dependency_overrides[get_film_service] = lambda: make_service(redis, elastic, known_ids)
+    elastic.requests.clear()
+
+    # Act
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://movies") as client:
+        response = await client.get(f"/api/v1/films/{uuid.uuid4()}")
+
+    # Assert
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert not elastic.requests
+
+
+async def test_published_id_is_known_before_rebuild(redis, elastic):
+    # Arrange
+    known_ids = make_known_ids(redis, elastic)
+    known_ids.start()
+
+    async def built() -> bool:
+        return known_ids.filter is not None
+
+    assert await eventually(built)
+    # Документ проиндексирован после построения фильтра, число документов ещё не проверялось
+    film_id = await index_film(elastic)
+    message = orjson.dumps({"uuids": [film_id], "genres": []})
+
+    async def received() -> bool:
+        return await redis.publish(CHANNEL, message) > 0
+
+    async def known() -> bool:
+        return known_ids.might_exist(film_id)
+
+    assert not known_ids.might_exist(film_id)
+
+    # Act
+    assert await eventually(received)
+    found = await eventually(known)
+    await known_ids.stop()
+
+    # Assert
+    assert found
+    assert elastic.requests["open_point_in_time"] == 1
+
+
+async def test_changed_count_triggers_rebuild(redis, elastic):
+    # Arrange
+    known_ids = make_known_ids(redis, elastic)
+    await known_ids.refresh()
+    await known_ids.refresh()
+    unchanged_scans = elastic.requests["open_point_in_time"]
+    film_id = await index_film(elastic)
+
+    # Act
+    await known_ids.refresh()
+
+    # Assert
+    assert unchanged_scans == 1
+    assert elastic.requests["open_point_in_time"] == 2
+    assert known_ids.might_exist(film_id)
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from models.film import Film, FilmShort
+from queries.film import FilmFilter
+from services.elastic import ElasticDataStorage, PointInTimeLimitError
+from services.redis import RedisCache
+from services.singleflight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_storage(redis, elastic, pit_max_opens: int) -> ElasticDataStorage:
+    return ElasticDataStorage(
+        cache=RedisCache(redis),
+        elastic=elastic,
+        model_class=Film,
+        list_model_class=FilmShort,
+        index="movies",
+        single_flight=SingleFlight(),
+        pit_max_opens=pit_max_opens,
+    )
+
+
+async def open_snapshot(storage: ElasticDataStorage) -> str:
+    entry = await storage.get_all_raw(FilmFilter(pit=True, page_size=2))
+    return entry.meta["cursor"]
+
+
+async def test_opens_over_the_limit_are_rejected(redis, elastic):
+    # Arrange
+    storage = make_storage(redis, elastic, pit_max_opens=2)
+    for _ in range(2):
+        await open_snapshot(storage)
+
+    # Act / Assert
+    with pytest.raises(PointInTimeLimitError) as error:
+        await open_snapshot(storage)
+    assert 0 < error.value.retry_after <= 60
+
+
+async def test_closing_foreign_snapshot_frees_no_slot(redis, elastic):
+    # Arrange: курсор снимка другого воркера дочитан в этом
+    storage = make_storage(redis, elastic, pit_max_opens=2)
+    other_worker = make_storage(redis, elastic, pit_max_opens=2)
+    foreign = await open_snapshot(other_worker)
+    for _ in range(2):
+        await open_snapshot(storage)
+
+    # Act
+    await storage.get_all_raw(FilmFilter(cursor=foreign, page_size=100))
+    await asyncio.sleep(0.05)
+
+    # Assert
+    with pytest.raises(PointInTimeLimitError):
+        await open_snapshot(storage)
+
+
+async def test_finished_own_snapshot_frees_its_slot(redis, elastic):
+    # Arrange
+    storage = make_storage(redis, elastic, pit_max_opens=2)
+    own = await open_snapshot(storage)
+    await open_snapshot(storage)
+
+    # Act
+    await storage.get_all_raw(FilmFilter(cursor=own, page_size=100))
+    await asyncio.sleep(0.05)
+    cursor = await open_snapshot(storage)
+
+    # Assert
+    assert cursor
+    assert elastic.requests["close_point_in_time"] == 1
@@ -0,0 +1,73 @@
+import orjson
+import pytest
+
+from models.film import Film, FilmShort
+from queries.base import decode_cursor
+from queries.film import FilmFilter
+from services.film import FilmService
+from services.redis import RedisCache
+from services.replica import ReplicaDataStorage, ReplicaSnapshot
+from services.singleflight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+PAGE_SIZE = 3
+UNRATED = 5
+
+
+def make_replica(redis, elastic) -> ReplicaDataStorage:
+    replica = ReplicaDataStorage(
+        elastic=elastic,
+        redis=redis,
+        index="movies",
+        sort_field="imdb_rating",
+        list_model_class=FilmShort,
+        channel="movies:invalidate",
+        refresh_interval=60,
+    )
+    documents = [
+        {
+            "id": film["uuid"],
+            "rating": film["imdb_rating"],
+            "genres": film["genres"],
+            "body": FilmShort(**film).model_dump_json().encode(),
+        }
+        for film in elastic.films.values()
+    ]
+    replica.snapshot = ReplicaSnapshot.build(documents, "0")
+    return replica
+
+
+async def test_pages_past_unrated_tail(redis, elastic):
+    # Arrange: у части фильмов нет рейтинга, они в конце сортировки
+    for film in list(elastic.films.values())[:UNRATED]:
+        film["imdb_rating"] = None
+    replica = make_replica(redis, elastic)
+    storage = FilmService(
+        cache=RedisCache(redis),
+        elastic=elastic,
+        model_class=Film,
+        list_model_class=FilmShort,
+        index="movies",
+        single_flight=SingleFlight(),
+    )
+    pages = -(-len(elastic.films) // PAGE_SIZE)
+
+    # Act
+    entries = [
+        await replica.get_all_raw(FilmFilter(sort="-imdb_rating", page_number=number, page_size=PAGE_SIZE))
+        for number in range(1, pages + 1)
+    ]
+
+    # Assert: курсор есть, пока последний фильм страницы с рейтингом, и по нему Elasticsearch отдаёт следующую
+    films = [film for entry in entries for film in orjson.loads(entry.body)]
+    assert [film["imdb_rating"] for film in films[-UNRATED:]] == [None] * UNRATED
+    for number, entry in enumerate(entries[:-1], start=1):
+        cursor = entry.meta.get("cursor")
+        if orjson.loads(entry.body)[-1]["imdb_rating"] is None:
+            assert cursor is None
+            continue
+        assert None not in decode_cursor(cursor)["search_after"]
+        following = await storage.get_all_raw(FilmFilter(sort="-imdb_rating", cursor=cursor, page_size=PAGE_SIZE))
+        assert orjson.loads(following.body) == orjson.loads(entries[number].body)
+    assert entries[-1].meta.get("cursor") is None
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from models.film import Film
+from services.abstract import AbstractCache
+from services.elastic import ElasticDataStorage
+from services.lock import RedisLock
+from services.memory import MemoryCache
+from services.redis import RedisCache
+from services.singleflight import SingleFlight
+from services.sketch import FrequencySketch
+from services.tiered import TieredCache
+
+pytestmark = pytest.mark.asyncio
+
+
+LOCK_WAIT = 1.0
+
+
+def make_storage(redis, elastic, lock: RedisLock | None = None, cache: AbstractCache | None = None) -> ElasticDataStorage:
+    return ElasticDataStorage(
+        cache=cache or RedisCache(redis),
+        elastic=elastic,
+        model_class=Film,
+        index="movies",
+        single_flight=SingleFlight(),
+        lock=lock,
+        lock_wait=LOCK_WAIT,
+        lock_poll_interval=0.005,
+    )
+
+
+async def test_concurrent_calls_share_one_execution():
+    # Arrange
+    single_flight = SingleFlight()
+    calls = 0
+
+    async def load() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    # Act
+    results = await asyncio.gather(*(single_flight.do("key", load) for _ in range(10)))
+    again = await single_flight.do("key", load)
+
+    # Assert
+    assert results == ["value"] * 10
+    assert again == "value"
+    assert calls == 2
+
+
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    # Arrange
+    single_flight = SingleFlight()
+
+    async def load() -> str:
+        await asyncio.sleep(0.02)
+        return "value"
+
+    # Act
+    first = asyncio.create_task(single_flight.do("key", load))
+    second = asyncio.create_task(single_flight.do("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    # Assert
+    assert await second == "value"
+
+
+async def test_concurrent_misses_load_once(redis, elastic):
+    # Arrange
+    storage = make_storage(redis, elastic)
+    film_id = next(iter(elastic.films))
+
+    # Act
+    entries = await asyncio.gather(*(storage.get_raw_by_id(film_id) for _ in range(10)))
+
+    # Assert
+    assert elastic.requests["get"] == 1
+    assert len({entry.body for entry in entries}) == 1
+
+
+async def test_lock_waiter_reads_winner_value(redis, elastic):
+    # Arrange: два воркера со своими SingleFlight и общим Redis
+    workers = [make_storage(redis, elastic, RedisLock(redis, ttl_ms=1000)) for _ in range(2)]
+    film_id = next(iter(elastic.films))
+
+    # Act
+    entries = await asyncio.gather(*(worker.get_raw_by_id(film_id) for worker in workers))
+
+    # Assert
+    assert elastic.requests["get"] == 1
+    assert entries[0].body == entries[1].body
+    assert not await redis.keys("lock:*")
+
+
+def make_tiered_worker(redis, elastic) -> ElasticDataStorage:
+    memory = MemoryCache(max_entries=100, max_bytes=1024 * 1024, max_ttl=300, admission=FrequencySketch(width=400))
+    cache = TieredCache(memory, RedisCache(redis), shared_min_frequency=2)
+    return make_storage(redis, elastic, RedisLock(redis, ttl_ms=1000), cache)
+
+
+async def test_key_kept_in_memory_is_loaded_without_lock(redis, elastic):
+    # Arrange: ключ впервые запрошен, значение останется только в памяти воркера
+    workers = [make_tiered_worker(redis, elastic) for _ in range(2)]
+    film_id = next(iter(elastic.films))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    # Act
+    entries = await asyncio.gather(*(worker.get_raw_by_id(film_id) for worker in workers))
+
+    # Assert: каждый воркер загрузил значение сам, не дожидаясь блокировки
+    assert loop.time() - started < LOCK_WAIT / 2
+    assert elastic.requests["get"] == 2
+    assert entries[0].body == entries[1].body
+    assert not await redis.keys("*")
+
+
+async def test_shared_key_is_loaded_once_under_lock(redis, elastic):
+    # Arrange: ключ уже частый в обоих воркерах
+    workers = [make_tiered_worker(redis, elastic) for _ in range(2)]
+    film_id = next(iter(elastic.films))
+    cache_key = f"api_response:0:movies:{film_id}"
+    for worker in workers:
+        worker.cache.memory.admission.increment(cache_key)
+
+    # Act
+    entries = await asyncio.gather(*(worker.get_raw_by_id(film_id) for worker in workers))
+
+    # Assert
+    assert elastic.requests["get"] == 1
+    assert entries[0].body == entries[1].body
+    assert await redis.exists(cache_key)
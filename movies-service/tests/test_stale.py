@@ -0,0 +1,97 @@
+import asyncio
+import math
+import uuid
+from http import HTTPStatus
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from api.responses import storage_unavailable_response
+from api.v1 import films
+from models.film import Film, FilmShort
+from services.abstract import AbstractCache
+from services.breaker import CircuitBreaker, CircuitOpenError
+from services.elastic import STALE_NAMESPACE
+from services.film import FilmService, get_film_service
+from services.memory import MemoryCache
+from services.redis import RedisCache
+from services.singleflight import SingleFlight
+from services.sketch import FrequencySketch
+from services.tiered import TieredCache
+
+pytestmark = pytest.mark.asyncio
+
+RESET_TIMEOUT = 30.0
+
+
+def make_service(redis, elastic, cache: AbstractCache | None = None) -> FilmService:
+    return FilmService(
+        cache=cache or RedisCache(redis),
+        elastic=elastic,
+        model_class=Film,
+        list_model_class=FilmShort,
+        index="movies",
+        single_flight=SingleFlight(),
+        breaker=CircuitBreaker("elastic", failure_threshold=1, reset_timeout=RESET_TIMEOUT),
+        stale_cache=RedisCache(redis),
+        stale_ttl=3600,
+    )
+
+
+async def open_breaker(breaker: CircuitBreaker) -> None:
+    async def fail() -> None:
+        raise asyncio.TimeoutError
+
+    with pytest.raises(asyncio.TimeoutError):
+        await breaker.call(fail)
+
+
+async def test_stale_copy_is_served_while_breaker_is_open(redis, elastic):
+    # Arrange: ответ закэширован, затем истёк
+    service = make_service(redis, elastic)
+    film_id = next(iter(elastic.films))
+    fresh = await service.get_raw_by_id(film_id)
+    await redis.delete(f"api_response:0:movies:{film_id}")
+    await open_breaker(service.breaker)
+    elastic.requests.clear()
+
+    # Act
+    entry = await service.get_raw_by_id(film_id)
+
+    # Assert
+    assert entry.body == fresh.body
+    assert not elastic.requests
+
+
+async def test_unavailable_without_copy_is_answered_with_retry_after(redis, elastic):
+    # Arrange
+    service = make_service(redis, elastic)
+    await open_breaker(service.breaker)
+    app = FastAPI()
+    app.include_router(films.router, prefix="/api/v1/films")
+    app.add_exception_handler(CircuitOpenError, storage_unavailable_response)
+    app.dependency_overrides[get_film_service] = lambda: service
+
+    # Act
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://movies") as client:
+        response = await client.get(f"/api/v1/films/{uuid.uuid4()}")
+
+    # Assert
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert 1 <= int(response.headers["Retry-After"]) <= math.ceil(RESET_TIMEOUT)
+
+
+async def test_no_copy_for_key_kept_in_memory_only(redis, elastic):
+    # Arrange: ключ запрошен впервые, в Redis его значение не попадает
+    memory = MemoryCache(max_entries=100, max_bytes=1024 * 1024, max_ttl=300, admission=FrequencySketch(width=400))
+    cache = TieredCache(memory, RedisCache(redis), shared_min_frequency=2)
+    service = make_service(redis, elastic, cache)
+    film_id = next(iter(elastic.films))
+
+    # Act
+    await service.get_raw_by_id(film_id)
+
+    # Assert
+    assert not cache.is_shared(f"api_response:0:movies:{film_id}")
+    assert not await redis.keys(f"{STALE_NAMESPACE}:*")
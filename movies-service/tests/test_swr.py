@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from elasticsearch import ConnectionError as ElasticConnectionError
+
+from models.film import Film
+from services.elastic import ElasticDataStorage
+from services.policy import CacheEntry, StaleWhileRevalidatePolicy
+from services.redis import RedisCache
+from services.singleflight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_storage(redis, elastic, policy: StaleWhileRevalidatePolicy) -> ElasticDataStorage:
+    return ElasticDataStorage(
+        cache=RedisCache(redis),
+        elastic=elastic,
+        model_class=Film,
+        index="movies",
+        single_flight=SingleFlight(),
+        policy=policy,
+    )
+
+
+async def test_soft_expired_entry_is_served_and_refreshed_once(redis, elastic):
+    # Arrange: мягкий TTL 0 - запись устаревает сразу после записи
+    storage = make_storage(redis, elastic, StaleWhileRevalidatePolicy(soft_ttl=0, hard_ttl=60, beta=0))
+    film_id = next(iter(elastic.films))
+    loaded = await storage.get_raw_by_id(film_id)
+
+    # Act
+    started = time.monotonic()
+    entries = await asyncio.gather(*(storage.get_raw_by_id(film_id) for _ in range(5)))
+    served_in = time.monotonic() - started
+    await asyncio.sleep(elastic.latency * 5)
+
+    # Assert
+    assert all(entry.body == loaded.body for entry in entries)
+    assert served_in < elastic.latency
+    assert elastic.requests["get"] == 2
+
+
+async def test_fresh_entry_is_refreshed_early_by_xfetch(monkeypatch):
+    # Arrange
+    policy = StaleWhileRevalidatePolicy(soft_ttl=60, hard_ttl=120, beta=1.0)
+    entry = policy.stamp(CacheEntry(b"{}"), delta=10.0)
+
+    # Act
+    monkeypatch.setattr("services.policy.random.random", lambda: 0.0)
+    unlikely = policy.should_refresh(entry)
+    monkeypatch.setattr("services.policy.random.random", lambda: 0.999999)
+    likely = policy.should_refresh(entry)
+
+    # Assert
+    assert not unlikely
+    assert likely
+
+
+async def test_failed_background_refresh_is_logged(redis, elastic, caplog):
+    # Arrange
+    storage = make_storage(redis, elastic, StaleWhileRevalidatePolicy(soft_ttl=0, hard_ttl=60, beta=0))
+    film_id = next(iter(elastic.films))
+    await storage.get_raw_by_id(film_id)
+
+    async def unavailable(*args, **kwargs):
+        raise ElasticConnectionError("down")
+
+    elastic.get = unavailable
+
+    # Act
+    with caplog.at_level(logging.WARNING, logger="services.elastic"):
+        entry = await storage.get_raw_by_id(film_id)
+        await asyncio.sleep(0.01)
+
+    # Assert
+    assert entry is not None
+    assert any("Background task refresh" in record.getMessage() for record in caplog.records)
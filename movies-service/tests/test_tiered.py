@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from services.memory import MemoryCache
+from services.policy import CacheEntry, entry_expiry, entry_tags
+from services.redis import RedisCache
+from services.sketch import FrequencySketch
+from services.tiered import TieredCache
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_cache(redis, shared_min_frequency: int = 1, max_ttl: int = 300) -> TieredCache:
+    shared = RedisCache(redis)
+    memory = MemoryCache(max_entries=100, max_bytes=1024 * 1024, max_ttl=max_ttl, admission=FrequencySketch(width=400))
+    return TieredCache(
+        memory,
+        shared,
+        tags_of=entry_tags,
+        shared_min_frequency=shared_min_frequency,
+        expiry_of=entry_expiry,
+        count_misses=shared.count_misses,
+        shared_window=60,
+    )
+
+
+def packed(expire: int, tags: list[str]) -> bytes:
+    return CacheEntry(b'{"uuid": "1"}', {"tags": tags, "expires_at": time.time() + expire}).pack()
+
+
+def memory_ttl(cache: TieredCache, key: str) -> float:
+    return cache.memory._entries[key].expire_at - time.monotonic()
+
+
+async def test_shared_hit_is_promoted_with_tags(redis):
+    # Arrange
+    cache = make_cache(redis)
+    value = packed(100, ["movies:uuid:1"])
+    await cache.shared.set("film", value, 100, ["movies:uuid:1"])
+
+    # Act
+    first = await cache.get("film")
+    await redis.delete("film")
+    second = await cache.get("film")
+    await cache.memory.invalidate(["movies:uuid:1"])
+
+    # Assert
+    assert first == value
+    assert second == value
+    assert await cache.memory.get("film") is None
+
+
+async def test_promoted_entry_keeps_remaining_shared_ttl(redis):
+    # Arrange
+    cache = make_cache(redis, max_ttl=300)
+    await cache.shared.set("film", packed(10, []), 10)
+
+    # Act
+    await cache.get("film")
+
+    # Assert
+    assert 0 < memory_ttl(cache, "film") <= 10
+
+
+async def test_expired_shared_entry_is_not_promoted(redis):
+    # Arrange
+    cache = make_cache(redis)
+    await cache.shared.set("film", packed(-1, []), 10)
+
+    # Act
+    value = await cache.get("film")
+
+    # Assert
+    assert value is not None
+    assert "film" not in cache.memory._entries
+
+
+async def test_rare_key_reaches_shared_tier_on_second_request(redis):
+    # Arrange
+    cache = make_cache(redis, shared_min_frequency=2)
+    value = packed(100, [])
+
+    # Act
+    assert await cache.get("film") is None
+    await cache.set("film", value, 100)
+    written_on_miss = await redis.exists("film")
+    await cache.get("film")
+
+    # Assert
+    assert not written_on_miss
+    assert cache.is_shared("film")
+    assert await cache.shared.get("film") == value
+    assert 0 < await redis.ttl("film") <= 100
+
+
+async def test_key_missed_in_two_workers_is_admitted(redis):
+    # Arrange
+    workers = [make_cache(redis, shared_min_frequency=2) for _ in range(3)]
+    value = packed(100, [])
+
+    # Act
+    loads = 0
+    for worker in workers:
+        if await worker.get("film") is None:
+            loads += 1
+            await worker.set("film", value, 100)
+
+    # Assert
+    assert loads == 2
+    assert await redis.get("seen:film") == b"2"
+    assert await workers[0].shared.get("film") == value
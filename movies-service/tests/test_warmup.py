@@ -0,0 +1,70 @@
+import pytest
+
+from models.film import Film, FilmShort
+from services.elastic import HOT_LIST, HOT_MODEL
+from services.film import FilmService, warm_film_cache
+from services.hotkeys import HotKeys
+from services.memory import MemoryCache
+from services.policy import entry_expiry, entry_tags
+from services.redis import RedisCache
+from services.singleflight import SingleFlight
+from services.sketch import FrequencySketch
+from services.tiered import TieredCache
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_service(redis, elastic, hot_keys: HotKeys) -> FilmService:
+    shared = RedisCache(redis)
+    memory = MemoryCache(max_entries=100, max_bytes=1024 * 1024, max_ttl=300, admission=FrequencySketch(width=400))
+    cache = TieredCache(
+        memory,
+        shared,
+        tags_of=entry_tags,
+        shared_min_frequency=2,
+        expiry_of=entry_expiry,
+        count_misses=shared.count_misses,
+        shared_window=60,
+    )
+    return FilmService(
+        cache=cache,
+        elastic=elastic,
+        model_class=Film,
+        list_model_class=FilmShort,
+        index="movies",
+        single_flight=SingleFlight(),
+        hot_keys=hot_keys,
+    )
+
+
+async def test_warmup_publishes_to_redis_without_recording_hot_keys(redis, elastic):
+    # Arrange: ключи горячие в кластере, но этот воркер их ещё не видел
+    film_id = next(iter(elastic.films))
+    hot_keys = HotKeys(redis, "movies", sample_rate=1.0, flush_interval=60, half_life=60, max_size=100)
+    await redis.zadd(hot_keys.key, {f"{HOT_MODEL}:{film_id}": 2, f"{HOT_LIST}:page_number=1&page_size=5": 1})
+    service = make_service(redis, elastic, hot_keys)
+
+    # Act
+    loaded = await warm_film_cache(service, hot_keys)
+
+    # Assert
+    assert loaded == 2
+    assert not hot_keys._counts
+    assert await redis.exists(f"api_response:0:movies:{film_id}")
+    assert await redis.keys("api_response:0:movies:list?*")
+    assert not service.cache._pending
+
+
+async def test_requests_after_warmup_are_recorded(redis, elastic):
+    # Arrange
+    film_id = next(iter(elastic.films))
+    hot_keys = HotKeys(redis, "movies", sample_rate=1.0, flush_interval=60, half_life=60, max_size=100)
+    await redis.zadd(hot_keys.key, {f"{HOT_MODEL}:{film_id}": 1})
+    service = make_service(redis, elastic, hot_keys)
+    await warm_film_cache(service, hot_keys)
+
+    # Act
+    await service.get_raw_by_id(film_id)
+
+    # Assert
+    assert hot_keys._counts == {f"{HOT_MODEL}:{film_id}": 1}
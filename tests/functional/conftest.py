@@ -39,6 +39,13 @@ async def redis_client(event_loop):
     yield client
     await client.aclose()
 
+@pytest_asyncio.fixture()
+async def redis_bytes_client(event_loop):
+    # Записи кэша - двоичные (сжатые варианты ответа), их нельзя декодировать как строки
+    client = await redis.from_url(f"redis://{test_settings.redis_host}:{test_settings.redis_port}")
+    yield client
+    await client.aclose()
+
 @pytest_asyncio.fixture(scope="session", autouse=True)
 async def setup_es(es_client):
     if await es_client.indices.exists(index=test_settings.elastic_movies_index):
@@ -53,8 +60,9 @@ async def setup_es(es_client):
                 continue
 
             doc = json.loads(line)
-            doc_id = doc.get("_id") or doc.get("id") or doc.get("uuid")
             source = doc.get("_source") or doc
+            # Сервис читает фильмы по _id, поэтому он должен совпадать с uuid
+            doc_id = source.get("uuid") or doc.get("_id") or doc.get("id")
 
             if not doc_id:
                 logger.error(f"Не найден ID в документе: {doc}")
@@ -80,28 +80,190 @@ async def test_get_all_films_last_page(http_session: ClientSession, es_ready):
         assert "uuid" in data[0]
 
 
-async def test_film_cache(http_session: ClientSession, redis_client, es_ready):
+async def test_film_cache(http_session: ClientSession, redis_bytes_client, es_ready):
     # Arrange
-    film_id = "ec1a0b58-0814-4369-ac44-cbefa03f8f96"
-    await redis_client.flushdb()
+    # Фильм, который не запрашивают другие тесты: иначе он мог остаться в памяти воркера
+    film_id = "8706bbfb-77d0-4a19-ba11-f5f675fc010c"
+    cache_key_pattern = f"api_response:*:{test_settings.elastic_movies_index}:{film_id}"
+    await redis_bytes_client.flushdb()
 
     # Act 1
     async with http_session.get(
             f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/{film_id}"
     ) as resp1:
-        data1 = await resp1.json()
+        body1 = await resp1.read()
 
-    # Assert 1
+    # Assert 1: в Redis ключ допускается со второго промаха или запроса, первый оставляет только счётчик
     assert resp1.status == HTTPStatus.OK
-    keys = await redis_client.keys("*")
-    assert len(keys) > 0
+    assert await redis_bytes_client.keys(cache_key_pattern) == []
 
     # Act 2
     async with http_session.get(
             f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/{film_id}"
     ) as resp2:
-        data2 = await resp2.json()
+        body2 = await resp2.read()
 
     # Assert 2
     assert resp2.status == HTTPStatus.OK
-    assert data1 == data2
+    assert body1 == body2
+    keys = await redis_bytes_client.keys(cache_key_pattern)
+    assert len(keys) == 1
+    value = await redis_bytes_client.get(keys[0])
+    assert body1 in value
+    assert await redis_bytes_client.ttl(keys[0]) > 0
+
+
+async def test_films_batch(http_session: ClientSession, es_ready):
+    # Arrange
+    film_ids = ["822f3ec3-e05d-4f0e-a0ab-e299ff41e935", "123", "ec1a0b58-0814-4369-ac44-cbefa03f8f96"]
+
+    # Act
+    async with http_session.post(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/batch",
+            json={"ids": film_ids}
+    ) as resp:
+        data = await resp.json()
+
+    # Assert
+    assert resp.status == HTTPStatus.OK
+    assert [film["uuid"] for film in data] == [film_ids[0], film_ids[2]]
+
+
+async def test_films_batch_validation(http_session: ClientSession):
+    # Act
+    async with http_session.post(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/batch",
+            json={"ids": []}
+    ) as resp:
+        # Assert
+        assert resp.status == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def test_get_all_films_cursor(http_session: ClientSession, es_ready):
+    # Arrange
+    url = f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/"
+
+    # Act
+    async with http_session.get(f"{url}?page_size=3") as resp1:
+        cursor = resp1.headers.get("X-Next-Cursor")
+    async with http_session.get(f"{url}?page_size=3&cursor={cursor}") as resp2:
+        data_by_cursor = await resp2.json()
+    async with http_session.get(f"{url}?page_size=3&page_number=2") as resp3:
+        data_by_number = await resp3.json()
+
+    # Assert
+    assert resp1.status == HTTPStatus.OK
+    assert cursor
+    assert resp2.status == HTTPStatus.OK
+    assert data_by_cursor == data_by_number
+
+
+async def test_get_all_films_invalid_cursor(http_session: ClientSession):
+    # Act
+    async with http_session.get(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/?cursor=invalid"
+    ) as resp:
+        # Assert
+        assert resp.status == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def test_get_all_films_short_representation(http_session: ClientSession, es_ready):
+    # Act
+    async with http_session.get(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/?page_size=3"
+    ) as resp:
+        data = await resp.json()
+
+    # Assert
+    assert resp.status == HTTPStatus.OK
+    assert all(set(film) == {"uuid", "title", "imdb_rating"} for film in data)
+
+
+async def test_get_all_films_fields(http_session: ClientSession, es_ready):
+    # Act
+    async with http_session.get(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/?page_size=3&fields=genres,title"
+    ) as resp:
+        data = await resp.json()
+
+    # Assert
+    assert resp.status == HTTPStatus.OK
+    assert all(set(film) == {"uuid", "genres", "title"} for film in data)
+
+
+async def test_get_film_not_modified(http_session: ClientSession, es_ready):
+    # Arrange
+    url = f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/ec1a0b58-0814-4369-ac44-cbefa03f8f96"
+
+    # Act
+    async with http_session.get(url) as resp1:
+        etag = resp1.headers.get("ETag")
+    async with http_session.get(url, headers={"If-None-Match": etag}) as resp2:
+        body = await resp2.read()
+
+    # Assert
+    assert resp1.status == HTTPStatus.OK
+    assert etag
+    assert "max-age" in resp1.headers.get("Cache-Control", "")
+    assert resp2.status == HTTPStatus.NOT_MODIFIED
+    assert resp2.headers.get("ETag") == etag
+    assert body == b""
+
+
+async def test_get_all_films_precompressed(http_session: ClientSession, es_ready):
+    # Act
+    async with http_session.get(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/?page_size=10&fields=description",
+            headers={"Accept-Encoding": "gzip"}
+    ) as resp:
+        data = await resp.json()
+
+    # Assert
+    assert resp.status == HTTPStatus.OK
+    assert resp.headers.get("Content-Encoding") == "gzip"
+    assert "Accept-Encoding" in resp.headers.get("Vary", "")
+    assert len(data) == 10
+
+
+async def test_suggest_films(http_session: ClientSession, es_ready):
+    # Act
+    async with http_session.get(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/suggest?prefix=CAM"
+    ) as resp:
+        data = await resp.json()
+
+    # Assert
+    assert resp.status == HTTPStatus.OK
+    assert data
+    assert all(film["title"].lower().startswith("cam") for film in data)
+    assert all(set(film) == {"uuid", "title", "imdb_rating"} for film in data)
+
+
+async def test_film_genres(http_session: ClientSession, es_ready):
+    # Act
+    async with http_session.get(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/genres"
+    ) as resp:
+        data = await resp.json()
+
+    # Assert
+    assert resp.status == HTTPStatus.OK
+    assert data
+    assert all(genre["films_count"] > 0 for genre in data)
+    assert [genre["films_count"] for genre in data] == sorted((genre["films_count"] for genre in data), reverse=True)
+
+
+async def test_get_all_films_top_rated(http_session: ClientSession, es_ready):
+    # Arrange
+    url = f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/api/v1/films/"
+
+    # Act
+    async with http_session.get(f"{url}?sort=-imdb_rating&page_size=5") as resp1:
+        data_top = await resp1.json()
+    async with http_session.get(f"{url}?sort=-imdb_rating&page_size=5&fields=uuid,title,imdb_rating") as resp2:
+        data_search = await resp2.json()
+
+    # Assert
+    assert resp1.status == HTTPStatus.OK
+    assert [film["imdb_rating"] for film in data_top] == sorted((film["imdb_rating"] for film in data_top), reverse=True)
+    assert data_top == data_search
@@ -12,4 +12,39 @@ async def test_healthcheck(http_session: ClientSession):
         data = await resp.json()
 
     assert resp.status == HTTPStatus.OK
-    assert data == {"status": "healthy"}
+    assert data["status"] == "healthy"
+    assert data["breakers"]["elasticsearch"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_metrics(http_session: ClientSession):
+    async with http_session.get(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/metrics"
+    ) as resp:
+        text = await resp.text()
+
+    assert resp.status == HTTPStatus.OK
+    assert "http_request_duration_seconds" in text
+
+
+@pytest.mark.asyncio
+async def test_server_timing(http_session: ClientSession):
+    async with http_session.get(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/health"
+    ) as resp:
+        await resp.read()
+
+    assert resp.status == HTTPStatus.OK
+    assert "total;dur=" in resp.headers.get("Server-Timing", "")
+
+
+@pytest.mark.asyncio
+async def test_hottest_cache_keys(http_session: ClientSession):
+    async with http_session.get(
+            f"http://{test_settings.movies_api_service_host}:{test_settings.movies_api_service_port}/health/cache/hot?count=5"
+    ) as resp:
+        data = await resp.json()
+
+    assert resp.status == HTTPStatus.OK
+    assert len(data) <= 5
+    assert all(set(item) == {"key", "frequency"} for item in data)
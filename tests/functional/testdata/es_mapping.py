@@ -36,7 +36,11 @@ MOVIES_MAPPING = {
             "title": {
                 "type": "text",
                 "analyzer": "ru_en",
-                "fields": {"raw": {"type": "keyword"}},
+                "fields": {
+                    "raw": {"type": "keyword"},
+                    # Автодополнение названий: /api/v1/films/suggest
+                    "suggest": {"type": "completion"},
+                },
             },
             "description": {"type": "text", "analyzer": "ru_en"},
             **{name: {"type": "keyword"} for name in